@@ -0,0 +1,142 @@
+"""Simulated sessions against a local stub, through admission control.
+
+    python -m benchmarks.admission_sim [--rate 5] [--burst 5] [--light 8] [--greedy-threads 6]
+
+One stub server stands in for a rate-limited upstream. The sessions share
+its quota through ``revalidation.get()`` and therefore ``admission.acquire``:
+
+- ``light``: ``--light`` sessions, each making a few requests with pauses.
+- ``greedy``: one session firing ``--greedy-requests`` requests from
+  ``--greedy-threads`` threads at once.
+- ``background``: a warmer-like thread in the background lane.
+
+The script prints the highest request count the stub saw in any one-second
+window (it should stay within rate + burst), waits per class, rejections,
+and how far the estimated waits were from the real ones.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from cancer_support import admission, revalidation
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    arrivals = []
+    lock = threading.Lock()
+
+    def do_GET(self):
+        with self.lock:
+            StubHandler.arrivals.append(time.monotonic())
+        body = json.dumps({"ok": True}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def busiest_second(arrivals):
+    arrivals = sorted(arrivals)
+    best, start = 0, 0
+    for end, at in enumerate(arrivals):
+        while at - arrivals[start] >= 1.0:
+            start += 1
+        best = max(best, end - start + 1)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rate", type=float, default=5.0)
+    parser.add_argument("--burst", type=int, default=5)
+    parser.add_argument("--light", type=int, default=8)
+    parser.add_argument("--light-requests", type=int, default=5)
+    parser.add_argument("--greedy-threads", type=int, default=6)
+    parser.add_argument("--greedy-requests", type=int, default=60)
+    parser.add_argument("--background-requests", type=int, default=10)
+    parser.add_argument("--max-wait", type=float, default=8.0, help="interactive rejection threshold (s)")
+    args = parser.parse_args()
+
+    os.environ["UPSTREAM_MODE"] = "live"
+    os.environ["ADMISSION"] = "on"
+    os.environ["ADMISSION_RATE_STUB"] = f"{args.rate}/{args.burst}"
+    os.environ["ADMISSION_MAX_WAIT_INTERACTIVE"] = str(args.max_wait)
+    admission.reset()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/search"
+
+    results = {"light": [], "greedy": [], "background": []}
+    rejected = {kind: 0 for kind in results}
+    lock = threading.Lock()
+
+    def request(kind, session, lane):
+        with admission.identity(session, lane):
+            estimate = admission.estimate("stub")
+            started = time.monotonic()
+            try:
+                revalidation.get("stub", url, timeout=10)
+            except admission.Rejected:
+                with lock:
+                    rejected[kind] += 1
+                return
+            with lock:
+                results[kind].append((time.monotonic() - started, estimate))
+
+    def light_session(n):
+        rng = random.Random(n)
+        time.sleep(rng.uniform(0, 2))
+        for _ in range(args.light_requests):
+            request("light", f"light-{n}", "interactive")
+            time.sleep(rng.uniform(0.5, 2.0))
+
+    greedy_left = iter(range(args.greedy_requests))
+    greedy_lock = threading.Lock()
+
+    def greedy_worker():
+        while True:
+            with greedy_lock:
+                if next(greedy_left, None) is None:
+                    return
+            request("greedy", "greedy", "interactive")
+
+    def background():
+        for _ in range(args.background_requests):
+            request("background", "warmer", "background")
+
+    threads = [threading.Thread(target=light_session, args=(n,)) for n in range(args.light)]
+    threads += [threading.Thread(target=greedy_worker) for _ in range(args.greedy_threads)]
+    threads.append(threading.Thread(target=background))
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+    server.shutdown()
+
+    print(f"{len(StubHandler.arrivals)} requests reached the stub in {elapsed:.1f}s; "
+          f"busiest second: {busiest_second(StubHandler.arrivals)} (rate {args.rate:g}/s, burst {args.burst})")
+    print(f"{'class':<12}{'admitted':>9}{'rejected':>9}{'mean wait':>11}{'p95 wait':>10}{'estimate error':>16}")
+    for kind, samples in results.items():
+        if not samples:
+            print(f"{kind:<12}{0:>9}{rejected[kind]:>9}")
+            continue
+        waits = sorted(wait for wait, _ in samples)
+        p95 = waits[min(len(waits) - 1, int(len(waits) * 0.95))]
+        error = statistics.mean(abs(wait - estimate) for wait, estimate in samples)
+        print(f"{kind:<12}{len(samples):>9}{rejected[kind]:>9}{statistics.mean(waits):>10.2f}s{p95:>9.2f}s{error:>15.2f}s")
+
+
+if __name__ == "__main__":
+    main()
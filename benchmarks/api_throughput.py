@@ -0,0 +1,167 @@
+"""Requests per second for the JSON API (cancer_support/api.py).
+
+    python -m benchmarks.api_throughput [--clients 16] [--seconds 5] [--batch 10]
+
+Starts ``uvicorn cancer_support.api:app`` in replay mode, with fixtures for
+hospital searches in a dozen cities (``--hospitals`` results each), PubMed
+searches and trial searches. Every search is made once to warm the cache.
+Then ``--clients`` threads, each on its own keep-alive connection, send
+requests for ``--seconds`` per scenario: single GETs for each search, and a
+POST batch of ``--batch`` hospital searches. The report gives requests and
+searches per second, latency percentiles, and the server's CPU time per
+search from /proc (Linux only).
+"""
+import argparse
+import http.client
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+
+import requests
+
+from benchmarks import fixtures
+from benchmarks.fragment_reruns import free_port, server_cpu
+from benchmarks.overpass_payload import synthetic_elements
+from cancer_support import gazetteer, overpass, service, sources, transport
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CITIES = [
+    "New York", "Boston", "Chicago", "Houston", "Seattle", "Denver",
+    "Atlanta", "Miami", "Phoenix", "Portland", "Dallas", "Philadelphia",
+]
+TERMS = ["Breast Cancer", "Lung Cancer", "Melanoma", "Leukemia", "Lymphoma", "Prostate Cancer"]
+
+
+def write_fixtures(path, hospitals):
+    store = transport.FixtureStore(path)
+
+    def put(url, params, body, content_type):
+        request = requests.Request("GET", url, params=params).prepare()
+        store.save(request, transport.build_response(request, 200, {"Content-Type": content_type}, body))
+
+    _, overpass_body = synthetic_elements(hospitals)
+    for city in CITIES:
+        match = gazetteer.lookup(city)
+        query = overpass.hospital_query(match.lat, match.lon, radius=service.HOSPITAL_RADIUS, oncology_only=False)
+        put(sources.OVERPASS_URL, {"data": query}, overpass_body, "application/json")
+    pmids = [str(30000000 + i) for i in range(service.RESEARCH_LIMIT)]
+    articles = fixtures.pubmed_xml(service.RESEARCH_LIMIT)
+    for term in TERMS:
+        params = {"db": "pubmed", "term": term, "retmax": service.RESEARCH_LIMIT, "sort": "pub date", "retmode": "json"}
+        put(sources.ESEARCH_URL, params, json.dumps({"esearchresult": {"idlist": pmids}}).encode(), "application/json")
+        put(sources.TRIALS_URL, {"expr": sources.trials_query(term, "New York"), "min_rnk": 1,
+                                 "max_rnk": service.TRIALS_LIMIT, "fmt": "xml"},
+            fixtures.trials_xml(service.TRIALS_LIMIT), "text/xml")
+    put(sources.EFETCH_URL, {"db": "pubmed", "id": ",".join(pmids), "retmode": "xml", "rettype": "abstract"},
+        articles, "text/xml")
+
+
+def scenarios(batch):
+    def get(path, **params):
+        return "GET", f"{path}?{urllib.parse.urlencode(params)}", None
+
+    cities = [CITIES[i % len(CITIES)] for i in range(batch)]
+    return [
+        ("GET /hospitals", 1, [get("/hospitals", location=city) for city in CITIES]),
+        ("GET /research", 1, [get("/research", term=term) for term in TERMS]),
+        ("GET /trials", 1, [get("/trials", cancer_type=term, location="New York") for term in TERMS]),
+        (f"POST /hospitals x{batch}", batch, [("POST", "/hospitals", json.dumps({"locations": cities}))]),
+    ]
+
+
+def send(conn, call):
+    method, path, body = call
+    conn.request(method, path, body=body, headers={"Content-Type": "application/json"})
+    response = conn.getresponse()
+    response.read()
+    return response.status
+
+
+def client(port, calls, deadline, latencies, errors):
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    i = 0
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        status = send(conn, calls[i % len(calls)])
+        latencies.append(time.perf_counter() - started)
+        if status != 200:
+            errors.append(status)
+        i += 1
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--batch", type=int, default=10)
+    parser.add_argument("--hospitals", type=int, default=100)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="api-bench-")
+    fixture_path = os.path.join(workdir, "fixtures")
+    write_fixtures(fixture_path, args.hospitals)
+    port = free_port()
+    env = dict(
+        os.environ,
+        UPSTREAM_MODE="replay",
+        UPSTREAM_FIXTURES=fixture_path,
+        CACHE_WARMER="off",
+        RETRIEVAL_PATH=os.path.join(workdir, "retrieval.sqlite3"),
+    )
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "cancer_support.api:app", "--port", str(port), "--log-level", "warning"],
+        env=env, cwd=ROOT,
+    )
+    try:
+        for _ in range(300):
+            try:
+                http.client.HTTPConnection("127.0.0.1", port, timeout=1).request("GET", "/health")
+                break
+            except OSError:
+                time.sleep(0.1)
+        else:
+            raise SystemExit("uvicorn did not start")
+
+        print(f"{'scenario':<22}{'req/s':>9}{'searches/s':>12}{'p50':>10}{'p99':>10}{'CPU/search':>12}  errors")
+        for name, searches, calls in scenarios(args.batch):
+            # Fill the cache first, so the run measures the API rather than parsing
+            conn = http.client.HTTPConnection("127.0.0.1", port)
+            for call in calls:
+                status = send(conn, call)
+                if status != 200:
+                    raise SystemExit(f"{name}: {call[1]} answered {status}")
+            conn.close()
+
+            latencies, errors = [], []
+            cpu_before = server_cpu(server.pid)
+            deadline = time.perf_counter() + args.seconds
+            threads = [
+                threading.Thread(target=client, args=(port, calls, deadline, latencies, errors))
+                for _ in range(args.clients)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            cpu = server_cpu(server.pid) - cpu_before
+            latencies.sort()
+            rate = len(latencies) / args.seconds
+            p50 = latencies[len(latencies) // 2] * 1000
+            p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000
+            per_search = cpu / (len(latencies) * searches) * 1000
+            print(f"{name:<22}{rate:>9.0f}{rate * searches:>12.0f}{p50:>7.1f} ms{p99:>7.1f} ms{per_search:>9.2f} ms"
+                  f"  {len(errors)}")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Time the cancer-center join against scoring every hospital and campus pair.
+
+    python -m benchmarks.center_join [--hospitals 100 1000 5000]
+
+Each synthetic result set is a 50 km search around New York, with the New
+York campuses from ``data/cancer_centers.csv`` mapped under slightly
+different names ("... - Main Campus"), a few metres off. Decoys carry a
+campus's name far from it, and the rest are ordinary hospitals.
+``centers.rank_hospitals`` (trigram index and spatial prefilter) is compared
+with the obvious join: a ``difflib`` name ratio and a distance for every
+hospital and every campus. The report gives milliseconds per search and the
+matches each finds.
+"""
+import argparse
+import csv
+import difflib
+import math
+import random
+import time
+
+import pyarrow as pa
+
+from cancer_support import centers, lodging
+
+SUFFIXES = ["", " - Main Campus", " Main Building", " (Inpatient)"]
+
+
+def campuses():
+    with open(centers.CENTERS_PATH, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def synthetic_table(count, sites, seed=1):
+    rng = random.Random(seed)
+    nearby = [site for site in sites if abs(float(site["lat"]) - 40.75) < 0.5 and abs(float(site["lon"]) + 73.95) < 0.6]
+    rows = []
+    for site in nearby:
+        rows.append((site["site"] + rng.choice(SUFFIXES),
+                     float(site["lat"]) + rng.uniform(-0.001, 0.001), float(site["lon"]) + rng.uniform(-0.001, 0.001)))
+    for i in range(count - len(rows)):
+        lat, lon = 40.75 + rng.uniform(-0.45, 0.45), -73.95 + rng.uniform(-0.6, 0.6)
+        if i % 50 == 0:
+            rows.append((rng.choice(nearby)["site"] + " Outpatient Pavilion", lat, lon))
+        else:
+            rows.append((f"{rng.choice(['Saint', 'Community', 'General', 'Memorial'])} Hospital {i}", lat, lon))
+    return pa.table({
+        "Name": [row[0] for row in rows],
+        "Latitude": [row[1] for row in rows],
+        "Longitude": [row[2] for row in rows],
+    })
+
+
+def pairwise(table, sites):
+    """Name ratio and distance for every pair: the O(n·m) join."""
+    keys = [centers.name_key(site["site"]) for site in sites]
+    matches = 0
+    for name, lat, lon in zip(*(table[column].to_pylist() for column in ("Name", "Latitude", "Longitude"))):
+        key = centers.name_key(name)
+        best = 0.0
+        for site, site_key in zip(sites, keys):
+            lat1, lat2 = math.radians(lat), math.radians(float(site["lat"]))
+            a = (math.sin((lat2 - lat1) / 2) ** 2
+                 + math.cos(lat1) * math.cos(lat2) * math.sin(math.radians(float(site["lon"]) - lon) / 2) ** 2)
+            km = 2 * lodging.EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+            score = difflib.SequenceMatcher(None, key, site_key).ratio() if key and site_key else 0.0
+            if km <= centers.MATCH_KM and score >= centers.MIN_SIMILARITY:
+                best = max(best, score)
+        matches += best > 0
+    return matches
+
+
+def timed(func, *args, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hospitals", type=int, nargs="+", default=[100, 1000, 5000])
+    args = parser.parse_args()
+
+    sites = campuses()
+    centers.get_index()
+    print(f"{len(sites)} campuses")
+    print(f"{'hospitals':>10}{'indexed':>12}{'matches':>9}{'pairwise':>12}{'matches':>9}")
+    for count in args.hospitals:
+        table = synthetic_table(count, sites)
+        indexed, ranked = timed(centers.rank_hospitals, table)
+        found = sum(1 for designation in ranked["NCI designation"].to_pylist() if designation)
+        slow, slow_found = timed(pairwise, table, sites, repeat=1)
+        print(f"{count:>10,}{indexed * 1000:>9.2f} ms{found:>9}{slow * 1000:>9.0f} ms{slow_found:>9}")
+
+
+if __name__ == "__main__":
+    main()
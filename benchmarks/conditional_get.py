@@ -0,0 +1,103 @@
+"""Exercise conditional revalidation against a local stub server.
+
+    python -m benchmarks.conditional_get [--rounds 20] [--studies 500] [--change-every 5]
+
+The stub serves a ClinicalTrials-style XML payload with an ``ETag`` and
+``Last-Modified`` and answers ``If-None-Match`` with a 304. Its content
+changes every ``--change-every`` requests. A cached fetch with a very short
+TTL is called once per round, so every round after the first is a
+revalidation. The script prints bytes on the wire, the 304 rate, and
+per-round latency for full fetches versus 304s.
+"""
+import argparse
+import email.utils
+import hashlib
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from cancer_support import cache, revalidation, tables
+
+STUDY = (
+    "<clinical_study><id_info><nct_id>NCT{i:08d}</nct_id></id_info>"
+    "<official_title>Study {i} of a new treatment, revision {version}</official_title>"
+    "<overall_status>Recruiting</overall_status><phase>Phase 2</phase>"
+    "<location><facility><address><city>Boston</city><state>MA</state></address></facility></location>"
+    "</clinical_study>"
+)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    studies = 500
+    change_every = 5
+    hits = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        with self.lock:
+            StubHandler.hits += 1
+            version = (StubHandler.hits - 1) // self.change_every
+        body = ("<clinical_studies>" + "".join(STUDY.format(i=i, version=version) for i in range(self.studies))
+                + "</clinical_studies>").encode()
+        etag = '"%s"' % hashlib.sha1(body).hexdigest()
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/xml")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", email.utils.formatdate(usegmt=True))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--studies", type=int, default=500)
+    parser.add_argument("--change-every", type=int, default=5)
+    parser.add_argument("--ttl", type=float, default=0.05)
+    args = parser.parse_args()
+
+    # Measure the transport, not the token bucket the stub would get as an unknown upstream
+    os.environ["ADMISSION"] = "off"
+    StubHandler.studies = args.studies
+    StubHandler.change_every = args.change_every
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/search"
+
+    @cache.cached("stub", ttl=args.ttl, codec=tables.ArrowCodec, revalidate=True)
+    def stub_trials(query):
+        return tables.trial_table(revalidation.get("stub", url, params={"expr": query}, timeout=10).content)
+
+    revalidation.reset_stats()
+    timings = {"full": [], "304": []}
+    for _ in range(args.rounds):
+        before = revalidation.stats().get("stub", {}).get("not_modified", 0)
+        started = time.perf_counter()
+        table = stub_trials("Lung Cancer")
+        elapsed = (time.perf_counter() - started) * 1000
+        after = revalidation.stats()["stub"]["not_modified"]
+        timings["304" if after > before else "full"].append(elapsed)
+        assert table.num_rows == args.studies
+        time.sleep(args.ttl * 1.5)
+    server.shutdown()
+
+    stats = revalidation.stats()["stub"]
+    print(f"{stats['requests']} requests, {stats['not_modified']} answered 304 "
+          f"({stats['not_modified_rate']:.0%} of conditional requests), {stats['bytes']:,} bytes transferred")
+    for kind, values in timings.items():
+        if values:
+            print(f"{kind}: {len(values)} rounds, mean {sum(values) / len(values):.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Peak memory and time for a large batch export, streamed versus built whole.
+
+    python -m benchmarks.export_stream [--searches 240] [--hospitals 2000] [--format csv]
+
+Writes replay fixtures for hospital searches in the cities of
+benchmarks/api_throughput.py (``--hospitals`` results each) and exports
+``--searches`` of them, cycling through the cities, as one file in two ways:
+
+- ``whole``: fetch every result, concatenate them into one table and encode
+  that, which is what building the file before sending it costs.
+- ``streamed``: ``export.export()``, encoding each result as its turn comes
+  and handing the file over in chunks, which are counted and dropped here.
+
+Results come from the in-memory cache after a warm-up pass, so the
+comparison is about holding and encoding data, not fetching it. The peak is
+the Arrow memory pool plus Python allocations (tracemalloc), taken on a
+second run because tracing slows Python down.
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+import pyarrow as pa
+
+
+def measure(run):
+    """``(seconds, file bytes, peak bytes)``; tracing slows Python down, so it gets a run of its own."""
+    started = time.perf_counter()
+    size = sum(len(chunk) for chunk in run())
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    pool_base, pool_peak = pa.total_allocated_bytes(), 0
+    for chunk in run():
+        pool_peak = max(pool_peak, pa.total_allocated_bytes() - pool_base)
+    _, python_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, size, pool_peak + python_peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--searches", type=int, default=240)
+    parser.add_argument("--hospitals", type=int, default=2000)
+    parser.add_argument("--format", default="csv", choices=["csv", "parquet", "geojson"])
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="export-bench-")
+    os.environ.update(
+        UPSTREAM_MODE="replay",
+        UPSTREAM_FIXTURES=os.path.join(workdir, "fixtures"),
+        CACHE_WARMER="off",
+        RETRIEVAL_PATH=os.path.join(workdir, "retrieval.sqlite3"),
+    )
+    from benchmarks.api_throughput import CITIES, write_fixtures
+    from cancer_support import export
+
+    write_fixtures(os.environ["UPSTREAM_FIXTURES"], args.hospitals)
+    queries = [CITIES[i % len(CITIES)] for i in range(args.searches)]
+    list(export.export("hospitals", CITIES, "csv"))  # fill the cache
+
+    column, schema = export.KINDS["hospitals"]
+    labelled_schema = schema.insert(0, pa.field(column, pa.string()))
+
+    def whole():
+        outcomes = export.results("hospitals", queries, ("bench", "background"))
+        table = pa.concat_tables([export.labelled(table, column, query) for query, table, _ in outcomes])
+        yield b"".join(export.encode(args.format, labelled_schema, [table]))
+
+    def streamed():
+        return export.export("hospitals", queries, args.format)
+
+    print(f"{args.searches} searches x {args.hospitals} hospitals as {args.format}")
+    print(f"{'mode':<10}{'time':>10}{'file':>11}{'peak memory':>14}")
+    for name, run in (("whole", whole), ("streamed", streamed)):
+        elapsed, size, peak = measure(run)
+        print(f"{name:<10}{elapsed:>8.2f} s{size / 1e6:>8.1f} MB{peak / 1e6:>11.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""Deterministic synthetic upstream payloads shared by the benchmarks."""
+import json
+import random
+
+ARTICLE = (
+    "<PubmedArticle><MedlineCitation Status=\"MEDLINE\"><PMID Version=\"1\">{pmid}</PMID><Article>"
+    "<Journal><JournalIssue><PubDate><Year>{year}</Year><Month>Mar</Month><Day>{day}</Day></PubDate>"
+    "</JournalIssue><Title>Journal of Clinical Oncology {journal}</Title></Journal>"
+    "<ArticleTitle>{title}</ArticleTitle>"
+    "<Abstract><AbstractText Label=\"BACKGROUND\">{background}</AbstractText>"
+    "<AbstractText Label=\"RESULTS\">{results}</AbstractText></Abstract>"
+    "<AuthorList>{authors}</AuthorList></Article></MedlineCitation>"
+    "<PubmedData><History><PubMedPubDate PubStatus=\"entrez\"><Year>{year}</Year></PubMedPubDate></History>"
+    "</PubmedData></PubmedArticle>"
+)
+
+AUTHOR = "<Author><LastName>Author{n}</LastName><ForeName>First</ForeName><Initials>F</Initials></Author>"
+
+STUDY = (
+    "<clinical_study><id_info><nct_id>NCT{nct:08d}</nct_id></id_info>"
+    "<official_title>{title}</official_title><overall_status>{status}</overall_status>"
+    "<phase>{phase}</phase>{locations}</clinical_study>"
+)
+
+LOCATION = "<location><facility><name>Center {n}</name><address><city>{city}</city><state>NY</state></address></facility></location>"
+
+WORDS = (
+    "tumor carcinoma metastatic adjuvant chemotherapy radiotherapy immunotherapy survival progression "
+    "mutation expression cohort randomized trial response toxicity screening breast lung colorectal"
+).split()
+
+
+def _sentence(rng, n):
+    return " ".join(rng.choice(WORDS) for _ in range(n)).capitalize() + "."
+
+
+def pubmed_xml(count, seed=1):
+    """efetch-style PubmedArticleSet with ``count`` articles."""
+    rng = random.Random(seed)
+    articles = [
+        ARTICLE.format(
+            pmid=30000000 + i,
+            year=rng.randint(2015, 2026),
+            day=rng.randint(1, 28),
+            journal=rng.randint(1, 40),
+            title=_sentence(rng, 12),
+            background=_sentence(rng, 60),
+            results=_sentence(rng, 80),
+            authors="".join(AUTHOR.format(n=n) for n in range(rng.randint(3, 12))),
+        )
+        for i in range(count)
+    ]
+    return ("<?xml version=\"1.0\" ?><PubmedArticleSet>" + "".join(articles) + "</PubmedArticleSet>").encode()
+
+
+def trials_xml(count, seed=1):
+    """ClinicalTrials.gov brief-search XML with ``count`` studies."""
+    rng = random.Random(seed)
+    studies = [
+        STUDY.format(
+            nct=i,
+            title=_sentence(rng, 14),
+            status=rng.choice(["Recruiting", "Completed", "Active, not recruiting"]),
+            phase=rng.choice(["Phase 1", "Phase 2", "Phase 3"]),
+            locations="".join(LOCATION.format(n=n, city=rng.choice(["New York", "Boston", "Chicago"]))
+                              for n in range(rng.randint(1, 8))),
+        )
+        for i in range(count)
+    ]
+    return ("<?xml version=\"1.0\" ?><clinical_studies>" + "".join(studies) + "</clinical_studies>").encode()
+
+
+def trial_record_json(nct, seed=1):
+    """ClinicalTrials.gov API v2 study JSON for one trial, with long criteria and many sites."""
+    rng = random.Random(seed * 100003 + nct)
+    criteria = "\n".join(f"* {_sentence(rng, 16)}" for _ in range(rng.randint(15, 40)))
+    sponsor = rng.randint(1, 50)
+    return json.dumps({"protocolSection": {
+        "identificationModule": {"nctId": f"NCT{nct:08d}", "briefTitle": _sentence(rng, 14)},
+        "statusModule": {
+            "overallStatus": "RECRUITING",
+            "startDateStruct": {"date": "2025-03"},
+            "primaryCompletionDateStruct": {"date": "2028-06", "type": "ESTIMATED"},
+        },
+        "sponsorCollaboratorsModule": {"leadSponsor": {"name": f"Cancer Center {sponsor}", "class": "OTHER"}},
+        "descriptionModule": {"briefSummary": _sentence(rng, 120)},
+        "conditionsModule": {"conditions": ["Lung Cancer"]},
+        "armsInterventionsModule": {"interventions": [{"type": "DRUG", "name": f"Agent {sponsor}"}]},
+        "eligibilityModule": {
+            "eligibilityCriteria": f"Inclusion Criteria:\n\n{criteria}",
+            "healthyVolunteers": False,
+            "sex": "ALL",
+            "minimumAge": "18 Years",
+        },
+        "contactsLocationsModule": {
+            "centralContacts": [{
+                "name": "Study Coordinator", "role": "CONTACT", "phone": "555-0100", "email": "trials@example.org",
+            }],
+            "locations": [
+                {
+                    "facility": f"Center {n}",
+                    "status": "RECRUITING",
+                    "city": rng.choice(["New York", "Boston", "Chicago"]),
+                    "state": "New York",
+                    "country": "United States",
+                }
+                for n in range(rng.randint(5, 120))
+            ],
+        },
+    }}).encode()
+
+
+def nominatim_json(location, seed=1):
+    rng = random.Random(seed)
+    return json.dumps([{
+        "place_id": rng.randint(1, 10**8),
+        "licence": "Data (c) OpenStreetMap contributors, ODbL 1.0. https://osm.org/copyright",
+        "osm_type": "relation",
+        "osm_id": rng.randint(1, 10**7),
+        "lat": f"{40.7 + rng.random():.7f}",
+        "lon": f"{-74.0 + rng.random():.7f}",
+        "class": "boundary",
+        "type": "administrative",
+        "place_rank": 16,
+        "importance": 0.82,
+        "addresstype": "city",
+        "name": location,
+        "display_name": f"{location}, United States",
+        "boundingbox": ["40.4", "40.9", "-74.2", "-73.7"],
+    }]).encode()
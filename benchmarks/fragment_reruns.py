@@ -0,0 +1,194 @@
+"""Server CPU per interaction, with and without fragment-scoped reruns.
+
+    python -m benchmarks.fragment_reruns [--rounds 20] [--hospitals 300] [--no-post-script-gc]
+
+Starts ``streamlit run streamlit_app.py`` in replay mode and talks to it
+over its websocket, sending the same messages the browser does. Each panel
+interaction (a calculator input, a checklist submit, a hospital search) is
+repeated ``--rounds`` times in two modes:
+
+- ``full``: the rerun request carries no fragment id, so the whole script
+  runs, as every interaction did before the panels became fragments.
+- ``fragment``: the request names the panel's fragment, as the browser
+  sends it now, so only that panel reruns.
+
+Server CPU comes from the process's user + system time in /proc (Linux
+only), so it includes the websocket handling and message serialization,
+not just the script. ``--no-post-script-gc`` turns off Streamlit's forced
+collection after each rerun (the app keeps it on) to show what it costs.
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+from websockets.sync.client import connect
+
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+from benchmarks.overpass_payload import synthetic_elements
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+
+
+def write_fixtures(path, hospitals):
+    """Replay fixture for a hospital search around New York."""
+    import requests
+    from cancer_support import overpass, sources, transport
+
+    coords = sources.resolve_location("New York")
+    request = requests.Request(
+        "GET", sources.OVERPASS_URL, params={"data": overpass.hospital_query(coords["lat"], coords["lon"])}
+    ).prepare()
+    _, body = synthetic_elements(hospitals)
+    response = transport.build_response(request, 200, {"Content-Type": "application/json"}, body)
+    transport.FixtureStore(path).save(request, response)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def server_cpu(pid):
+    """User + system CPU seconds used so far by ``pid``."""
+    with open(f"/proc/{pid}/stat") as f:
+        # Fields after the parenthesised command name; utime and stime are 14 and 15
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+
+
+class Browser:
+    """Just enough of the frontend protocol to rerun the app and set widgets."""
+
+    def __init__(self, ws):
+        self.ws = ws
+        self.states = {}
+        self.widgets = {}
+
+    def rerun(self, fragment_id="", trigger=None):
+        msg = BackMsg()
+        msg.rerun_script.widget_states.widgets.extend(self.states.values())
+        if trigger is not None:
+            state = WidgetState(id=trigger, trigger_value=True)
+            msg.rerun_script.widget_states.widgets.append(state)
+        msg.rerun_script.fragment_id = fragment_id
+        self.ws.send(msg.SerializeToString())
+        while True:
+            forward = ForwardMsg()
+            forward.ParseFromString(self.ws.recv())
+            kind = forward.WhichOneof("type")
+            if kind == "delta" and forward.delta.WhichOneof("type") == "new_element":
+                element = forward.delta.new_element
+                proto = getattr(element, element.WhichOneof("type"))
+                if getattr(proto, "id", "") and getattr(proto, "label", ""):
+                    self.widgets[proto.label] = (proto, forward.delta.fragment_id)
+            elif kind == "script_finished":
+                return
+
+    def set(self, label, **value):
+        proto, _ = self.widgets[label]
+        self.states[proto.id] = WidgetState(id=proto.id, **value)
+
+    def click(self, label, fragment=True):
+        proto, fragment_id = self.widgets[label]
+        self.rerun(fragment_id if fragment else "", trigger=proto.id)
+
+    def change(self, label, fragment=True, **value):
+        self.set(label, **value)
+        _, fragment_id = self.widgets[label]
+        self.rerun(fragment_id if fragment else "")
+
+
+def calculator(browser, round_number, fragment):
+    browser.change("Enter your annual income ($):", fragment, int_value=40000 + round_number * 1000)
+
+
+def checklist(browser, round_number, fragment):
+    tasks = ["Apply for insurance", "Fill out tax forms", "Plan budget for treatments"]
+    browser.set("Financial Tasks", string_array_value={"data": tasks[:1 + round_number % 3]})
+    browser.click("Generate Checklist", fragment)
+
+
+def hospital_search(browser, round_number, fragment):
+    browser.click("Find Hospitals", fragment)
+
+
+INTERACTIONS = [
+    ("Financial Support", "calculator input", calculator),
+    ("Interactive Tools & Extras", "checklist submit", checklist),
+    ("Locate Hospitals", "hospital search", hospital_search),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--hospitals", type=int, default=300)
+    parser.add_argument("--no-post-script-gc", action="store_true", help="skip the collection after every rerun")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="fragment-bench-")
+    fixtures = os.path.join(workdir, "fixtures")
+    write_fixtures(fixtures, args.hospitals)
+    port = free_port()
+    env = dict(
+        os.environ,
+        UPSTREAM_MODE="replay",
+        UPSTREAM_FIXTURES=fixtures,
+        CACHE_WARMER="off",
+        PROFILE="off",
+        RETRIEVAL_PATH=os.path.join(workdir, "retrieval.sqlite3"),
+        ALERTS_PATH=os.path.join(workdir, "alerts.sqlite3"),
+    )
+    server = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", os.path.join(ROOT, "streamlit_app.py"),
+         "--server.headless", "true", "--server.port", str(port), "--browser.gatherUsageStats", "false",
+         "--runner.postScriptGC", str(not args.no_post_script_gc).lower()],
+        env=env, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        for _ in range(300):
+            try:
+                urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=1)
+                break
+            except OSError:
+                time.sleep(0.1)
+        else:
+            raise SystemExit("streamlit did not start")
+
+        results = {}
+        url = f"ws://127.0.0.1:{port}/_stcore/stream"
+        for page, name, interact in INTERACTIONS:
+            with connect(url, subprotocols=["streamlit"], max_size=None) as ws:
+                browser = Browser(ws)
+                browser.rerun()
+                browser.change("Go to", fragment=False, string_value=page)
+                interact(browser, 0, True)  # warm caches and imports
+                for mode in ("full", "fragment"):
+                    cpu_before, wall_before = server_cpu(server.pid), time.perf_counter()
+                    for round_number in range(args.rounds):
+                        interact(browser, round_number + 1, mode == "fragment")
+                    results[name, mode] = (
+                        (server_cpu(server.pid) - cpu_before) / args.rounds * 1000,
+                        (time.perf_counter() - wall_before) / args.rounds * 1000,
+                    )
+    finally:
+        server.terminate()
+        server.wait()
+
+    print(f"{'interaction':<20}{'mode':<10}{'server CPU':>12}{'wall':>12}")
+    for (name, mode), (cpu_ms, wall_ms) in results.items():
+        print(f"{name:<20}{mode:<10}{cpu_ms:>9.1f} ms{wall_ms:>9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
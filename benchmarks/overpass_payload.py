@@ -0,0 +1,127 @@
+"""Compare the legacy ``out center;`` Overpass payload with the trimmed query.
+
+Run from the repo root:
+
+    python -m benchmarks.overpass_payload [--elements 2500]
+
+By default a synthetic dense-metro response is generated (tag mix modelled on
+hospitals in large US cities). Pass ``--legacy`` / ``--trimmed`` with saved
+Overpass JSON responses to measure real payloads instead.
+"""
+import argparse
+import gzip
+import json
+import random
+import time
+
+import msgpack
+
+from cancer_support import overpass, tables
+
+# Tags commonly found on hospital elements in OSM, on top of the whitelisted ones
+EXTRA_TAGS = (
+    "amenity", "building", "building:levels", "healthcare", "operator", "operator:type",
+    "wikidata", "wikipedia", "addr:housenumber", "addr:state", "addr:country", "opening_hours",
+    "source", "alt_name", "old_name", "short_name", "beds", "email", "fax", "description",
+    "gnis:feature_id", "ele", "roof:shape", "height", "start_date", "check_date", "url",
+)
+
+
+def synthetic_elements(count, seed=1):
+    rng = random.Random(seed)
+    legacy, trimmed = [], []
+    for i in range(count):
+        osm_type = rng.choices(["node", "way", "relation"], weights=[55, 40, 5])[0]
+        lat = 40.7 + rng.uniform(-0.45, 0.45)
+        lon = -74.0 + rng.uniform(-0.6, 0.6)
+        tags = {tag: f"{tag}-value-{rng.randint(0, 9999)}" for tag in overpass.HOSPITAL_TAGS if rng.random() < 0.7}
+        tags["name"] = f"Hospital {i}"
+        extra = {tag: f"{tag}-value-{rng.randint(0, 99999)}" for tag in EXTRA_TAGS if rng.random() < 0.6}
+
+        element = {"type": osm_type, "id": rng.randint(1, 10**10), "tags": {**tags, **extra}}
+        if osm_type == "node":
+            element.update(lat=lat, lon=lon)
+        else:
+            element["center"] = {"lat": lat, "lon": lon}
+            element["nodes"] = [rng.randint(1, 10**10) for _ in range(rng.randint(5, 40))]
+        legacy.append(element)
+
+        converted_tags = {tag: tags.get(tag, "") for tag in overpass.HOSPITAL_TAGS}
+        converted_tags["_type"] = osm_type
+        trimmed.append({
+            "type": "hospital",
+            "id": element["id"],
+            "geometry": {"type": "Point", "coordinates": [lon, lat]},
+            "tags": converted_tags,
+        })
+    return (
+        json.dumps({"version": 0.6, "elements": legacy}).encode(),
+        json.dumps({"version": 0.6, "elements": trimmed}).encode(),
+    )
+
+
+def legacy_extract(elements):
+    # The loop the app ran before the query builder
+    hospitals = []
+    for element in elements:
+        name = element["tags"].get("name", "Unnamed Hospital")
+        lat_h = element.get("lat", element.get("center", {}).get("lat"))
+        lon_h = element.get("lon", element.get("center", {}).get("lon"))
+        if lat_h and lon_h:
+            hospitals.append({"Name": name, "Latitude": lat_h, "Longitude": lon_h})
+    return hospitals
+
+
+def legacy_parse(elements):
+    # Before the query builder the cache held the raw element list
+    legacy_extract(elements)
+    return elements
+
+
+def best_of(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def measure(label, body, extract, store, repeat):
+    parse_s, stored = best_of(lambda: extract(json.loads(body)["elements"]), repeat)
+    return {
+        "payload": label,
+        "bytes": len(body),
+        "gzip_bytes": len(gzip.compress(body)),
+        "parse_ms": parse_s * 1000,
+        "stored_bytes": len(store(stored)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--elements", type=int, default=2500)
+    parser.add_argument("--legacy", help="saved response to the legacy query")
+    parser.add_argument("--trimmed", help="saved response to the trimmed query")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    legacy_body, trimmed_body = synthetic_elements(args.elements)
+    if args.legacy:
+        with open(args.legacy, "rb") as f:
+            legacy_body = f.read()
+    if args.trimmed:
+        with open(args.trimmed, "rb") as f:
+            trimmed_body = f.read()
+
+    rows = [
+        measure("out center (legacy)", legacy_body, legacy_parse, lambda elements: msgpack.packb(elements, use_bin_type=True), args.repeat),
+        measure("convert + whitelist", trimmed_body, tables.hospital_table, tables.to_ipc, args.repeat),
+    ]
+    print(f"{'payload':<22}{'bytes':>12}{'gzip bytes':>12}{'parse ms':>10}{'stored bytes':>14}")
+    for row in rows:
+        print(f"{row['payload']:<22}{row['bytes']:>12,}{row['gzip_bytes']:>12,}{row['parse_ms']:>10.2f}{row['stored_bytes']:>14,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Time BM25 indexing and queries over a large synthetic abstract corpus.
+
+    python -m benchmarks.retrieval_index [--docs 100000] [--batch 10]
+
+Documents arrive in efetch-sized batches, as they do in the app, so this also
+exercises segment merging. Query latency is reported as median and p95.
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from cancer_support import retrieval
+
+WORDS = (
+    "tumor carcinoma metastatic adjuvant neoadjuvant chemotherapy radiotherapy immunotherapy pembrolizumab "
+    "nivolumab trastuzumab her2 brca1 brca2 egfr alk kras braf mutation survival progression recurrence "
+    "mastectomy lumpectomy biopsy staging lymph node marker expression cohort randomized trial phase "
+    "response toxicity quality life screening mammography colonoscopy lung breast prostate colorectal "
+    "pancreatic ovarian melanoma leukemia lymphoma myeloma glioblastoma sarcoma pediatric elderly"
+).split()
+
+QUERIES = [
+    "what's new for triple negative breast cancer",
+    "pembrolizumab lung toxicity",
+    "brca1 ovarian screening",
+    "kras pancreatic survival",
+    "pediatric leukemia immunotherapy",
+    "glioblastoma radiotherapy recurrence",
+]
+
+
+def synthetic_texts(count, rng):
+    # Zipf-ish word choice so some terms are common and most are rare
+    weights = 1.0 / np.arange(1, len(WORDS) + 1)
+    extra = [f"term{i}" for i in range(20000)]
+    texts = []
+    for _ in range(count):
+        words = rng.choices(WORDS, weights=weights, k=rng.randint(80, 250))
+        words += rng.sample(extra, 10)
+        texts.append(" ".join(words))
+    return texts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--docs", type=int, default=100000)
+    parser.add_argument("--batch", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    texts = synthetic_texts(args.docs, rng)
+    index = retrieval.BM25Index()
+    started = time.perf_counter()
+    # One big load (startup refresh) followed by small incremental batches
+    bulk = args.docs - 100 * args.batch
+    index.add(range(bulk), texts[:bulk])
+    bulk_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    for start in range(bulk, args.docs, args.batch):
+        index.add(range(start, start + args.batch), texts[start:start + args.batch])
+    incremental_ms = (time.perf_counter() - started) * 1000 / 100
+    print(f"indexed {args.docs:,} docs: bulk {bulk_seconds:.1f}s, {incremental_ms:.2f} ms per {args.batch}-doc batch, "
+          f"{len(index.segments)} segments, {len(index.vocabulary):,} terms")
+
+    timings = []
+    for i in range(args.queries):
+        query = retrieval.question_topic(QUERIES[i % len(QUERIES)])
+        started = time.perf_counter()
+        index.search(query, k=10)
+        timings.append((time.perf_counter() - started) * 1000)
+    print(f"query latency: median {np.median(timings):.2f} ms, p95 {np.percentile(timings, 95):.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
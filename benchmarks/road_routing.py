@@ -0,0 +1,134 @@
+"""Build time, memory and query latency of the offline road graph.
+
+    python -m benchmarks.road_routing [--grid 300] [--queries 200] [--hospitals 300]
+
+Writes a synthetic OSM XML extract of a grid city: ``--grid`` x ``--grid``
+junctions 150 m apart, with ``--shape`` shape points per block. Every tenth
+street is a primary road, every fiftieth a motorway, and a fifth of the
+residential streets are one way. The extract goes through
+``scripts/build_road_graph.py`` in a subprocess, which reports build time and
+peak memory. Then ``--queries`` searches each time one-to-many drive times
+from a random origin to ``--hospitals`` random hospitals
+(``RoadGraph.drive_minutes``), at several cut-offs.
+"""
+import argparse
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from cancer_support import routing
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SPACING_DEG = 150 / 111320
+
+
+def rss_mb():
+    """Resident memory of this process (Linux only)."""
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+def street_tags(i, rng):
+    if i % 50 == 0:
+        return {"highway": "motorway", "oneway": "no"}
+    if i % 10 == 0:
+        return {"highway": "primary"}
+    if rng.random() < 0.2:
+        return {"highway": "residential", "oneway": "yes" if i % 2 else "-1"}
+    return {"highway": "residential"}
+
+
+def write_extract(path, grid, shape, seed=1):
+    rng = random.Random(seed)
+    lat0, lon0 = 40.5, -74.2
+    lon_step = SPACING_DEG / np.cos(np.radians(lat0 + grid * SPACING_DEG / 2))
+    next_id = grid * grid + 1
+    nodes, ways = 0, 0
+    with open(path, "w") as f:
+        f.write('<?xml version="1.0"?>\n<osm version="0.6">\n')
+        for row in range(grid):
+            for col in range(grid):
+                f.write(f' <node id="{row * grid + col + 1}" lat="{lat0 + row * SPACING_DEG:.7f}" '
+                        f'lon="{lon0 + col * lon_step:.7f}"/>\n')
+        nodes += grid * grid
+        way_lines = []
+        for horizontal in (True, False):
+            for i in range(grid):
+                refs = []
+                for j in range(grid):
+                    row, col = (i, j) if horizontal else (j, i)
+                    refs.append(row * grid + col + 1)
+                    if j == grid - 1:
+                        break
+                    for k in range(1, shape + 1):
+                        fraction = k / (shape + 1)
+                        lat = lat0 + (row + (0 if horizontal else fraction)) * SPACING_DEG
+                        lon = lon0 + (col + (fraction if horizontal else 0)) * lon_step
+                        f.write(f' <node id="{next_id}" lat="{lat:.7f}" lon="{lon:.7f}"/>\n')
+                        refs.append(next_id)
+                        next_id += 1
+                        nodes += 1
+                tags = "".join(f'<tag k="{k}" v="{v}"/>' for k, v in street_tags(i, rng).items())
+                way_lines.append(f' <way id="{len(way_lines) + 1}">'
+                                 + "".join(f'<nd ref="{ref}"/>' for ref in refs) + tags + "</way>\n")
+        f.writelines(way_lines)
+        ways += len(way_lines)
+        f.write("</osm>\n")
+    return nodes, ways, (lat0, lon0, grid * SPACING_DEG, grid * lon_step)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--grid", type=int, default=300)
+    parser.add_argument("--shape", type=int, default=3)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--hospitals", type=int, default=300)
+    parser.add_argument("--minutes", type=float, nargs="+", default=[15, 30, 60])
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="routing-bench-")
+    extract, graph_path = os.path.join(workdir, "grid.osm"), os.path.join(workdir, "roads.bin")
+    nodes, ways, (lat0, lon0, lat_span, lon_span) = write_extract(extract, args.grid, args.shape)
+    print(f"extract: {nodes:,} nodes, {ways:,} ways, {os.path.getsize(extract) / 2**20:.0f} MB")
+
+    started = time.perf_counter()
+    subprocess.run([sys.executable, os.path.join(ROOT, "scripts", "build_road_graph.py"), extract,
+                    "--output", graph_path], check=True)
+    build = time.perf_counter() - started
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    print(f"build: {build:.1f}s, peak RSS {peak:.0f} MB, graph file {os.path.getsize(graph_path) / 2**20:.1f} MB")
+
+    rss_before = rss_mb()
+    started = time.perf_counter()
+    graph = routing.RoadGraph(graph_path)
+    load = time.perf_counter() - started
+    print(f"load: {load * 1000:.0f} ms, {len(graph):,} junctions, {graph.matrix.nnz:,} edges, "
+          f"RSS +{rss_mb() - rss_before:.0f} MB (the snapping tree; the graph is memory-mapped)")
+
+    rng = np.random.default_rng(1)
+    print(f"{'cut-off':>8}{'p50':>10}{'p99':>10}{'reached':>10}")
+    for minutes in args.minutes:
+        latencies, reached = [], []
+        for _ in range(args.queries):
+            origin = lat0 + rng.uniform(0.25, 0.75) * lat_span, lon0 + rng.uniform(0.25, 0.75) * lon_span
+            lat = lat0 + rng.uniform(0, 1, args.hospitals) * lat_span
+            lon = lon0 + rng.uniform(0, 1, args.hospitals) * lon_span
+            started = time.perf_counter()
+            result = graph.drive_minutes(*origin, lat, lon, max_minutes=minutes)
+            latencies.append(time.perf_counter() - started)
+            reached.append(np.count_nonzero(~np.isnan(result)))
+        latencies.sort()
+        p50 = latencies[len(latencies) // 2] * 1000
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000
+        print(f"{minutes:>5g} min{p50:>7.1f} ms{p99:>7.1f} ms{np.mean(reached):>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Memory held for sessions, with and without the session memory budget.
+
+    python -m benchmarks.session_memory [--sessions 400] [--budget-mb 64] [--rows 4000]
+
+Simulates sessions arriving one per tick, each searching for lodging around
+one of ``--locations`` places and then rerunning the panel for
+``--session-ticks`` ticks (moving the slider, picking hospitals) before
+leaving. One in ten comes back later. Every rerun goes through
+``session_store.Store.keep`` with a cached Arrow fetch shaped like
+``sources.overpass_area``. The simulated clock advances one second per tick,
+so sessions go idle without the benchmark sleeping.
+
+The script runs twice, with an unlimited budget (the same as keeping the
+tables in ``st.session_state``) and with ``--budget-mb``. For each run it
+reports the peak bytes kept, the peak Arrow memory pool, evictions, and the
+time a rerun takes when the tables are kept versus rebuilt from the cache.
+"""
+import argparse
+import random
+import time
+
+import pyarrow as pa
+
+from cancer_support import cache, session_store, tables
+
+MB = 1024 * 1024
+
+
+def area_fetch(rows):
+    """A cached fetch returning ``{"hospitals": ..., "lodging": ...}`` like ``sources.overpass_area``."""
+
+    @cache.cached("bench_area", ttl=3600, codec=tables.ArrowDictCodec)
+    def area(location):
+        rng = random.Random(location)
+
+        def table(kind, count):
+            return pa.table({
+                "Name": [f"{kind} {location} {i}" for i in range(count)],
+                "Latitude": [40.7 + rng.uniform(-0.4, 0.4) for _ in range(count)],
+                "Longitude": [-74.0 + rng.uniform(-0.5, 0.5) for _ in range(count)],
+                "addr:street": [f"{rng.randint(1, 999)} Main Street" for _ in range(count)],
+                "website": [f"https://example.org/{location}/{i}" for i in range(count)],
+            })
+
+        return {"hospitals": table("Hospital", rows // 4), "lodging": table("Hotel", rows)}
+
+    return area
+
+
+def simulate(args, budget):
+    now = [0.0]
+    store = session_store.Store(budget, args.session_max_mb * MB, args.idle_seconds, clock=lambda: now[0])
+    fetch = area_fetch(args.rows)
+    rng = random.Random(7)
+    schedule = {}
+    for session in range(args.sessions):
+        location = f"place-{rng.randrange(args.locations)}"
+        ticks = list(range(session, session + args.session_ticks))
+        if rng.random() < 0.1:
+            comeback = session + args.session_ticks + rng.randint(120, 600)
+            ticks += range(comeback, comeback + 3)
+        for tick in ticks:
+            schedule.setdefault(tick, []).append((f"session-{session}", location))
+
+    peak_kept = peak_pool = 0
+    kept_times, rebuild_times = [], []
+    for tick in sorted(schedule):
+        now[0] = float(tick)
+        for session, location in schedule[tick]:
+            rebuilt = store.rebuilt
+            misses = (session, "lodging_area") not in store.entries
+            started = time.perf_counter()
+            store.keep(session, "lodging_area", fetch, location)
+            elapsed = time.perf_counter() - started
+            if store.rebuilt > rebuilt:
+                rebuild_times.append(elapsed)
+            elif not misses:
+                kept_times.append(elapsed)
+        peak_kept = max(peak_kept, store.total)
+        peak_pool = max(peak_pool, pa.total_allocated_bytes())
+    return store.stats(), peak_kept, peak_pool, kept_times, rebuild_times
+
+
+def ms(times):
+    return f"{sum(times) / len(times) * 1000:.3f} ms" if times else "-"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=400)
+    parser.add_argument("--session-ticks", type=int, default=90)
+    parser.add_argument("--locations", type=int, default=60)
+    parser.add_argument("--rows", type=int, default=4000, help="lodging rows per area")
+    parser.add_argument("--budget-mb", type=float, default=64)
+    parser.add_argument("--session-max-mb", type=float, default=32)
+    parser.add_argument("--idle-seconds", type=float, default=60)
+    args = parser.parse_args()
+
+    print(f"{'budget':<12}{'peak kept':>12}{'peak Arrow pool':>17}{'evicted':>9}{'rebuilt':>9}"
+          f"{'kept rerun':>13}{'rebuilt rerun':>15}")
+    for label, budget in (("unlimited", float("inf")), (f"{args.budget_mb:g} MB", args.budget_mb * MB)):
+        cache.get_backend().clear()
+        stats, peak_kept, peak_pool, kept, rebuilt = simulate(args, budget)
+        print(f"{label:<12}{peak_kept / MB:>9.1f} MB{peak_pool / MB:>14.1f} MB{stats['evicted']:>9}"
+              f"{stats['rebuilt']:>9}{ms(kept):>13}{ms(rebuilt):>15}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Time to first result versus time to complete for streamed parsing.
+
+    python -m benchmarks.streamed_results [--articles 2000] [--studies 2000] [--kbps 4000]
+
+A local stub server sends large PubMed and ClinicalTrials.gov payloads
+(benchmarks/fixtures.py) in 16 KB chunks, throttled to ``--kbps`` kilobytes
+per second to stand in for the network. Each payload is fetched two ways:
+
+- ``buffered``: download the whole body, then parse it (how the app used to
+  work). The first result is available only when everything is.
+- ``streamed``: feed the body to the pull parser as it arrives, the way
+  ``sources.pubmed_articles`` and ``sources.trials_search`` do now, timing
+  the first row passed to ``tables.row_listener``.
+"""
+import argparse
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks import fixtures
+from cancer_support import revalidation, tables
+
+CHUNK = 16 * 1024
+
+
+class ThrottledHandler(BaseHTTPRequestHandler):
+    payloads = {}
+    kbps = 4000
+
+    def do_GET(self):
+        body = self.payloads[self.path]
+        self.send_response(200)
+        self.send_header("Content-Type", "text/xml")
+        self.end_headers()
+        # No Content-Length: the body ends when the connection closes
+        for start in range(0, len(body), CHUNK):
+            self.wfile.write(body[start:start + CHUNK])
+            self.wfile.flush()
+            time.sleep(CHUNK / (self.kbps * 1024))
+
+    def log_message(self, *args):
+        pass
+
+
+def buffered(url, parse):
+    started = time.perf_counter()
+    table = parse(revalidation.get("stub", url, timeout=60).content)
+    elapsed = time.perf_counter() - started
+    return elapsed, elapsed, table.num_rows
+
+
+def streamed(url, parse):
+    first = []
+
+    def on_row(row):
+        if not first:
+            first.append(time.perf_counter())
+
+    started = time.perf_counter()
+    with tables.row_listener(on_row):
+        response = revalidation.get("stub", url, timeout=60, stream=True)
+        table = parse(revalidation.iter_body("stub", response))
+    return first[0] - started, time.perf_counter() - started, table.num_rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--articles", type=int, default=2000)
+    parser.add_argument("--studies", type=int, default=2000)
+    parser.add_argument("--kbps", type=float, default=4000)
+    args = parser.parse_args()
+
+    # Measure the transport, not the token bucket the stub would get as an unknown upstream
+    os.environ["ADMISSION"] = "off"
+    ThrottledHandler.payloads = {
+        "/efetch": fixtures.pubmed_xml(args.articles),
+        "/trials": fixtures.trials_xml(args.studies),
+    }
+    ThrottledHandler.kbps = args.kbps
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ThrottledHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+
+    cases = [
+        ("pubmed", "/efetch", tables.article_table, tables.article_stream_table),
+        ("trials", "/trials", tables.trial_table, tables.trial_stream_table),
+    ]
+    print(f"{'payload':<10}{'size':>10}  {'mode':<10}{'first result':>14}{'complete':>12}")
+    for name, path, parse, stream_parse in cases:
+        size = len(ThrottledHandler.payloads[path])
+        for mode, run, func in (("buffered", buffered, parse), ("streamed", streamed, stream_parse)):
+            first, complete, rows = run(base + path, func)
+            print(f"{name:<10}{size / 1e6:>8.1f}MB  {mode:<10}{first * 1000:>11.0f} ms{complete * 1000:>9.0f} ms"
+                  f"  ({rows:,} rows)")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+"""Micro-benchmarks for the app's hot paths, with committed baselines.
+
+    python -m benchmarks.suite run [--only parse]          # print timings
+    python -m benchmarks.suite compare [--threshold 0.25]  # exit 1 on regressions
+    python -m benchmarks.suite save                        # rewrite baselines.json
+
+Each case runs on deterministic fixture data (see fixtures.py) with upstream
+calls replayed from a temporary fixture store, so nothing touches the
+network. ``compare`` reruns the suite and flags any case whose best time, or
+any tracked size metric, is more than ``--threshold`` above
+benchmarks/baselines.json; cases that look slower are rerun once before
+being reported, since a single noisy run is common on shared runners.
+Baselines are only meaningful on the machine that recorded them, so refresh
+them with ``save`` when the CI runner changes.
+"""
+import argparse
+import fnmatch
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+BASELINES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "streamlit_app.py")
+
+CASES = {}
+
+
+def case(name, repeat=20, number=1):
+    """Register ``setup``; it returns ``(callable, metrics dict)``.
+
+    Like timeit, each of the ``repeat`` rounds calls the function ``number``
+    times, so sub-millisecond cases aren't swamped by timer and scheduler noise.
+    """
+    def decorator(setup):
+        CASES[name] = (setup, repeat, number)
+        return setup
+    return decorator
+
+
+@case("geocode_response", number=20)
+def geocode_response():
+    import requests
+    from benchmarks import fixtures
+    from cancer_support import sources, transport
+
+    store = transport.FixtureStore(os.environ["UPSTREAM_FIXTURES"])
+    request = requests.Request(
+        "GET", sources.NOMINATIM_URL, params={"q": "New York", "format": "json", "limit": 1}
+    ).prepare()
+    body = fixtures.nominatim_json("New York")
+    store.save(request, transport.build_response(request, 200, {"Content-Type": "application/json"}, body))
+    return lambda: sources.geocode.uncached("New York"), {}
+
+
+@case("overpass_extract")
+def overpass_extract():
+    from benchmarks.overpass_payload import synthetic_elements
+    from cancer_support import tables
+
+    _, body = synthetic_elements(2500)
+    return lambda: tables.hospital_table(json.loads(body)["elements"]), {"payload_bytes": len(body)}
+
+
+@case("overpass_dedupe")
+def overpass_dedupe():
+    from benchmarks.hospital_dedup import synthetic_elements
+    from cancer_support import dedup, tables
+
+    table = tables.hospital_table(synthetic_elements(1500))
+    return lambda: dedup.dedupe_hospitals(table), {}
+
+
+@case("cancer_center_join")
+def cancer_center_join():
+    from benchmarks.center_join import campuses, synthetic_table
+    from cancer_support import centers
+
+    table = synthetic_table(1500, campuses())
+    centers.get_index()
+    return lambda: centers.rank_hospitals(table), {}
+
+
+@case("folium_map", repeat=10)
+def folium_map():
+    import folium
+    from benchmarks.center_join import campuses, synthetic_table
+    from cancer_support import centers, maps
+
+    # Ranked like a real search, so the cancer centers get their purple markers
+    hospitals = centers.rank_hospitals(synthetic_table(300, campuses()))
+
+    def build():
+        # Rendered the way folium_static does
+        return folium.Figure().add_child(maps.hospital_map(40.7, -74.0, hospitals)).render()
+
+    return build, {"html_bytes": len(build())}
+
+
+@case("pubmed_parse")
+def pubmed_parse():
+    from benchmarks import fixtures
+    from cancer_support import tables
+
+    xml = fixtures.pubmed_xml(200)
+    return lambda: tables.article_table(xml), {"payload_bytes": len(xml)}
+
+
+@case("trials_parse")
+def trials_parse():
+    from benchmarks import fixtures
+    from cancer_support import tables
+
+    xml = fixtures.trials_xml(200)
+    return lambda: tables.trial_table(xml), {"payload_bytes": len(xml)}
+
+
+@case("pubmed_stream_parse")
+def pubmed_stream_parse():
+    from benchmarks import fixtures
+    from cancer_support import tables
+
+    xml = fixtures.pubmed_xml(200)
+    chunks = [xml[start:start + 16384] for start in range(0, len(xml), 16384)]
+    return lambda: tables.article_stream_table(chunks), {}
+
+
+@case("calculator_scenarios", number=200)
+def calculator_scenarios():
+    import numpy as np
+    from cancer_support import finance
+
+    def run():
+        # What the Financial Support page computes on each input change
+        withdrawals = np.linspace(0, 20000, 81)
+        incomes = np.linspace(0, 100000, 81)
+        finance.scenarios([50000], withdrawals, penalty=False)
+        finance.scenarios(incomes, [10000], penalty=False)
+        finance.scenarios([50000], [10000], ["Single"], penalty=False)
+
+    return run, {}
+
+
+def _app_page(page):
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(APP_PATH, default_timeout=60)
+    app.run()
+    app.sidebar.radio[0].set_value(page).run()
+    return app
+
+
+@case("checklist_form", repeat=5)
+def checklist_form():
+    app = _app_page("Interactive Tools & Extras")
+
+    def submit():
+        app.multiselect[0].set_value(["Apply for insurance", "Fill out tax forms"])
+        app.multiselect[1].set_value(["Chemotherapy session"])
+        app.button[0].click().run()
+
+    return submit, {}
+
+
+@case("calculator_form", repeat=5)
+def calculator_form():
+    app = _app_page("Financial Support")
+    values = iter(range(10**9))
+
+    def change():
+        app.number_input[0].set_value(40000 + next(values)).run()
+
+    return change, {}
+
+
+def _environment():
+    # Upstream calls are replayed and background work is off while measuring
+    os.environ["UPSTREAM_MODE"] = "replay"
+    os.environ.setdefault("UPSTREAM_FIXTURES", tempfile.mkdtemp(prefix="bench-fixtures-"))
+    os.environ["CACHE_WARMER"] = "off"
+    os.environ["PROFILE"] = "off"
+    os.environ.setdefault("RETRIEVAL_PATH", os.path.join(tempfile.mkdtemp(prefix="bench-"), "retrieval.sqlite3"))
+    os.environ.setdefault("ALERTS_PATH", os.path.join(tempfile.mkdtemp(prefix="bench-"), "alerts.sqlite3"))
+
+
+def run_suite(only=None):
+    _environment()
+    results = {}
+    for name, (setup, repeat, number) in CASES.items():
+        if only and not any(fnmatch.fnmatch(name, f"*{pattern}*") for pattern in only):
+            continue
+        func, metrics = setup()
+        func()  # warm-up run: first-use imports and caches
+        timings = []
+        # Like timeit, keep the collector from landing in random rounds
+        gc.collect()
+        gc.disable()
+        try:
+            for _ in range(repeat):
+                started = time.perf_counter()
+                for _ in range(number):
+                    func()
+                timings.append((time.perf_counter() - started) / number)
+        finally:
+            gc.enable()
+        results[name] = {
+            "median_s": statistics.median(timings),
+            "min_s": min(timings),
+            "repeat": repeat,
+            "number": number,
+            "metrics": metrics,
+        }
+        print(f"{name:<24}{results[name]['median_s'] * 1000:>10.2f} ms"
+              + "".join(f"  {key}={value:,}" for key, value in metrics.items()))
+    return results
+
+
+def compare(results, baselines, threshold):
+    """Regression messages for results worse than baseline by more than ``threshold``."""
+    regressions = []
+    for name, result in results.items():
+        baseline = baselines.get(name)
+        if baseline is None:
+            print(f"{name:<24} no baseline")
+            continue
+        # The fastest round is the least disturbed by other load on the machine
+        ratio = result["min_s"] / baseline["min_s"]
+        flag = " REGRESSION" if ratio > 1 + threshold else ""
+        print(f"{name:<24}{baseline['min_s'] * 1000:>10.2f} ms ->{result['min_s'] * 1000:>10.2f} ms"
+              f"  ({ratio - 1:+.0%}){flag}")
+        if flag:
+            regressions.append(f"{name}: {ratio - 1:+.0%} time")
+        for key, value in result["metrics"].items():
+            before = baseline.get("metrics", {}).get(key)
+            if before and value > before * (1 + threshold):
+                print(f"{'':<24}{key}: {before:,} -> {value:,} REGRESSION")
+                regressions.append(f"{name}: {key} {before:,} -> {value:,}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("command", choices=["run", "compare", "save"])
+    parser.add_argument("--only", nargs="*", help="run cases whose name contains any of these")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown, e.g. 0.25 for 25%%")
+    parser.add_argument("--baselines", default=BASELINES_PATH)
+    args = parser.parse_args()
+
+    results = run_suite(args.only)
+    if args.command == "save":
+        # --only updates just those cases and keeps the rest
+        cases = {}
+        if os.path.exists(args.baselines):
+            with open(args.baselines, encoding="utf-8") as f:
+                cases = json.load(f)["cases"]
+        cases.update(results)
+        with open(args.baselines, "w", encoding="utf-8") as f:
+            json.dump({
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "cases": cases,
+            }, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Saved {len(results)} baselines to {args.baselines}")
+    elif args.command == "compare":
+        with open(args.baselines, encoding="utf-8") as f:
+            baselines = json.load(f)["cases"]
+        print()
+        regressions = compare(results, baselines, args.threshold)
+        if regressions:
+            # Rerun the flagged cases once and keep the better time, so one
+            # noisy run on a shared machine doesn't fail the gate
+            flagged = sorted({message.split(":")[0] for message in regressions})
+            print(f"\nConfirming {', '.join(flagged)}")
+            for name, result in run_suite(flagged).items():
+                if name in flagged and result["min_s"] < results[name]["min_s"]:
+                    results[name] = result
+            print()
+            regressions = compare({name: results[name] for name in flagged}, baselines, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) above {args.threshold:.0%}")
+            sys.exit(1)
+        print(f"\nNo regressions above {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
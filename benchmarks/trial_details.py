@@ -0,0 +1,111 @@
+"""Loading full trial records up front versus when a card is opened.
+
+    python -m benchmarks.trial_details [--trials 20] [--opens 3] [--latency 0.3] [--think 2]
+
+A local stub serves ClinicalTrials.gov v2 study records
+(``fixtures.trial_record_json``) after ``--latency`` seconds, through
+``revalidation.get()`` and admission control, at the ``clinicaltrials`` rate. Two ways to show ``--trials`` search
+results are compared:
+
+- ``eager``: every record is fetched, four at a time, before the results
+  are shown.
+- ``lazy``: a user opens ``--opens`` cards in order, ``--think`` seconds
+  apart. Each open fetches its record (or finds it cached), then
+  ``service.prefetch_trial_details`` fetches the next cards' records in the
+  background.
+
+For each way it reports the requests made, the bytes downloaded, the wait
+before the results appear and the wait for each opened card.
+"""
+import argparse
+import concurrent.futures
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks import fixtures
+from cancer_support import admission, cache, service, sources
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+    requests = 0
+    bytes = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        nct = int(self.path.split("?")[0].rsplit("NCT", 1)[1])
+        body = fixtures.trial_record_json(nct)
+        with self.lock:
+            StubHandler.requests += 1
+            StubHandler.bytes += len(body)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def open_card(nct_id):
+    started = time.perf_counter()
+    with admission.identity("bench", "interactive"):
+        service.trial_details(nct_id)
+    return time.perf_counter() - started
+
+
+def eager(nct_ids, args):
+    started = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=4) as pool:
+        list(pool.map(open_card, nct_ids))
+    shown = time.perf_counter() - started
+    opens = []
+    for nct_id in nct_ids[:args.opens]:
+        time.sleep(args.think)
+        opens.append(open_card(nct_id))
+    return shown, opens
+
+
+def lazy(nct_ids, args):
+    opens = []
+    for row, nct_id in enumerate(nct_ids[:args.opens]):
+        time.sleep(args.think)
+        opens.append(open_card(nct_id))
+        service.prefetch_trial_details(nct_ids[row + 1:row + 1 + service.PREFETCH_TRIALS])
+    # Let the last prefetches finish, so their requests are counted
+    time.sleep(args.latency + 1)
+    return 0.0, opens
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--trials", type=int, default=20)
+    parser.add_argument("--opens", type=int, default=3, help="cards the user opens")
+    parser.add_argument("--latency", type=float, default=0.3, help="stub response time (s)")
+    parser.add_argument("--think", type=float, default=2.0, help="seconds between opens")
+    args = parser.parse_args()
+
+    os.environ["UPSTREAM_MODE"] = "live"
+    admission.reset()
+    StubHandler.latency = args.latency
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    sources.TRIAL_URL = f"http://127.0.0.1:{server.server_address[1]}/api/v2/studies/{{nct_id}}"
+    nct_ids = [f"NCT{i:08d}" for i in range(args.trials)]
+
+    print(f"{'mode':<8}{'requests':>9}{'downloaded':>12}{'results after':>15}  card waits")
+    for name, run in (("eager", eager), ("lazy", lazy)):
+        cache.get_backend().clear()
+        StubHandler.requests = StubHandler.bytes = 0
+        shown, opens = run(nct_ids, args)
+        waits = ", ".join(f"{wait * 1000:.0f} ms" for wait in opens)
+        print(f"{name:<8}{StubHandler.requests:>9}{StubHandler.bytes / 1024:>9.0f} KB{shown:>14.2f}s  {waits}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""Helpers shared by the Cancer Support Streamlit app."""
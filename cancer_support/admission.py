@@ -0,0 +1,293 @@
+"""Admission control for upstream requests: token buckets with fair queuing.
+
+Nominatim's usage policy allows about one request per second, and Overpass
+throttles heavy users, so a few busy sessions could use up the quota every
+session shares. Every ``revalidation.get()`` call first goes through
+``acquire(upstream)``:
+
+- Each upstream has a token bucket (``RATES``: requests per second and
+  burst), overridable with ``ADMISSION_RATE_<UPSTREAM>=rate[/burst]``.
+- Requests that can't go at once wait in a queue with two lanes. The
+  ``interactive`` lane is for script threads, where a user is waiting on a
+  cache miss or revalidation. The ``background`` lane is for threads without
+  a Streamlit session, such as the cache warmer. Interactive requests go
+  first.
+- Within a lane, sessions take turns (round robin), so one session's burst
+  of searches can't starve the others.
+- A request is rejected with ``Rejected`` (carrying the estimated wait)
+  instead of queued when its estimated wait exceeds ``ADMISSION_MAX_WAIT``
+  seconds for its lane (default 20 interactive, 300 background).
+
+With ``ADMISSION_SHARED=on`` and the SQLite cache backend, every admitted
+request also claims a numbered time slot in the shared cache. That holds all
+replicas on the host to the same rate together. The wait for a slot comes out
+of the same ``ADMISSION_MAX_WAIT`` budget, so a request that would wait too
+long for one is rejected too (``shared_rejected`` in ``stats()``).
+
+Set ``ADMISSION=off`` to disable admission control; replay mode never uses
+it.
+"""
+import contextlib
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+
+import requests
+
+# (requests per second, burst) per upstream
+RATES = {
+    "nominatim": (1.0, 1),
+    "overpass": (0.5, 2),
+    "pubmed": (3.0, 3),
+    "clinicaltrials": (2.0, 4),
+}
+
+# Upstreams without an entry above
+DEFAULT_RATE = (2.0, 2)
+
+LANES = ("interactive", "background")
+
+MAX_WAIT = {"interactive": 20.0, "background": 300.0}
+
+_local = threading.local()
+
+
+class Rejected(requests.exceptions.RequestException):
+    """The upstream's queue is too long; ``wait`` is the estimated wait in seconds."""
+
+    def __init__(self, upstream, wait):
+        super().__init__(f"{upstream} is busy; estimated wait {wait:.0f}s")
+        self.upstream = upstream
+        self.wait = wait
+
+
+def _setting(name, default):
+    return os.environ.get(name, default)
+
+
+def enabled():
+    from cancer_support.transport import upstream_mode
+
+    return _setting("ADMISSION", "on").lower() not in ("off", "0", "false") and upstream_mode() != "replay"
+
+
+def rate_for(upstream):
+    """``(rate, burst)`` for an upstream, after environment overrides."""
+    override = _setting(f"ADMISSION_RATE_{upstream.upper()}", "")
+    if override:
+        rate, _, burst = override.partition("/")
+        return float(rate), int(burst or 1)
+    return RATES.get(upstream, DEFAULT_RATE)
+
+
+@contextlib.contextmanager
+def identity(session, lane="interactive"):
+    """Attribute the requests made inside the block to ``session`` in ``lane``."""
+    previous = getattr(_local, "identity", None)
+    _local.identity = (session, lane)
+    try:
+        yield
+    finally:
+        _local.identity = previous
+
+
+def current_identity():
+    """``(session, lane)`` for the calling thread."""
+    explicit = getattr(_local, "identity", None)
+    if explicit is not None:
+        return explicit
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+        ctx = get_script_run_ctx(suppress_warning=True)
+    except Exception:
+        ctx = None
+    if ctx is not None:
+        return ctx.session_id, "interactive"
+    return threading.current_thread().name, "background"
+
+
+class Scheduler:
+    """Token bucket for one upstream, with per-lane round-robin queues of sessions."""
+
+    def __init__(self, upstream, rate, burst, clock=time.monotonic):
+        self.upstream = upstream
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.tokens = float(burst)
+        self.updated = clock()
+        self.cond = threading.Condition()
+        # lane -> OrderedDict(session -> deque of tickets); the first session is next
+        self.queues = {lane: OrderedDict() for lane in LANES}
+        self.admitted = 0
+        self.rejected = 0
+        self.shared_rejected = 0
+        self.waited = 0.0
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def _head(self):
+        for lane in LANES:
+            queue = self.queues[lane]
+            if queue:
+                session, tickets = next(iter(queue.items()))
+                return lane, session, tickets[0]
+        return None
+
+    def _ahead(self, session, lane):
+        """Tickets that would be served before a new one from ``session`` in ``lane``."""
+        ahead = 0
+        for higher in LANES[:LANES.index(lane)]:
+            ahead += sum(len(tickets) for tickets in self.queues[higher].values())
+        queue = self.queues[lane]
+        # Round robin: every other session gets a turn for each of ours
+        own = len(queue.get(session, ()))
+        ahead += own + sum(min(len(tickets), own + 1) for other, tickets in queue.items() if other != session)
+        return ahead
+
+    def estimate(self, session, lane="interactive"):
+        """Seconds a new request from ``session`` would wait."""
+        with self.cond:
+            self._refill()
+            return self._estimate(session, lane)
+
+    def _estimate(self, session, lane):
+        needed = self._ahead(session, lane) + 1 - self.tokens
+        return max(needed, 0.0) / self.rate
+
+    def acquire(self, session, lane="interactive", max_wait=None):
+        """Block until this request may go; returns the seconds waited."""
+        started = self.clock()
+        with self.cond:
+            self._refill()
+            if max_wait is not None:
+                wait = self._estimate(session, lane)
+                if wait > max_wait:
+                    self.rejected += 1
+                    raise Rejected(self.upstream, wait)
+            ticket = object()
+            queue = self.queues[lane]
+            queue.setdefault(session, deque()).append(ticket)
+            try:
+                while True:
+                    self._refill()
+                    if self._head()[2] is not ticket:
+                        # Woken when a request ahead of us is admitted
+                        self.cond.wait()
+                        continue
+                    if self.tokens < 1:
+                        self.cond.wait((1 - self.tokens) / self.rate)
+                        continue
+                    self.tokens -= 1
+                    self.admitted += 1
+                    return self.clock() - started
+            finally:
+                # Admitted or not (e.g. the script was stopped), the ticket leaves the queue
+                queue[session].remove(ticket)
+                if not queue[session]:
+                    del queue[session]
+                else:
+                    # Our turn is used: go to the back of the lane's rotation
+                    queue.move_to_end(session)
+                self.waited += self.clock() - started
+                self.cond.notify_all()
+
+    def count_shared_rejection(self):
+        """A request admitted here found no shared slot within what was left of its wait budget."""
+        with self.cond:
+            self.rejected += 1
+            self.shared_rejected += 1
+
+    def stats(self):
+        with self.cond:
+            self._refill()
+            return {
+                "rate": self.rate,
+                "burst": self.burst,
+                "tokens": self.tokens,
+                "queued": {lane: sum(len(t) for t in queue.values()) for lane, queue in self.queues.items()},
+                "sessions_waiting": len({s for queue in self.queues.values() for s in queue}),
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+                "shared_rejected": self.shared_rejected,
+                "mean_wait": self.waited / self.admitted if self.admitted else 0.0,
+                "estimated_wait": self._estimate(None, "interactive"),
+            }
+
+
+_schedulers = {}
+_schedulers_lock = threading.Lock()
+
+
+def get_scheduler(upstream):
+    with _schedulers_lock:
+        scheduler = _schedulers.get(upstream)
+        if scheduler is None:
+            scheduler = _schedulers[upstream] = Scheduler(upstream, *rate_for(upstream))
+        return scheduler
+
+
+def _claim_shared_slot(upstream, rate, max_wait):
+    """Claim the next free 1/rate time slot in the shared cache, then wait for it.
+
+    Raises ``Rejected`` instead when the first free slot is more than
+    ``max_wait`` seconds away.
+    """
+    from cancer_support import cache
+
+    backend = cache.get_backend()
+    now = time.time()
+    slot = math.floor(now * rate)
+    while slot / rate - now <= max_wait:
+        # Kept until well after its time, so nobody else can take a slot claimed ahead
+        if backend.add_raw(f"admission:{upstream}", str(slot), b"", ttl=slot / rate - now + 60):
+            delay = slot / rate - time.time()
+            if delay > 0:
+                time.sleep(delay)
+            return
+        slot += 1
+    raise Rejected(upstream, slot / rate - now)
+
+
+def acquire(upstream):
+    """Wait for a turn to call ``upstream``; raises ``Rejected`` if the wait would be too long."""
+    if not enabled():
+        return 0.0
+    session, lane = current_identity()
+    max_wait = float(_setting(f"ADMISSION_MAX_WAIT_{lane.upper()}", MAX_WAIT[lane]))
+    scheduler = get_scheduler(upstream)
+    waited = scheduler.acquire(session, lane, max_wait=max_wait)
+    if _setting("ADMISSION_SHARED", "off").lower() in ("on", "1", "true"):
+        # The in-process wait counts against the same budget
+        started = time.monotonic()
+        try:
+            _claim_shared_slot(upstream, scheduler.rate, max_wait - waited)
+        except Rejected:
+            scheduler.count_shared_rejection()
+            raise
+        waited += time.monotonic() - started
+    return waited
+
+
+def estimate(upstream):
+    """Estimated seconds a new request from the calling session would wait for ``upstream``."""
+    session, lane = current_identity()
+    return get_scheduler(upstream).estimate(session, lane)
+
+
+def stats():
+    """``{upstream: {...}}`` queue lengths, admissions, rejections and waits."""
+    with _schedulers_lock:
+        schedulers = list(_schedulers.values())
+    return {scheduler.upstream: scheduler.stats() for scheduler in schedulers}
+
+
+def reset():
+    with _schedulers_lock:
+        _schedulers.clear()
@@ -0,0 +1,281 @@
+"""Incremental "Stay Informed" research alerts.
+
+Subscribers are grouped by their normalized search term, so each run makes one
+PubMed esearch per *distinct* term (paged when there are many results),
+limited to articles added since that term's high-water mark. Only PMIDs the
+term hasn't seen before are fetched, in batched efetch calls shared by all
+terms, and every subscriber gets one digest email covering all of their terms.
+Upstream cost grows with the number of distinct terms, not the number of
+subscribers. Digests go through an outbox table, so a run that fails while
+sending resumes where it stopped instead of mailing anyone twice.
+
+Run it from cron (or any scheduler):
+
+    python -m cancer_support.alerts run
+
+Mail goes to ``SMTP_HOST``:``SMTP_PORT`` (default ``localhost:1025``, where a
+local stand-in such as ``python -m aiosmtpd -n -l localhost:1025`` can listen).
+Subscriptions live in the SQLite file at ``ALERTS_PATH``.
+"""
+import argparse
+import contextlib
+import datetime
+import logging
+import os
+import re
+import smtplib
+import sqlite3
+import time
+from collections import defaultdict
+from email.mime.text import MIMEText
+
+from cancer_support import gazetteer, sources
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), ".data", "alerts.sqlite3")
+SENDER = os.environ.get("ALERTS_SENDER", "alerts@cancer-support.local")
+
+# efetch accepts a few hundred IDs per GET comfortably
+EFETCH_BATCH = 200
+
+_EMAIL = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+
+def valid_email(email):
+    return bool(_EMAIL.match(email.strip()))
+
+
+def connect(path=None):
+    path = path or os.environ.get("ALERTS_PATH", DEFAULT_PATH)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS terms (
+            term_key TEXT PRIMARY KEY,
+            term TEXT NOT NULL,
+            high_water TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS subscriptions (
+            email TEXT NOT NULL,
+            term_key TEXT NOT NULL REFERENCES terms (term_key),
+            created_at REAL NOT NULL,
+            PRIMARY KEY (email, term_key)
+        );
+        CREATE INDEX IF NOT EXISTS subscriptions_by_term ON subscriptions (term_key);
+        CREATE TABLE IF NOT EXISTS outbox (
+            id INTEGER PRIMARY KEY,
+            email TEXT NOT NULL,
+            subject TEXT NOT NULL,
+            body TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS seen (
+            term_key TEXT NOT NULL,
+            pmid TEXT NOT NULL,
+            seen_on TEXT,
+            PRIMARY KEY (term_key, pmid)
+        ) WITHOUT ROWID;
+        """
+    )
+    # Files made before seen_on was added
+    if "seen_on" not in {row[1] for row in conn.execute("PRAGMA table_info(seen)")}:
+        conn.execute("ALTER TABLE seen ADD COLUMN seen_on TEXT")
+    return conn
+
+
+def _today():
+    return datetime.date.today().strftime("%Y/%m/%d")
+
+
+def subscribe(conn, email, term):
+    """Add a subscription; returns False if it already existed."""
+    email = email.strip().lower()
+    term_key = gazetteer.normalize(term)
+    with conn:
+        # A new term starts from today, so the first digest isn't years of backlog
+        conn.execute(
+            "INSERT OR IGNORE INTO terms (term_key, term, high_water) VALUES (?, ?, ?)",
+            (term_key, term.strip(), _today()),
+        )
+        cursor = conn.execute(
+            "INSERT OR IGNORE INTO subscriptions (email, term_key, created_at) VALUES (?, ?, ?)",
+            (email, term_key, time.time()),
+        )
+    return cursor.rowcount == 1
+
+
+def unsubscribe(conn, email, term=None):
+    """Remove one subscription, or all of an address's subscriptions."""
+    email = email.strip().lower()
+    with conn:
+        if term is None:
+            cursor = conn.execute("DELETE FROM subscriptions WHERE email = ?", (email,))
+        else:
+            cursor = conn.execute(
+                "DELETE FROM subscriptions WHERE email = ? AND term_key = ?", (email, gazetteer.normalize(term))
+            )
+        # Terms nobody follows any more stop costing upstream calls
+        conn.execute("DELETE FROM terms WHERE term_key NOT IN (SELECT term_key FROM subscriptions)")
+        conn.execute("DELETE FROM seen WHERE term_key NOT IN (SELECT term_key FROM terms)")
+    return cursor.rowcount
+
+
+def new_pmids(conn, until):
+    """One esearch per distinct term since its high-water mark -> {term_key: [new pmids]}."""
+    found = {}
+    for term_key, term, high_water in conn.execute("SELECT term_key, term, high_water FROM terms").fetchall():
+        try:
+            pmids = sources.pubmed_search_since(term, high_water, until)
+        except Exception as e:
+            logger.warning("Alert search failed for %r: %s", term, e)
+            continue
+        seen = {
+            row[0]
+            for row in conn.execute(
+                f"SELECT pmid FROM seen WHERE term_key = ? AND pmid IN ({','.join('?' * len(pmids))})",
+                (term_key, *pmids),
+            )
+        } if pmids else set()
+        found[term_key] = [pmid for pmid in pmids if pmid not in seen]
+    return found
+
+
+def fetch_articles(pmids):
+    """Article rows for every PMID, fetched in shared efetch batches."""
+    unique = sorted(set(pmids))
+    articles = {}
+    for start in range(0, len(unique), EFETCH_BATCH):
+        table = sources.pubmed_articles(unique[start:start + EFETCH_BATCH])
+        for row in table.to_pylist():
+            articles[row["PMID"]] = row
+    return articles
+
+
+def render_section(term, articles):
+    """Digest text for one term (rendered once and shared by its subscribers)."""
+    lines = [f"{term}\n{'=' * len(term)}"]
+    for article in articles:
+        lines.append(f"- {article['Title']} ({article['Journal']}, {article['Published']})\n  {article['Link']}")
+    return "\n".join(lines) + "\n"
+
+
+def digest_text(sections):
+    """``(subject, body)`` of a digest; ``sections`` is a list of ``(rendered section, article count)``."""
+    count = sum(n for _, n in sections)
+    body = "\n".join(text for text, _ in sections)
+    body += "\nYou are receiving this because you subscribed on the Cancer Support App.\n"
+    return f"{count} new research article{'s' if count != 1 else ''} for you", body
+
+
+def build_digest(email, subject, body):
+    # MIMEText with the compat32 policy is many times faster to build than
+    # EmailMessage, which matters at tens of thousands of digests per run
+    message = MIMEText(body, "plain", "utf-8")
+    message["From"] = SENDER
+    message["To"] = email
+    message["Subject"] = subject
+    return message
+
+
+def deliver(conn, smtp=None):
+    """Send the digests waiting in the outbox, removing each once sent; returns how many were sent.
+
+    An SMTP error stops delivery and leaves the rest queued for the next run.
+    """
+    pending = conn.execute("SELECT id, email, subject, body FROM outbox ORDER BY id").fetchall()
+    if not pending:
+        return 0
+    close = smtp is None
+    if smtp is None:
+        smtp = smtplib.SMTP(os.environ.get("SMTP_HOST", "localhost"), int(os.environ.get("SMTP_PORT", 1025)))
+    sent = 0
+    try:
+        for digest_id, email, subject, body in pending:
+            smtp.send_message(build_digest(email, subject, body))
+            with conn:
+                conn.execute("DELETE FROM outbox WHERE id = ?", (digest_id,))
+            sent += 1
+    finally:
+        if close:
+            smtp.quit()
+    return sent
+
+
+def run(conn, smtp=None):
+    """Run one alert cycle; returns ``(distinct terms searched, digests sent)``.
+
+    Digests are queued in the outbox in the same transaction that records
+    their PMIDs as seen and advances the terms' high-water marks, and only
+    then sent. If sending stops partway (an SMTP error, or the process
+    dying), the next run first sends what is still queued. Nobody is mailed
+    the same articles twice, and no digest is lost.
+    """
+    # Left over from a run that didn't finish sending; a failure here stops
+    # the run before anything new is queued
+    sent = deliver(conn, smtp)
+
+    until = _today()
+    per_term = new_pmids(conn, until)
+    articles = fetch_articles(pmid for pmids in per_term.values() for pmid in pmids)
+    terms = dict(conn.execute("SELECT term_key, term FROM terms").fetchall())
+
+    sections = {}
+    for term_key, pmids in per_term.items():
+        rows = [articles[pmid] for pmid in pmids if pmid in articles]
+        if rows:
+            sections[term_key] = (render_section(terms[term_key], rows), len(rows))
+
+    # Fan the per-term results back out, one digest per subscriber
+    digests = defaultdict(list)
+    fresh_terms = list(sections)
+    for start in range(0, len(fresh_terms), 500):
+        batch = fresh_terms[start:start + 500]
+        subscriptions = conn.execute(
+            f"SELECT email, term_key FROM subscriptions WHERE term_key IN ({','.join('?' * len(batch))})"
+            " ORDER BY email",
+            batch,
+        )
+        for email, term_key in subscriptions:
+            digests[email].append(sections[term_key])
+
+    # Only advance terms whose search succeeded; PMIDs are remembered so the
+    # overlapping day at the high-water mark isn't mailed twice. PMIDs seen
+    # before the new mark can't come back from a search starting at it, so
+    # they are dropped and the table stays about one day's results per term.
+    with conn:
+        conn.executemany(
+            "INSERT INTO outbox (email, subject, body) VALUES (?, ?, ?)",
+            [(email, *digest_text(parts)) for email, parts in digests.items()],
+        )
+        for term_key, pmids in per_term.items():
+            conn.executemany(
+                "INSERT OR IGNORE INTO seen (term_key, pmid, seen_on) VALUES (?, ?, ?)",
+                [(term_key, pmid, until) for pmid in pmids],
+            )
+            conn.execute("UPDATE terms SET high_water = ? WHERE term_key = ?", (until, term_key))
+            conn.execute("DELETE FROM seen WHERE term_key = ? AND (seen_on IS NULL OR seen_on < ?)", (term_key, until))
+    return len(per_term), sent + deliver(conn, smtp)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Research alert digests")
+    parser.add_argument("command", choices=["run", "stats"])
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    with contextlib.closing(connect()) as conn:
+        if args.command == "run":
+            terms, sent = run(conn)
+            logger.info("Searched %d distinct terms, sent %d digests", terms, sent)
+        else:
+            subscribers = conn.execute("SELECT COUNT(DISTINCT email) FROM subscriptions").fetchone()[0]
+            terms = conn.execute("SELECT COUNT(*) FROM terms").fetchone()[0]
+            print(f"{subscribers} subscribers, {terms} distinct terms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+"""Headless JSON API for the hospital, research and trial searches.
+
+    uvicorn cancer_support.api:app --port 8600
+
+Partner apps get the same results as the pages without paying for a
+Streamlit script rerun per request. Handlers run ``service.py`` in worker
+threads, so they share this process's cache (or, with ``CACHE_BACKEND=sqlite``,
+the app replicas' cache), pooled HTTP sessions and admission control. Each
+client gets its own admission queue in the interactive lane. A client is
+identified by its ``X-Client-Id`` header, or else its address.
+
+    GET  /hospitals?location=...&oncology_only=true&max_minutes=30
+    POST /hospitals  {"locations": [...], "oncology_only": false, "max_minutes": 30}
+    GET  /research?term=...
+    POST /research   {"terms": [...]}
+    GET  /trials?cancer_type=...&location=...&phase=All
+    POST /trials     {"searches": [{"cancer_type": ..., "location": ..., "phase": ...}]}
+    GET  /trials/{nct_id}
+    GET  /health
+
+A batch (POST) takes up to ``API_MAX_BATCH`` items (default 50) and runs them
+concurrently. It answers with one result per item, in order. An item that
+fails carries ``error`` and ``status`` fields instead of failing the batch.
+A search turned away by admission control answers 503 with ``Retry-After``.
+
+    GET  /export/hospitals?q=Boston&q=Chicago&format=geojson
+    POST /export/trials  {"queries": [...], "location": ..., "phase": ..., "format": "parquet"}
+
+An export streams one CSV, Parquet or GeoJSON file with the results of up to
+``API_MAX_EXPORT`` searches (default 500), as export.py describes.
+"""
+import asyncio
+import contextlib
+import json
+import logging
+import math
+import os
+
+import requests
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+from cancer_support import admission, export, revalidation, service, warmer
+
+logger = logging.getLogger(__name__)
+
+MAX_BATCH = int(os.environ.get("API_MAX_BATCH", 50))
+
+MAX_EXPORT = int(os.environ.get("API_MAX_EXPORT", 500))
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def hospitals(location, oncology_only=False, max_minutes=None):
+    warmer.record("hospitals", location)
+    coords, table = service.find_hospitals(location, oncology_only=oncology_only, max_minutes=max_minutes)
+    return {"location": location, "lat": coords["lat"], "lon": coords["lon"], "hospitals": table.to_pylist()}
+
+
+def research(term):
+    warmer.record("research", term)
+    return {"term": term, "articles": service.latest_research(term).to_pylist()}
+
+
+def trials(cancer_type, location, phase="All"):
+    warmer.record("trials", cancer_type, location, phase)
+    table = service.find_trials(cancer_type, location, phase)
+    return {"cancer_type": cancer_type, "location": location, "phase": phase, "trials": table.to_pylist()}
+
+
+def trial(nct_id):
+    return service.trial_details(nct_id)
+
+
+def run_search(client, search, args):
+    """``(status, body)`` for one search made on behalf of ``client``."""
+    try:
+        with admission.identity(f"api:{client}", "interactive"):
+            return 200, search(*args)
+    except service.LocationNotFound:
+        return 404, {"error": "location not found"}
+    except admission.Rejected as e:
+        return 503, {"error": "busy", "retry_after": math.ceil(e.wait)}
+    except requests.exceptions.RequestException as e:
+        logger.warning("Upstream request failed for %s%r: %s", search.__name__, args, e)
+        return 502, {"error": "upstream request failed"}
+    except Exception:
+        logger.exception("Search failed for %s%r", search.__name__, args)
+        return 500, {"error": "search failed"}
+
+
+def client_id(request):
+    return request.headers.get("x-client-id") or (request.client.host if request.client else "anonymous")
+
+
+def respond(status, body):
+    headers = {"Retry-After": str(body["retry_after"])} if status == 503 else None
+    return JSONResponse(body, status_code=status, headers=headers)
+
+
+async def single(request, search, args):
+    status, body = await run_in_threadpool(run_search, client_id(request), search, args)
+    return respond(status, body)
+
+
+async def batch(request, search, items):
+    """Run ``search`` once per distinct argument tuple, concurrently; results follow ``items``."""
+    if len(items) > MAX_BATCH:
+        raise BadRequest(f"at most {MAX_BATCH} items per request")
+    client = client_id(request)
+    distinct = list(dict.fromkeys(items))
+    outcomes = await asyncio.gather(*(run_in_threadpool(run_search, client, search, args) for args in distinct))
+    by_args = dict(zip(distinct, outcomes))
+    results = []
+    for args in items:
+        status, body = by_args[args]
+        results.append(body if status == 200 else dict(body, status=status))
+    return JSONResponse({"results": results})
+
+
+def text(value, name):
+    if not isinstance(value, str) or not value.strip():
+        raise BadRequest(f"{name} is required")
+    return value.strip()
+
+
+def flag(value):
+    if isinstance(value, bool):
+        return value
+    return str(value).lower() in ("1", "true", "yes", "on")
+
+
+def minutes_of(value):
+    if value is None or value == "":
+        return None
+    try:
+        minutes = float(value)
+    except (TypeError, ValueError):
+        minutes = 0
+    if not 0 < minutes <= 24 * 60:
+        raise BadRequest("max_minutes must be a number of minutes")
+    return minutes
+
+
+def phase_of(value):
+    value = value or "All"
+    if value not in service.PHASES:
+        raise BadRequest(f"phase must be one of: {', '.join(service.PHASES)}")
+    return value
+
+
+async def json_body(request):
+    try:
+        body = await request.json()
+    except json.JSONDecodeError:
+        raise BadRequest("request body must be JSON")
+    if not isinstance(body, dict):
+        raise BadRequest("request body must be a JSON object")
+    return body
+
+
+def items_of(body, name):
+    items = body.get(name)
+    if not isinstance(items, list) or not items:
+        raise BadRequest(f"{name} must be a non-empty list")
+    return items
+
+
+async def hospitals_endpoint(request):
+    if request.method == "GET":
+        params = request.query_params
+        args = (
+            text(params.get("location"), "location"),
+            flag(params.get("oncology_only", False)),
+            minutes_of(params.get("max_minutes")),
+        )
+        return await single(request, hospitals, args)
+    body = await json_body(request)
+    oncology_only = flag(body.get("oncology_only", False))
+    max_minutes = minutes_of(body.get("max_minutes"))
+    items = [(text(location, "location"), oncology_only, max_minutes) for location in items_of(body, "locations")]
+    return await batch(request, hospitals, items)
+
+
+async def research_endpoint(request):
+    if request.method == "GET":
+        return await single(request, research, (text(request.query_params.get("term"), "term"),))
+    body = await json_body(request)
+    return await batch(request, research, [(text(term, "term"),) for term in items_of(body, "terms")])
+
+
+def trial_args(search):
+    if not isinstance(search, dict):
+        raise BadRequest("each search must be an object")
+    return (
+        text(search.get("cancer_type"), "cancer_type"),
+        text(search.get("location"), "location"),
+        phase_of(search.get("phase")),
+    )
+
+
+async def trials_endpoint(request):
+    if request.method == "GET":
+        return await single(request, trials, trial_args(dict(request.query_params)))
+    body = await json_body(request)
+    return await batch(request, trials, [trial_args(search) for search in items_of(body, "searches")])
+
+
+async def trial_endpoint(request):
+    return await single(request, trial, (text(request.path_params["nct_id"], "nct_id").upper(),))
+
+
+async def export_endpoint(request):
+    kind = request.path_params["kind"]
+    if request.method == "GET":
+        params = request.query_params
+        body = {"queries": params.getlist("q"), **{name: params.get(name) for name in ("format", "location", "phase")}}
+    else:
+        body = await json_body(request)
+    queries = [text(query, "query") for query in items_of(body, "queries")]
+    if len(queries) > MAX_EXPORT:
+        raise BadRequest(f"at most {MAX_EXPORT} queries per export")
+    fmt = str(body.get("format") or "csv")
+    options = {}
+    if kind == "trials":
+        options = {"location": text(body.get("location"), "location"), "phase": phase_of(body.get("phase"))}
+    try:
+        chunks = export.export(kind, queries, fmt, session=f"api:{client_id(request)}", **options)
+    except ValueError as e:
+        raise BadRequest(str(e))
+    _, media_type, _ = export.FORMATS[fmt]
+    disposition = f'attachment; filename="{export.file_name(kind, fmt)}"'
+    # Starlette iterates the chunks in a worker thread as the client reads them
+    return StreamingResponse(chunks, media_type=media_type, headers={"Content-Disposition": disposition})
+
+
+async def health(request):
+    return JSONResponse({
+        "ok": True,
+        "warmer": warmer.state(),
+        "admission": admission.stats(),
+        "revalidation": revalidation.stats(),
+    })
+
+
+async def bad_request(request, exc):
+    return JSONResponse({"error": str(exc)}, status_code=400)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    # Keep default and popular searches warm, as the app does (once per process)
+    warmer.start()
+    yield
+
+
+app = Starlette(
+    routes=[
+        Route("/hospitals", hospitals_endpoint, methods=["GET", "POST"]),
+        Route("/research", research_endpoint, methods=["GET", "POST"]),
+        Route("/trials", trials_endpoint, methods=["GET", "POST"]),
+        Route("/trials/{nct_id}", trial_endpoint),
+        Route("/export/{kind}", export_endpoint, methods=["GET", "POST"]),
+        Route("/health", health),
+    ],
+    exception_handlers={BadRequest: bad_request},
+    lifespan=lifespan,
+)
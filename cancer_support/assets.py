@@ -0,0 +1,50 @@
+"""Locally served images.
+
+``scripts/build_assets.py`` turns the originals listed in
+``assets/manifest.json`` into resized PNG and WebP copies under
+``static/assets/``, which Streamlit serves at ``/app/static/assets/``.
+File names carry a hash of their content, so a URL never changes meaning and
+can be cached for as long as a proxy or browser likes. ``image_url`` picks
+the smallest variant at least as wide as requested. Until the build
+has been run, it returns the entry's remote ``url``, or None if it has none.
+"""
+import functools
+import json
+import os
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+MANIFEST_PATH = os.path.join(ROOT, "assets", "manifest.json")
+STATIC_DIR = os.path.join(ROOT, "static")
+OUTPUT_DIR = os.path.join(STATIC_DIR, "assets")
+INDEX_PATH = os.path.join(OUTPUT_DIR, "index.json")
+STATIC_URL = "/app/static/assets/"
+
+
+@functools.lru_cache(maxsize=None)
+def load_manifest(path=MANIFEST_PATH):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)["images"]
+
+
+@functools.lru_cache(maxsize=None)
+def load_index(path=INDEX_PATH):
+    """Built variants per image, or {} when the build hasn't been run."""
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def image_url(name, width=None, image_format="webp"):
+    """URL for image ``name`` at least ``width`` pixels wide (if such a variant exists)."""
+    variants = sorted(
+        (v for v in load_index().get(name, {}).get("variants", []) if v["format"] == image_format),
+        key=lambda v: v["width"],
+    )
+    if not variants:
+        return load_manifest()[name].get("url")
+    # Without a width, the largest copy; otherwise the smallest wide enough one
+    chosen = variants[-1]
+    if width is not None:
+        chosen = next((v for v in variants if v["width"] >= width), chosen)
+    return STATIC_URL + chosen["file"]
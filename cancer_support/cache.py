@@ -0,0 +1,370 @@
+"""Pluggable cache for upstream results.
+
+Two backends share one interface:
+
+- ``MemoryBackend``: an LRU dict inside the current process, bounded by entry
+  count and by total size (``CACHE_MEMORY_MB``, default 256).
+- ``SQLiteBackend``: a WAL-mode SQLite file on local disk, shared by every
+  Streamlit replica on the host and kept across deploys.
+
+Values are msgpack-encoded (result tables use Arrow IPC instead, see
+tables.py), keys are grouped into one namespace per upstream, and expiry is
+stored as an absolute wall-clock time so every replica agrees on when an
+entry goes stale. ``get_backend()`` picks the backend from ``CACHE_BACKEND``
+(``memory`` or ``sqlite``) and ``CACHE_PATH``.
+"""
+import functools
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import msgpack
+
+from cancer_support import revalidation
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), ".cache", "upstream.sqlite3")
+
+# Revalidating entries outlive their TTL by this many TTLs, so a stale body is
+# still there to fall back on when the upstream answers 304
+REVALIDATE_KEEP = 3
+
+
+def pack(value):
+    return msgpack.packb(value, use_bin_type=True)
+
+
+def unpack(data):
+    return msgpack.unpackb(data, raw=False)
+
+
+def make_key(*parts, **kwargs):
+    """Stable string key for a call's arguments."""
+    return json.dumps([parts, kwargs], sort_keys=True, separators=(",", ":"), default=str)
+
+
+class CacheBackend:
+    """Interface every cache backend implements."""
+
+    def get_raw(self, namespace, key):
+        """Return the packed bytes for a live entry, or None."""
+        raise NotImplementedError
+
+    def set_raw(self, namespace, key, data, ttl):
+        raise NotImplementedError
+
+    def add_raw(self, namespace, key, data, ttl):
+        """Store only if there is no live entry; return True if stored."""
+        raise NotImplementedError
+
+    def expires_at(self, namespace, key):
+        """Expiry time of a live entry, or None."""
+        raise NotImplementedError
+
+    def touch(self, namespace, key, ttl):
+        """Give a live entry ``ttl`` more seconds from now; return True if it existed."""
+        raise NotImplementedError
+
+    def delete(self, namespace, key):
+        raise NotImplementedError
+
+    def clear(self, namespace=None):
+        raise NotImplementedError
+
+    def get(self, namespace, key, default=None):
+        data = self.get_raw(namespace, key)
+        return default if data is None else unpack(data)
+
+    def set(self, namespace, key, value, ttl):
+        self.set_raw(namespace, key, pack(value), ttl)
+
+
+class MemoryBackend(CacheBackend):
+    def __init__(self, max_entries=2048, max_bytes=256 * 1024 * 1024):
+        self.max_entries = max_entries
+        # Entries range from a few bytes to megabytes (a PubMed result), so
+        # bound the total size too
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def _store(self, entry_key, data, expires_at):
+        old = self._entries.get(entry_key)
+        if old is not None:
+            self._bytes -= len(old[0])
+        self._entries[entry_key] = (data, expires_at)
+        self._entries.move_to_end(entry_key)
+        self._bytes += len(data)
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            self._drop(next(iter(self._entries)))
+
+    def _drop(self, entry_key):
+        data, _ = self._entries.pop(entry_key)
+        self._bytes -= len(data)
+
+    def get_raw(self, namespace, key):
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            if entry is None:
+                return None
+            data, expires_at = entry
+            if expires_at <= time.time():
+                self._drop((namespace, key))
+                return None
+            self._entries.move_to_end((namespace, key))
+            return data
+
+    def set_raw(self, namespace, key, data, ttl):
+        with self._lock:
+            self._store((namespace, key), data, time.time() + ttl)
+
+    def add_raw(self, namespace, key, data, ttl):
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            if entry is not None and entry[1] > time.time():
+                return False
+            self._store((namespace, key), data, time.time() + ttl)
+            return True
+
+    def expires_at(self, namespace, key):
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            if entry is None or entry[1] <= time.time():
+                return None
+            return entry[1]
+
+    def touch(self, namespace, key, ttl):
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            if entry is None or entry[1] <= time.time():
+                return False
+            self._entries[(namespace, key)] = (entry[0], time.time() + ttl)
+            self._entries.move_to_end((namespace, key))
+            return True
+
+    def delete(self, namespace, key):
+        with self._lock:
+            if (namespace, key) in self._entries:
+                self._drop((namespace, key))
+
+    def clear(self, namespace=None):
+        with self._lock:
+            if namespace is None:
+                self._entries.clear()
+                self._bytes = 0
+            else:
+                for entry_key in [k for k in self._entries if k[0] == namespace]:
+                    self._drop(entry_key)
+
+
+class SQLiteBackend(CacheBackend):
+    # Expired rows are purged roughly once per this many writes
+    PURGE_EVERY = 500
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " namespace TEXT NOT NULL,"
+            " key TEXT NOT NULL,"
+            " value BLOB NOT NULL,"
+            " expires_at REAL NOT NULL,"
+            " PRIMARY KEY (namespace, key)"
+            ") WITHOUT ROWID"
+        )
+        conn.commit()
+
+    def _conn(self):
+        # sqlite3 connections can't be shared across threads, so keep one per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get_raw(self, namespace, key):
+        row = self._conn().execute(
+            "SELECT value FROM cache WHERE namespace = ? AND key = ? AND expires_at > ?",
+            (namespace, key, time.time()),
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def set_raw(self, namespace, key, data, ttl):
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                (namespace, key, data, time.time() + ttl),
+            )
+        self._writes += 1
+        if self._writes % self.PURGE_EVERY == 0:
+            self.purge()
+
+    def add_raw(self, namespace, key, data, ttl):
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            # Only overwrite a row that has already expired
+            cursor = conn.execute(
+                "INSERT INTO cache (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)"
+                " ON CONFLICT (namespace, key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at"
+                " WHERE cache.expires_at <= ?",
+                (namespace, key, data, now + ttl, now),
+            )
+        return cursor.rowcount == 1
+
+    def expires_at(self, namespace, key):
+        row = self._conn().execute(
+            "SELECT expires_at FROM cache WHERE namespace = ? AND key = ? AND expires_at > ?",
+            (namespace, key, time.time()),
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def touch(self, namespace, key, ttl):
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            cursor = conn.execute(
+                "UPDATE cache SET expires_at = ? WHERE namespace = ? AND key = ? AND expires_at > ?",
+                (now + ttl, namespace, key, now),
+            )
+        return cursor.rowcount == 1
+
+    def delete(self, namespace, key):
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM cache WHERE namespace = ? AND key = ?", (namespace, key))
+
+    def clear(self, namespace=None):
+        conn = self._conn()
+        with conn:
+            if namespace is None:
+                conn.execute("DELETE FROM cache")
+            else:
+                conn.execute("DELETE FROM cache WHERE namespace = ?", (namespace,))
+
+    def purge(self):
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),))
+
+
+def make_backend(kind=None, path=None):
+    kind = (kind or os.environ.get("CACHE_BACKEND", "memory")).lower()
+    if kind == "memory":
+        return MemoryBackend(max_bytes=int(float(os.environ.get("CACHE_MEMORY_MB", 256)) * 1024 * 1024))
+    if kind == "sqlite":
+        return SQLiteBackend(path or os.environ.get("CACHE_PATH", DEFAULT_PATH))
+    raise ValueError(f"Unknown CACHE_BACKEND: {kind}")
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = make_backend()
+        return _backend
+
+
+class MsgpackCodec:
+    pack = staticmethod(pack)
+    unpack = staticmethod(unpack)
+
+
+def cached(namespace, ttl, codec=MsgpackCodec, revalidate=False):
+    """Cache a function's return value in ``namespace`` for ``ttl`` seconds.
+
+    ``codec`` turns values into bytes and back (msgpack by default).
+    ``None`` results are not cached, so a failed lookup is retried next time.
+    The wrapper also gets ``refresh()`` (fetch and store regardless of the
+    cache), ``key_for()`` and ``expires_at()``, which the cache warmer uses.
+
+    With ``revalidate=True`` the function must fetch through
+    ``revalidation.get()``. Stale entries are then kept for up to
+    ``REVALIDATE_KEEP`` times their TTL, along with the response's validators.
+    Refetching one sends a conditional request, and a 304 makes the old value
+    fresh again without parsing anything.
+    """
+    keep = ttl * (1 + REVALIDATE_KEEP) if revalidate else ttl
+    validators_namespace = f"{namespace}:validators"
+
+    def decorator(func):
+        def key_for(*args, **kwargs):
+            return make_key(func.__name__, *args, **kwargs)
+
+        def fetch(backend, key, stale, args, kwargs):
+            """Call ``func`` (conditionally, when a stale body is at hand) and store the result."""
+            validators = backend.get(validators_namespace, key) if revalidate and stale is not None else None
+            with revalidation.conditional(validators) as received:
+                try:
+                    value = func(*args, **kwargs)
+                except revalidation.NotModified:
+                    received = None
+            if received is None:
+                if backend.touch(namespace, key, keep):
+                    backend.set(validators_namespace, key, dict(validators, fresh_until=time.time() + ttl), keep)
+                    return codec.unpack(stale)
+                # The stale body expired in the meantime; fetch it in full
+                with revalidation.conditional() as received:
+                    value = func(*args, **kwargs)
+            if value is not None:
+                backend.set_raw(namespace, key, codec.pack(value), keep)
+                if revalidate:
+                    backend.set(validators_namespace, key, dict(received, fresh_until=time.time() + ttl), keep)
+            return value
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            backend = get_backend()
+            key = key_for(*args, **kwargs)
+            data = backend.get_raw(namespace, key)
+            if data is not None:
+                if not revalidate:
+                    return codec.unpack(data)
+                # Without its validators (evicted separately) an entry counts as stale
+                validators = backend.get(validators_namespace, key)
+                if validators is not None and validators["fresh_until"] > time.time():
+                    return codec.unpack(data)
+            return fetch(backend, key, data, args, kwargs)
+
+        def refresh(*args, **kwargs):
+            backend = get_backend()
+            key = key_for(*args, **kwargs)
+            return fetch(backend, key, backend.get_raw(namespace, key), args, kwargs)
+
+        def expires_at(*args, **kwargs):
+            """When the entry goes stale (its hard expiry, or its revalidation time), or None."""
+            backend = get_backend()
+            key = key_for(*args, **kwargs)
+            expires = backend.expires_at(namespace, key)
+            if expires is None or not revalidate:
+                return expires
+            validators = backend.get(validators_namespace, key)
+            if validators is None or validators["fresh_until"] <= time.time():
+                return None
+            return min(expires, validators["fresh_until"])
+
+        wrapper.uncached = func
+        wrapper.refresh = refresh
+        wrapper.key_for = key_for
+        wrapper.expires_at = expires_at
+        wrapper.namespace = namespace
+        wrapper.ttl = ttl
+        return wrapper
+
+    return decorator
@@ -0,0 +1,149 @@
+"""Mark the hospitals that are NCI-designated cancer centers and list them first.
+
+``data/cancer_centers.csv`` has one row per hospital campus of an
+NCI-designated cancer center, with its coordinates. A hospital from Overpass
+matches a campus that lies within ``CANCER_CENTER_MATCH_KM`` (default 2) and
+has a similar name. A hospital that matches more than one campus takes the
+campus with the best name score. The join never scores every hospital
+against every campus:
+
+- Campuses are in a ``cKDTree`` on the unit sphere (as in ``lodging.py``).
+  One ``query`` call finds the campuses near each hospital, and most
+  hospitals have none.
+- Names are compared by character trigrams. The campus names are a sparse
+  campus x trigram matrix, built once. The few hospitals with a campus
+  nearby are encoded the same way, and one sparse product gives the
+  trigrams each shares with each campus. Generic words ("hospital",
+  "medical", "center") are dropped first, so the score rests on the
+  distinctive part of the name.
+
+The score is the Dice coefficient of the two trigram sets. It must reach
+``MIN_SIMILARITY``.
+"""
+import csv
+import functools
+import os
+
+import numpy as np
+import pyarrow as pa
+from scipy.sparse import csr_matrix
+from scipy.spatial import cKDTree
+
+from cancer_support import dedup, lodging
+
+CENTERS_PATH = os.environ.get(
+    "CANCER_CENTERS_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "cancer_centers.csv"),
+)
+
+MATCH_KM = float(os.environ.get("CANCER_CENTER_MATCH_KM", 2.0))
+MIN_SIMILARITY = 0.5
+# Campuses compared per hospital; Boston's Longwood area has five within a kilometre
+MAX_CANDIDATES = 8
+
+# Listed first, in this order
+DESIGNATIONS = ("Comprehensive Cancer Center", "Cancer Center")
+
+_GENERIC = {
+    "hospital", "hospitals", "medical", "center", "centre", "health", "cancer",
+    "clinic", "clinics", "campus", "institute", "university", "comprehensive",
+}
+
+
+def name_key(name):
+    """Normalized name without generic words ("" if nothing distinctive is left)."""
+    return " ".join(word for word in dedup.normalize_name(name).split() if word not in _GENERIC)
+
+
+def trigrams(key):
+    padded = f" {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)} if key else set()
+
+
+class CenterIndex:
+    def __init__(self, rows):
+        self.center = np.array([row["center"] for row in rows] + [""], dtype=object)
+        self.designation = np.array([row["designation"] for row in rows] + [""], dtype=object)
+        self.rank = np.array([DESIGNATIONS.index(row["designation"]) for row in rows] + [len(DESIGNATIONS)])
+        lat = [float(row["lat"]) for row in rows]
+        lon = [float(row["lon"]) for row in rows]
+        self.tree = cKDTree(lodging.unit_vectors(lat, lon))
+        self.vocabulary = {}
+        self.grams = self._encode([name_key(row["site"]) for row in rows], grow=True)
+        self.sizes = np.diff(self.grams.indptr)
+
+    def __len__(self):
+        return len(self.center) - 1
+
+    def _encode(self, keys, grow=False):
+        """Binary key x trigram matrix; trigrams no campus has are left out (``grow`` adds them)."""
+        indices, indptr = [], [0]
+        for key in keys:
+            for gram in trigrams(key):
+                column = self.vocabulary.get(gram)
+                if column is None and grow:
+                    column = self.vocabulary[gram] = len(self.vocabulary)
+                if column is not None:
+                    indices.append(column)
+            indptr.append(len(indices))
+        data = np.ones(len(indices), dtype=np.float32)
+        return csr_matrix((data, indices, indptr), shape=(len(keys), len(self.vocabulary)))
+
+    def match(self, table):
+        """Campus row per hospital row, or ``len(self)`` where none matches."""
+        n = table.num_rows
+        site = np.full(n, len(self), dtype=np.int64)
+        if not n or not len(self):
+            return site
+        k = min(MAX_CANDIDATES, len(self))
+        chord = 2 * np.sin(MATCH_KM / lodging.EARTH_RADIUS_KM / 2)
+        _, near = self.tree.query(
+            lodging.unit_vectors(table["Latitude"].to_numpy(), table["Longitude"].to_numpy()),
+            k=k,
+            distance_upper_bound=chord,
+        )
+        near = near.reshape(n, k)
+        # Misses come back as index len(self)
+        hospital, slot = np.nonzero(near < len(self))
+        if not len(hospital):
+            return site
+        candidates, local = np.unique(hospital, return_inverse=True)
+        names = table["Name"].take(pa.array(candidates)).to_pylist()
+        keys = [name_key(name) for name in names]
+        sizes = np.array([len(trigrams(key)) for key in keys])
+        # Shared trigram counts for every (candidate hospital, campus) pair at once
+        shared_counts = self._encode(keys) @ self.grams.T
+        campus = near[hospital, slot]
+        shared = np.asarray(shared_counts[local, campus]).ravel()
+        total = sizes[local] + self.sizes[campus]
+        score = np.divide(2 * shared, total, out=np.zeros(len(shared)), where=total > 0)
+        good = score >= MIN_SIMILARITY
+        hospital, campus, score = hospital[good], campus[good], score[good]
+        # Best score per hospital: sort by hospital, best first, and take the first of each
+        order = np.lexsort((-score, hospital))
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = hospital[order][1:] != hospital[order][:-1]
+        site[hospital[order][first]] = campus[order][first]
+        return site
+
+
+@functools.lru_cache(maxsize=None)
+def get_index():
+    with open(CENTERS_PATH, newline="", encoding="utf-8") as f:
+        return CenterIndex(list(csv.DictReader(f)))
+
+
+def rank_hospitals(table):
+    """``table`` with "Cancer center" and "NCI designation" columns, matched centers first.
+
+    Comprehensive cancer centers come before the others; otherwise rows keep
+    their order.
+    """
+    index = get_index()
+    site = index.match(table)
+    for name in ("Cancer center", "NCI designation"):
+        if name in table.column_names:
+            table = table.drop_columns([name])
+    table = table.append_column("Cancer center", pa.array(index.center[site].tolist(), pa.string()))
+    table = table.append_column("NCI designation", pa.array(index.designation[site].tolist(), pa.string()))
+    return table.take(pa.array(np.argsort(index.rank[site], kind="stable")))
@@ -0,0 +1,152 @@
+"""Merge node/way/relation duplicates of the same hospital.
+
+Overpass returns a hospital once per OSM object that carries
+``amenity=hospital``, so a campus mapped as an entrance node plus a building
+way shows up twice. Elements are bucketed on a grid whose cells are as wide
+as the merge distance, so only the 3x3 neighbouring cells are compared, and
+pairs that are close enough and share a normalized name are joined into
+clusters; an unnamed element joins its nearest named neighbour. Each cluster
+keeps its richest element. Lodging tables go through the same steps with a
+shorter merge distance.
+"""
+import re
+import unicodedata
+
+import numpy as np
+import pyarrow as pa
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+from cancer_support import overpass
+from cancer_support.tables import UNNAMED_HOSPITAL, UNNAMED_LODGING
+
+EARTH_RADIUS_M = 6371000.0
+METERS_PER_DEGREE = np.pi * EARTH_RADIUS_M / 180.0
+
+# Areas carry more tags and a better centre than an entrance node
+TYPE_RANK = {"relation": 2, "way": 1, "node": 0}
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+_STOPWORDS = {"the", "of", "and", "at"}
+_UNNAMED = {UNNAMED_HOSPITAL, UNNAMED_LODGING}
+
+
+def normalize_name(name):
+    """Lowercase ASCII words without punctuation or stopwords ("" if unnamed)."""
+    if not name or name in _UNNAMED:
+        return ""
+    ascii_name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode("ascii")
+    words = _NON_ALNUM.sub(" ", ascii_name.lower()).split()
+    return " ".join(word for word in words if word not in _STOPWORDS)
+
+
+def candidate_pairs(lat, lon, threshold_m):
+    """Index pairs (i < j) that fall in neighbouring grid cells."""
+    n = len(lat)
+    # Longitude degrees shrink with latitude; one scale for the whole result set is fine
+    # for a 50 km search radius
+    lon_scale = np.cos(np.radians(np.mean(lat)))
+    cell_deg = threshold_m / METERS_PER_DEGREE
+    ix = np.floor(lat / cell_deg).astype(np.int64)
+    iy = np.floor(lon * lon_scale / cell_deg).astype(np.int64)
+    # Pack (ix, iy) into one sortable key, with a spare column either side so
+    # the dy = -1/+1 neighbours never wrap into the next row
+    iy -= iy.min() - 1
+    span = int(iy.max()) + 2
+    keys = ix * span + iy
+
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    left, right = [], []
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            neighbour = keys + dx * span + dy
+            lo = np.searchsorted(sorted_keys, neighbour, side="left")
+            hi = np.searchsorted(sorted_keys, neighbour, side="right")
+            counts = hi - lo
+            total = int(counts.sum())
+            if not total:
+                continue
+            # Expand each [lo, hi) range without a Python loop
+            starts = np.repeat(lo, counts)
+            offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+            i = np.repeat(np.arange(n), counts)
+            j = order[starts + offsets]
+            keep = i < j
+            left.append(i[keep])
+            right.append(j[keep])
+    if not left:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty
+    return np.concatenate(left), np.concatenate(right)
+
+
+def richness(table):
+    """Score per row: number of filled whitelisted tags, then OSM type."""
+    score = np.zeros(table.num_rows, dtype=np.int64)
+    for tag in dict.fromkeys(overpass.HOSPITAL_TAGS + overpass.LODGING_TAGS):
+        column = "Name" if tag == "name" else tag
+        if column not in table.column_names:
+            continue
+        values = table[column].to_numpy(zero_copy_only=False)
+        filled = values != ""
+        if column == "Name":
+            filled &= ~np.isin(values, list(_UNNAMED))
+        score += filled
+    types = table["osm_type"].to_pylist()
+    return score * 4 + np.array([TYPE_RANK.get(t, 0) for t in types], dtype=np.int64)
+
+
+def cluster_ids(table, threshold_m=300.0):
+    """Cluster label per row; rows sharing a label are the same hospital."""
+    n = table.num_rows
+    lat = table["Latitude"].to_numpy()
+    lon = table["Longitude"].to_numpy()
+    i, j = candidate_pairs(lat, lon, threshold_m)
+
+    # Equirectangular distance is accurate to well under 1% at these ranges
+    mean_lat = np.radians((lat[i] + lat[j]) / 2)
+    dy = (lat[i] - lat[j]) * METERS_PER_DEGREE
+    dx = (lon[i] - lon[j]) * METERS_PER_DEGREE * np.cos(mean_lat)
+    dist2 = dx * dx + dy * dy
+    close = dist2 <= threshold_m * threshold_m
+
+    names = [normalize_name(name) for name in table["Name"].to_pylist()]
+    _, codes = np.unique(np.array(names, dtype=object), return_inverse=True)
+    unnamed = np.array([not name for name in names], dtype=bool)
+    i, j, dist2 = i[close], j[close], dist2[close]
+
+    # Named elements only merge with the same name
+    merge = ~unnamed[i] & ~unnamed[j] & (codes[i] == codes[j])
+
+    # An unnamed element joins only its nearest named neighbour, so it can't
+    # bridge two differently named hospitals into one cluster
+    mixed = np.flatnonzero(unnamed[i] != unnamed[j])
+    orphan = np.where(unnamed[i[mixed]], i[mixed], j[mixed])
+    by_distance = np.lexsort((dist2[mixed], orphan))
+    nearest = np.ones(len(by_distance), dtype=bool)
+    nearest[1:] = orphan[by_distance][1:] != orphan[by_distance][:-1]
+    merge[mixed[by_distance[nearest]]] = True
+
+    # Unnamed elements with no named neighbour merge among themselves
+    has_named = np.zeros(n, dtype=bool)
+    has_named[orphan] = True
+    merge |= unnamed[i] & unnamed[j] & ~has_named[i] & ~has_named[j]
+
+    graph = coo_matrix((np.ones(int(merge.sum()), dtype=np.int8), (i[merge], j[merge])), shape=(n, n))
+    _, labels = connected_components(graph, directed=False)
+    return labels
+
+
+def dedupe_hospitals(table, threshold_m=300.0):
+    """Keep the richest row of each duplicate cluster, in the original order."""
+    if table.num_rows < 2:
+        return table
+    labels = cluster_ids(table, threshold_m)
+    score = richness(table)
+    # Sort by cluster, best score first, and take the first row of each cluster
+    order = np.lexsort((-score, labels))
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = labels[order][1:] != labels[order][:-1]
+    keep = np.sort(order[first])
+    return table.take(pa.array(keep))
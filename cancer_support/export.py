@@ -0,0 +1,246 @@
+"""Streaming export of search results as CSV, Parquet or GeoJSON.
+
+``export()`` runs one search per location or cancer type through
+``service.py`` (so through the cache), a few at a time in parallel. It
+encodes each result as soon as it is its turn, and yields the file in
+chunks. Results are written in the order asked for, each under a leading
+column naming its search. At most ``window`` results are held at once,
+however many searches the batch has, and the file itself is never in
+memory whole. A search that fails doesn't end the file (a truncated CSV
+would look complete): one row stands in for its results, with the search
+label and "Search failed: <reason>" in the first result column. ``api.py`` streams the chunks to the client. The download
+buttons on the pages join them, because Streamlit serves downloads from
+memory.
+"""
+import collections
+import concurrent.futures
+import datetime
+import json
+import logging
+
+import pyarrow as pa
+import pyarrow.csv
+import pyarrow.parquet
+import requests
+
+from cancer_support import admission, service, tables
+
+logger = logging.getLogger(__name__)
+
+# format -> (label, media type, file extension)
+FORMATS = {
+    "csv": ("CSV", "text/csv", "csv"),
+    "parquet": ("Parquet", "application/vnd.apache.parquet", "parquet"),
+    "geojson": ("GeoJSON", "application/geo+json", "geojson"),
+}
+
+# kind -> (search label column, result schema)
+KINDS = {
+    "hospitals": ("Location", tables.RANKED_HOSPITAL_SCHEMA),
+    "research": ("Cancer type", tables.ARTICLE_SCHEMA),
+    "trials": ("Cancer type", tables.TRIAL_SCHEMA),
+}
+
+GEOMETRY = ("Latitude", "Longitude")
+
+ROW_GROUP_ROWS = 64 * 1024
+
+
+def search(kind, query, location=None, phase="All"):
+    """One search's result table (empty when the location isn't found)."""
+    if kind == "hospitals":
+        try:
+            _, result = service.find_hospitals(query)
+        except service.LocationNotFound:
+            logger.info("Export skipped unknown location %r", query)
+            return KINDS[kind][1].empty_table()
+        return result
+    if kind == "research":
+        return service.latest_research(query)
+    return service.find_trials(query, location, phase)
+
+
+def formats_for(schema):
+    """Formats a table with ``schema`` can be exported in (GeoJSON needs coordinates)."""
+    return [fmt for fmt in FORMATS if fmt != "geojson" or all(name in schema.names for name in GEOMETRY)]
+
+
+def labelled(table, column, value):
+    return table.add_column(0, column, pa.array([value] * table.num_rows, pa.string()))
+
+
+def error_row(schema, column, query, reason):
+    """The row that stands in for a failed search's results."""
+    return pa.Table.from_pylist([{column: query, schema.names[1]: f"Search failed: {reason}"}], schema=schema)
+
+
+def results(kind, queries, identity, workers=4, window=8, **options):
+    """``(query, table, error)`` for each query, in order, fetching up to ``workers`` at once.
+
+    ``table`` is None and ``error`` the reason when a search fails.
+    """
+
+    def run(query):
+        try:
+            with admission.identity(*identity):
+                return search(kind, query, **options), None
+        except admission.Rejected:
+            return None, "busy"
+        except requests.exceptions.RequestException as e:
+            logger.warning("Export search failed for %s %r: %s", kind, query, e)
+            return None, "upstream request failed"
+        except Exception:
+            logger.exception("Export search failed for %s %r", kind, query)
+            return None, "search failed"
+
+    pending = collections.deque()
+    queries = iter(queries)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix="export") as executor:
+        try:
+            while True:
+                for query in queries:
+                    pending.append((query, executor.submit(run, query)))
+                    if len(pending) >= window:
+                        break
+                if not pending:
+                    return
+                query, future = pending.popleft()
+                yield (query, *future.result())
+        finally:
+            # The client went away: don't start the rest
+            for _, future in pending:
+                future.cancel()
+
+
+class _Chunks:
+    """Write-only file that hands its bytes over in chunks (for the Arrow writers)."""
+
+    closed = False
+
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def writable(self):
+        return True
+
+    def seekable(self):
+        return False
+
+    def drain(self):
+        data = b"".join(self.parts)
+        self.parts.clear()
+        return data
+
+
+def csv_chunks(schema, labelled_tables):
+    sink = _Chunks()
+    writer = pyarrow.csv.CSVWriter(sink, schema)
+    for table in labelled_tables:
+        writer.write_table(table)
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+def parquet_chunks(schema, labelled_tables):
+    sink = _Chunks()
+    writer = pyarrow.parquet.ParquetWriter(pa.PythonFile(sink, mode="w"), schema, compression="zstd")
+    # Small results are gathered into row groups of about ROW_GROUP_ROWS: a row
+    # group per search would make a larger, slower file
+    pending, rows = [], 0
+    for table in labelled_tables:
+        pending.append(table)
+        rows += table.num_rows
+        if rows >= ROW_GROUP_ROWS:
+            writer.write_table(pa.concat_tables(pending), row_group_size=rows)
+            pending, rows = [], 0
+            yield sink.drain()
+    if rows:
+        writer.write_table(pa.concat_tables(pending), row_group_size=rows)
+    # The footer is written on close
+    writer.close()
+    yield sink.drain()
+
+
+def geojson_chunks(schema, labelled_tables):
+    properties = [name for name in schema.names if name not in GEOMETRY]
+    yield b'{"type":"FeatureCollection","features":['
+    first = True
+    for table in labelled_tables:
+        if not table.num_rows:
+            continue
+        columns = [table[name].to_pylist() for name in properties]
+        rows = zip(table["Longitude"].to_pylist(), table["Latitude"].to_pylist(), *columns)
+        features = [
+            {
+                "type": "Feature",
+                # A failed search's row has no location
+                "geometry": None if lat is None else {"type": "Point", "coordinates": [lon, lat]},
+                "properties": dict(zip(properties, values)),
+            }
+            for lon, lat, *values in rows
+        ]
+        # One dumps call per table, without the list's brackets
+        features = json.dumps(features, separators=(",", ":"))[1:-1]
+        yield (features if first else "," + features).encode()
+        first = False
+    yield b"]}"
+
+
+WRITERS = {"csv": csv_chunks, "parquet": parquet_chunks, "geojson": geojson_chunks}
+
+
+def encode(fmt, schema, labelled_tables):
+    """Bytes chunks of ``labelled_tables`` (all with ``schema``) in ``fmt``."""
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of: {', '.join(FORMATS)}")
+    if fmt not in formats_for(schema):
+        raise ValueError("GeoJSON export needs results with coordinates (hospitals)")
+    return WRITERS[fmt](schema, labelled_tables)
+
+
+def export(kind, queries, fmt, session=None, **options):
+    """Bytes chunks of one file with every query's results.
+
+    ``options`` are ``location`` and ``phase`` for trials. The searches wait
+    in admission control's background lane under ``session`` (the caller's by
+    default), so a long batch neither holds up interactive searches nor is
+    turned away halfway. Bad arguments raise ``ValueError`` here rather than
+    mid-stream.
+    """
+    if kind not in KINDS:
+        raise ValueError(f"kind must be one of: {', '.join(KINDS)}")
+    if kind == "trials" and not options.get("location"):
+        raise ValueError("trials export needs a location")
+    column, schema = KINDS[kind]
+    labelled_schema = schema.insert(0, pa.field(column, pa.string()))
+    identity = (session or admission.current_identity()[0], "background")
+    outcomes = results(kind, queries, identity, **options)
+    return encode(fmt, labelled_schema, (
+        labelled(table, column, query) if error is None else error_row(labelled_schema, column, query, error)
+        for query, table, error in outcomes
+    ))
+
+
+def to_bytes(fmt, table):
+    """A whole file for one result table already in memory."""
+    return b"".join(encode(fmt, table.schema, [table]))
+
+
+def file_name(kind, fmt):
+    return f"{kind}-{datetime.date.today().isoformat()}.{FORMATS[fmt][2]}"
@@ -0,0 +1,108 @@
+"""Federal tax on retirement-account withdrawals, for the financial calculator.
+
+Bracket tables come from ``data/tax_brackets.json`` and are loaded once into
+``(filing status x bracket)`` arrays. The tax owed on each bracket floor is
+precomputed, so the tax on any income is one ``np.searchsorted`` plus a
+multiply-add. All statuses are searched in a single call by shifting each
+status's floors into its own numeric range. ``scenarios`` evaluates a whole
+income x withdrawal x filing-status grid at once, which is what lets the page
+redraw its sensitivity charts on every input change.
+
+A withdrawal is taxed as ordinary income. The 10% early-withdrawal penalty
+applies before age 59½ unless an exception such as disability or terminal
+illness (IRC 72(t)(2)(A)(iii) and (L)) covers it. State tax is not modelled.
+"""
+import functools
+import json
+import os
+from collections import namedtuple
+
+import numpy as np
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "tax_brackets.json")
+
+# Larger than any income the calculator will see; separates the statuses'
+# floors when they are searched as one sorted array
+_STATUS_STRIDE = 1e12
+
+Brackets = namedtuple(
+    "Brackets", ["year", "statuses", "floors", "rates", "base", "standard_deduction", "penalty_rate"]
+)
+
+
+@functools.lru_cache(maxsize=None)
+def load_brackets(path=DEFAULT_PATH):
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    statuses = list(data["statuses"])
+    width = max(len(table["floors"]) for table in data["statuses"].values())
+    # Shorter tables are padded with floors no income reaches
+    floors = np.full((len(statuses), width), _STATUS_STRIDE - 1)
+    rates = np.zeros((len(statuses), width))
+    for row, status in enumerate(statuses):
+        table = data["statuses"][status]
+        floors[row, :len(table["floors"])] = table["floors"]
+        rates[row, :len(table["rates"])] = table["rates"]
+    # Tax owed on reaching each floor: every lower bracket filled up
+    base = np.zeros_like(floors)
+    base[:, 1:] = np.cumsum(np.diff(floors, axis=1) * rates[:, :-1], axis=1)
+    return Brackets(
+        year=data["year"],
+        statuses=statuses,
+        floors=floors,
+        rates=rates,
+        base=base,
+        standard_deduction=np.array([data["statuses"][s]["standard_deduction"] for s in statuses], dtype=float),
+        penalty_rate=data["early_withdrawal_penalty"],
+    )
+
+
+def income_tax(taxable, status, brackets=None):
+    """Tax on ``taxable`` income; ``status`` holds row indices into ``brackets.statuses``.
+
+    Both arguments broadcast against each other.
+    """
+    brackets = brackets or load_brackets()
+    taxable, status = np.broadcast_arrays(np.maximum(np.asarray(taxable, dtype=float), 0), np.asarray(status))
+    shifted = (brackets.floors + np.arange(len(brackets.statuses))[:, None] * _STATUS_STRIDE).ravel()
+    index = np.searchsorted(shifted, taxable + status * _STATUS_STRIDE, side="right") - 1
+    return brackets.base.ravel()[index] + brackets.rates.ravel()[index] * (taxable - brackets.floors.ravel()[index])
+
+
+def scenarios(incomes, withdrawals, statuses=None, penalty=True, brackets=None):
+    """Evaluate every income x withdrawal x filing-status combination.
+
+    Returns a dict of arrays shaped ``(status, income, withdrawal)``:
+    ``income_tax`` and ``penalty`` caused by the withdrawal, ``net`` amount
+    kept, and ``effective_rate`` on the withdrawal.
+    """
+    brackets = brackets or load_brackets()
+    if statuses is None:
+        statuses = brackets.statuses
+    status = np.array([brackets.statuses.index(s) for s in statuses])[:, None, None]
+    income = np.asarray(incomes, dtype=float)[None, :, None]
+    withdrawal = np.asarray(withdrawals, dtype=float)[None, None, :]
+
+    deduction = brackets.standard_deduction[status]
+    before = income_tax(income - deduction, status, brackets)
+    after = income_tax(income + withdrawal - deduction, status, brackets)
+    extra_tax = after - before
+    penalty_owed = np.broadcast_to(withdrawal * (brackets.penalty_rate if penalty else 0.0), extra_tax.shape)
+    total = extra_tax + penalty_owed
+    with np.errstate(divide="ignore", invalid="ignore"):
+        effective = np.where(withdrawal > 0, total / withdrawal, 0.0)
+    return {
+        "income_tax": extra_tax,
+        "penalty": penalty_owed,
+        "net": withdrawal - total,
+        "effective_rate": effective,
+    }
+
+
+def marginal_rate(income, status, brackets=None):
+    """Top bracket rate that applies to ``income`` (before the standard deduction)."""
+    brackets = brackets or load_brackets()
+    row = brackets.statuses.index(status)
+    taxable = max(income - brackets.standard_deduction[row], 0)
+    index = int(np.searchsorted(brackets.floors[row], taxable, side="right")) - 1
+    return float(brackets.rates[row, index])
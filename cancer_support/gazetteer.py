@@ -0,0 +1,207 @@
+"""Offline ZIP code and place-name centroids.
+
+``data/gazetteer.bin`` is a compact binary table built by
+``scripts/build_gazetteer.py``. It is memory-mapped and searched in place
+(``np.searchsorted`` for ZIPs, ``bisect`` for names), so a lookup takes a few
+microseconds and the table is never parsed into Python objects. Inputs it can't
+resolve fall back to Nominatim (see ``sources.resolve_location``).
+
+Each 3-digit ZIP prefix also has an entry, stored as ZIP ``<prefix>00``, so a
+ZIP the table doesn't list still resolves to the centre of its area.
+
+File layout, all little-endian, arrays in this order after the header:
+
+    header      magic "GAZ1", n_zips, n_places, n_keys     (uint32 x 3)
+    zip_codes   uint32[n_zips], sorted
+    zip_lat     float32[n_zips]
+    zip_lon     float32[n_zips]
+    zip_place   int32[n_zips]      nearest place, -1 if none
+    place_lat   float32[n_places]
+    place_lon   float32[n_places]
+    key_offsets uint32[n_keys + 1] into the key blob
+    key_place   uint32[n_keys]     place each normalized key points to
+    name_offsets uint32[n_places + 1] into the name blob
+    states      2 bytes per place
+    key blob, name blob            UTF-8
+"""
+import bisect
+import mmap
+import os
+import re
+import struct
+import threading
+from collections import namedtuple
+
+import numpy as np
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "gazetteer.bin")
+
+MAGIC = b"GAZ1"
+HEADER = struct.Struct("<4sIII")
+
+Match = namedtuple("Match", ["lat", "lon", "name", "state"])
+
+_ZIP = re.compile(r"^\s*(\d{5})(?:-\d{4})?\s*$")
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def normalize(text):
+    """Lowercase words without punctuation; a leading "st" becomes "saint"."""
+    words = _NON_ALNUM.sub(" ", text.lower()).split()
+    if words and words[0] == "st":
+        words[0] = "saint"
+    return " ".join(words)
+
+
+def place_keys(name, state):
+    """Lookup keys for a place: "boston" and "boston ma"."""
+    key = normalize(name)
+    return [key, f"{key} {state.lower()}"]
+
+
+def write_table(path, zips, places):
+    """Write a gazetteer file.
+
+    ``zips`` is a list of ``(zip_int, lat, lon, place_index)``, ``places`` a list
+    of ``(name, state, lat, lon)`` in priority order: when two places share a
+    bare name ("portland"), the first one listed owns it.
+    """
+    zips = sorted(zips)
+    keys = {}
+    for index, (name, state, _, _) in enumerate(places):
+        for key in place_keys(name, state):
+            keys.setdefault(key.encode("utf-8"), index)
+    sorted_keys = sorted(keys)
+
+    key_blob = b"".join(sorted_keys)
+    key_offsets = np.cumsum([0] + [len(k) for k in sorted_keys], dtype=np.uint32)
+    names = [name.encode("utf-8") for name, _, _, _ in places]
+    name_blob = b"".join(names)
+    name_offsets = np.cumsum([0] + [len(n) for n in names], dtype=np.uint32)
+
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(zips), len(places), len(sorted_keys)))
+        f.write(np.array([z[0] for z in zips], dtype="<u4").tobytes())
+        f.write(np.array([z[1] for z in zips], dtype="<f4").tobytes())
+        f.write(np.array([z[2] for z in zips], dtype="<f4").tobytes())
+        f.write(np.array([z[3] for z in zips], dtype="<i4").tobytes())
+        f.write(np.array([p[2] for p in places], dtype="<f4").tobytes())
+        f.write(np.array([p[3] for p in places], dtype="<f4").tobytes())
+        f.write(key_offsets.astype("<u4").tobytes())
+        f.write(np.array([keys[k] for k in sorted_keys], dtype="<u4").tobytes())
+        f.write(name_offsets.astype("<u4").tobytes())
+        f.write(b"".join(state.upper().encode("ascii")[:2].ljust(2) for _, state, _, _ in places))
+        f.write(key_blob)
+        f.write(name_blob)
+
+
+class _KeyView:
+    """Sequence of key bytes read straight from the mapped blob (for bisect)."""
+
+    def __init__(self, blob, offsets):
+        self.blob = blob
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        return bytes(self.blob[self.offsets[index]:self.offsets[index + 1]])
+
+
+class Gazetteer:
+    def __init__(self, path=DEFAULT_PATH):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buf = memoryview(self._mmap)
+        magic, n_zips, n_places, n_keys = HEADER.unpack_from(buf)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a gazetteer file")
+
+        offset = HEADER.size
+
+        def take(dtype, count):
+            nonlocal offset
+            array = np.frombuffer(buf, dtype=dtype, count=count, offset=offset)
+            offset += array.nbytes
+            return array
+
+        self.zip_codes = take("<u4", n_zips)
+        self.zip_lat = take("<f4", n_zips)
+        self.zip_lon = take("<f4", n_zips)
+        self.zip_place = take("<i4", n_zips)
+        self.place_lat = take("<f4", n_places)
+        self.place_lon = take("<f4", n_places)
+        key_offsets = take("<u4", n_keys + 1)
+        self.key_place = take("<u4", n_keys)
+        # Python ints index the blobs faster than numpy scalars
+        self._name_offsets = take("<u4", n_places + 1).tolist()
+        self._states = bytes(buf[offset:offset + 2 * n_places])
+        offset += 2 * n_places
+        key_blob = buf[offset:offset + int(key_offsets[-1])]
+        offset += int(key_offsets[-1])
+        self._names = buf[offset:offset + self._name_offsets[-1]]
+        self.keys = _KeyView(key_blob, key_offsets.tolist())
+
+    def __len__(self):
+        return len(self.zip_codes) + len(self.place_lat)
+
+    def place(self, index):
+        name = bytes(self._names[self._name_offsets[index]:self._name_offsets[index + 1]]).decode("utf-8")
+        state = self._states[2 * index:2 * index + 2].decode("ascii").strip()
+        return Match(float(self.place_lat[index]), float(self.place_lon[index]), name, state)
+
+    def places(self):
+        """Every place in priority order."""
+        for index in range(len(self.place_lat)):
+            yield self.place(index)
+
+    def lookup_zip(self, code):
+        """Centroid of a listed ZIP, else of its 3-digit area (stored as ``<prefix>00``)."""
+        code = int(code)
+        i = int(np.searchsorted(self.zip_codes, code))
+        if i == len(self.zip_codes) or self.zip_codes[i] != code:
+            area = code - code % 100
+            i = int(np.searchsorted(self.zip_codes, area))
+            if i == len(self.zip_codes) or self.zip_codes[i] != area:
+                return None
+        place = int(self.zip_place[i])
+        name, state = ("", "") if place < 0 else self.place(place)[2:]
+        return Match(float(self.zip_lat[i]), float(self.zip_lon[i]), name, state)
+
+    def lookup_name(self, text):
+        key = normalize(text).encode("utf-8")
+        if not key:
+            return None
+        i = bisect.bisect_left(self.keys, key)
+        if i == len(self.keys) or self.keys[i] != key:
+            return None
+        return self.place(int(self.key_place[i]))
+
+    def lookup(self, text):
+        """Resolve a ZIP code or place name, or return None."""
+        zip_match = _ZIP.match(text)
+        if zip_match:
+            return self.lookup_zip(zip_match.group(1))
+        return self.lookup_name(text)
+
+
+_gazetteer = None
+_gazetteer_lock = threading.Lock()
+
+
+def get_gazetteer():
+    """Shared table, or None when ``data/gazetteer.bin`` hasn't been built."""
+    global _gazetteer
+    with _gazetteer_lock:
+        if _gazetteer is None:
+            path = os.environ.get("GAZETTEER_PATH", DEFAULT_PATH)
+            if not os.path.exists(path):
+                return None
+            _gazetteer = Gazetteer(path)
+        return _gazetteer
+
+
+def lookup(text):
+    gazetteer = get_gazetteer()
+    return gazetteer.lookup(text) if gazetteer else None
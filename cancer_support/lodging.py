@@ -0,0 +1,62 @@
+"""Join lodging to the hospitals it is close to.
+
+Points are projected onto the unit sphere, so straight-line (chord) distance
+in a ``cKDTree`` orders them exactly like great-circle distance. One
+``query`` call finds the ``k`` nearest lodging places within the cut-off for
+every hospital at once, and the result is kept as a long table of
+``(hospital, lodging, distance)`` rows that the page filters per hospital.
+"""
+import numpy as np
+import pyarrow as pa
+from scipy.spatial import cKDTree
+
+EARTH_RADIUS_KM = 6371.0088
+
+JOIN_SCHEMA = pa.schema([
+    ("hospital", pa.int64()),
+    ("lodging", pa.int64()),
+    ("Distance (km)", pa.float64()),
+])
+
+
+def unit_vectors(lat, lon):
+    lat = np.radians(np.asarray(lat, dtype=float))
+    lon = np.radians(np.asarray(lon, dtype=float))
+    cos_lat = np.cos(lat)
+    return np.column_stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)])
+
+
+def nearest_lodging(hospitals, lodging, max_km=5.0, k=25):
+    """Up to ``k`` lodging rows within ``max_km`` of each hospital row, nearest first."""
+    if not hospitals.num_rows or not lodging.num_rows:
+        return JOIN_SCHEMA.empty_table()
+    tree = cKDTree(unit_vectors(lodging["Latitude"].to_numpy(), lodging["Longitude"].to_numpy()))
+    k = min(k, lodging.num_rows)
+    chord = 2 * np.sin(max_km / EARTH_RADIUS_KM / 2)
+    distances, indices = tree.query(
+        unit_vectors(hospitals["Latitude"].to_numpy(), hospitals["Longitude"].to_numpy()),
+        k=k,
+        distance_upper_bound=chord,
+    )
+    distances = distances.reshape(hospitals.num_rows, k)
+    indices = indices.reshape(hospitals.num_rows, k)
+    # Misses come back as distance inf / index n
+    found = np.isfinite(distances)
+    hospital_rows = np.broadcast_to(np.arange(hospitals.num_rows)[:, None], found.shape)[found]
+    km = 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(distances[found] / 2, 1.0))
+    return pa.Table.from_arrays(
+        [pa.array(hospital_rows), pa.array(indices[found].astype(np.int64)), pa.array(np.round(km, 2))],
+        schema=JOIN_SCHEMA,
+    )
+
+
+def lodging_counts(join, n_hospitals):
+    """Number of joined lodging rows per hospital row."""
+    return np.bincount(join["hospital"].to_numpy(), minlength=n_hospitals)
+
+
+def lodging_for(join, lodging, hospital_row):
+    """Lodging table for one hospital row with a distance column, nearest first."""
+    matches = join.take(pa.array(np.flatnonzero(join["hospital"].to_numpy() == hospital_row)))
+    rows = lodging.take(matches["lodging"])
+    return rows.append_column("Distance (km)", matches["Distance (km)"])
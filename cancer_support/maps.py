@@ -0,0 +1,40 @@
+"""Folium maps for the Locate Hospitals and Accommodation pages.
+
+The page only passes the result tables in and hands the map to
+``folium_static``; building it lives here so ``benchmarks/suite.py`` times the
+same code the page runs.
+"""
+import folium
+
+
+def hospital_map(lat, lon, hospitals):
+    """The searched location in red, NCI-designated cancer centers in purple, other hospitals in blue."""
+    m = folium.Map(location=[lat, lon], zoom_start=12)
+    folium.Marker([lat, lon], popup="Your Location", icon=folium.Icon(color='red')).add_to(m)
+    for name, lat_h, lon_h, designation in zip(
+        hospitals['Name'].to_pylist(),
+        hospitals['Latitude'].to_pylist(),
+        hospitals['Longitude'].to_pylist(),
+        hospitals['NCI designation'].to_pylist(),
+    ):
+        if designation:
+            folium.Marker(
+                [lat_h, lon_h], popup=f"{name} (NCI {designation})", icon=folium.Icon(color='purple')
+            ).add_to(m)
+        else:
+            folium.Marker([lat_h, lon_h], popup=name).add_to(m)
+    return m
+
+
+def lodging_map(hospital_at, hospital_name, nearby):
+    """One hospital in red and the lodging places near it."""
+    m = folium.Map(location=hospital_at, zoom_start=14)
+    folium.Marker(hospital_at, popup=hospital_name, icon=folium.Icon(color='red', icon='plus')).add_to(m)
+    for name, category, lat_l, lon_l in zip(
+        nearby["Name"].to_pylist(),
+        nearby["Category"].to_pylist(),
+        nearby["Latitude"].to_pylist(),
+        nearby["Longitude"].to_pylist(),
+    ):
+        folium.Marker([lat_l, lon_l], popup=f"{name} ({category})").add_to(m)
+    return m
@@ -0,0 +1,115 @@
+"""Overpass QL query building and compact result handling.
+
+The original query ended in ``out center;``, which returns every OSM tag on
+every hospital even though the app only shows a handful of them. The builder
+here uses ``convert`` to keep just the whitelisted tags, can filter oncology
+facilities on the server. ``tables.hospital_table`` turns the response into
+an Arrow table.
+
+``area_query`` fetches hospitals and nearby lodging in one request: each
+group is converted to its own element type ("hospital" or "lodging"), so the
+client can split the response without a second round trip.
+"""
+
+# Tags kept on each element; everything else is dropped by the server
+HOSPITAL_TAGS = (
+    "name",
+    "healthcare:speciality",
+    "addr:street",
+    "addr:city",
+    "addr:postcode",
+    "phone",
+    "website",
+    "emergency",
+)
+
+# Tags kept on lodging elements
+LODGING_TAGS = (
+    "name",
+    "tourism",
+    "social_facility",
+    "addr:street",
+    "addr:city",
+    "addr:postcode",
+    "phone",
+    "website",
+)
+
+# Hotels and guest houses, plus hospitality houses (Ronald McDonald House,
+# Hope Lodge and similar), which OSM maps as social facility shelters
+LODGING_SELECTORS = (
+    '["tourism"~"^(hotel|motel|guest_house|hostel|apartment)$"]',
+    '["amenity"="social_facility"]["social_facility"="shelter"]',
+)
+
+ONCOLOGY_FILTER = '["healthcare:speciality"~"oncology"]'
+
+
+def legacy_hospital_query(lat, lon, radius=50000):
+    """The query the app used to send (kept for the payload benchmark)."""
+    return f"""
+                [out:json];
+                (
+                  node["amenity"="hospital"](around:{radius},{lat},{lon});
+                  way["amenity"="hospital"](around:{radius},{lat},{lon});
+                  relation["amenity"="hospital"](around:{radius},{lat},{lon});
+                );
+                out center;
+                """
+
+
+def _convert_statement(element_type, tags):
+    fields = ",".join(f'"{tag}"=t["{tag}"]' for tag in tags)
+    return f"convert {element_type} ::id=id(),::geom=center(geom()),_type=type(),{fields};"
+
+
+def _around(lat, lon, radius):
+    return f"(around:{radius},{lat:.6f},{lon:.6f})"
+
+
+def _hospital_union(selector, around):
+    return f"node{selector}{around};way{selector}{around};relation{selector}{around};"
+
+
+def hospital_query(lat, lon, radius=50000, oncology_only=False, tags=HOSPITAL_TAGS, timeout=25):
+    """Overpass QL for hospitals around a point, returning only ``tags``."""
+    selector = '["amenity"="hospital"]'
+    if oncology_only:
+        selector += ONCOLOGY_FILTER
+    return (
+        f"[out:json][timeout:{timeout}];"
+        f"({_hospital_union(selector, _around(lat, lon, radius))});"
+        f"{_convert_statement('hospital', tags)}"
+        "out geom;"
+    )
+
+
+def area_query(lat, lon, radius=50000, oncology_only=False, timeout=25):
+    """Overpass QL for hospitals and lodging around a point, in one request."""
+    selector = '["amenity"="hospital"]'
+    if oncology_only:
+        selector += ONCOLOGY_FILTER
+    around = _around(lat, lon, radius)
+    lodging = "".join(f"nwr{lodging_selector}{around};" for lodging_selector in LODGING_SELECTORS)
+    return (
+        f"[out:json][timeout:{timeout}];"
+        f"({_hospital_union(selector, around)})->.hospitals;"
+        f"({lodging})->.lodging;"
+        f"(.hospitals;);{_convert_statement('hospital', HOSPITAL_TAGS)}out geom;"
+        f"(.lodging;);{_convert_statement('lodging', LODGING_TAGS)}out geom;"
+    )
+
+
+def element_coords(element):
+    """Latitude/longitude of a plain, ``out center`` or converted element."""
+    if "lat" in element and "lon" in element:
+        return element["lat"], element["lon"]
+    center = element.get("center")
+    if center:
+        return center.get("lat"), center.get("lon")
+    geometry = element.get("geometry")
+    if isinstance(geometry, dict) and geometry.get("type") == "Point":
+        lon, lat = geometry["coordinates"][:2]
+        return lat, lon
+    return None, None
+
@@ -0,0 +1,256 @@
+"""Opt-in sampling profiler for script reruns, written as speedscope JSON.
+
+``PROFILE`` picks the mode:
+
+- ``off`` (default): nothing runs.
+- ``query``: profile only reruns whose URL has ``?profile=1``.
+- ``on``: profile a ``PROFILE_SAMPLE_RATE`` fraction of all reruns (default
+  0.1), plus any with ``?profile=1``.
+
+The app calls ``begin(page)`` at the top of the script and ``end(recording)``
+at the bottom. A fragment rerun (one panel of a page) skips both, so each
+``@st.fragment`` function also carries ``@fragment(page)``, which records
+the fragment on its own when it reruns alone. A single daemon thread
+samples the stacks of every script thread being profiled
+(``sys._current_frames``) every ``PROFILE_INTERVAL_MS`` (default 5 ms).
+Time blocked on the network shows up as frames inside requests, and parsing
+or rendering shows up as the calls that do it. Each rerun becomes one file
+in ``PROFILE_DIR`` (default ``.profiles/``) that opens at
+https://www.speedscope.app as a flame graph.
+
+Guards for leaving it on in a canary replica:
+
+- If sampling costs more than ``PROFILE_MAX_OVERHEAD`` (default 2%) of wall
+  time, the interval doubles.
+- Reruns shorter than ``PROFILE_MIN_MS`` are not written.
+- Only the newest ``PROFILE_MAX_FILES`` files are kept.
+"""
+import functools
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+
+DEFAULT_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), ".profiles")
+
+SPEEDSCOPE_SCHEMA = "https://www.speedscope.app/file-format-schema.json"
+
+# Deepest stack kept per sample; deeper frames are cut at the root end
+MAX_DEPTH = 200
+
+# A rerun that raised never reaches end(); its recording is dropped after this
+MAX_RECORDING_SECONDS = 120
+
+
+def _setting(name, default, kind=str):
+    return kind(os.environ.get(name, default))
+
+
+class Recording:
+    """Samples collected for one rerun of one script thread."""
+
+    def __init__(self, page):
+        self.page = page
+        self.thread_id = threading.get_ident()
+        self.started = time.perf_counter()
+        self.started_wall = time.time()
+        self.last = self.started
+        self.frames = {}
+        self.samples = []
+        self.weights = []
+        self.path = None
+
+    def add(self, frame, now):
+        stack = []
+        while frame is not None and len(stack) < MAX_DEPTH:
+            code = frame.f_code
+            key = (code.co_name, code.co_filename, code.co_firstlineno)
+            index = self.frames.get(key)
+            if index is None:
+                index = self.frames[key] = len(self.frames)
+            stack.append(index)
+            frame = frame.f_back
+        stack.reverse()
+        self.samples.append(stack)
+        self.weights.append((now - self.last) * 1000)
+        self.last = now
+
+    def to_speedscope(self, ended):
+        frames = [{"name": name, "file": file, "line": line} for name, file, line in self.frames]
+        return {
+            "$schema": SPEEDSCOPE_SCHEMA,
+            "name": f"{self.page} {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.started_wall))}",
+            "exporter": "cancer_support.profiling",
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": self.page,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": (ended - self.started) * 1000,
+                "samples": self.samples,
+                "weights": self.weights,
+            }],
+        }
+
+
+class Sampler:
+    """One background thread sampling every active recording."""
+
+    def __init__(self, interval, max_overhead):
+        self.interval = interval
+        self.base_interval = interval
+        self.max_overhead = max_overhead
+        self.active = {}
+        self.lock = threading.Lock()
+        self.sampling_time = 0.0
+        self.window_started = time.perf_counter()
+        self.thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self.thread.start()
+
+    def add(self, recording):
+        # Replaces a recording left behind by an earlier rerun on this thread
+        with self.lock:
+            self.active[recording.thread_id] = recording
+
+    def remove(self, recording):
+        with self.lock:
+            if self.active.get(recording.thread_id) is recording:
+                del self.active[recording.thread_id]
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            if not self.active:
+                continue
+            started = time.perf_counter()
+            # Sampling under the lock means end() never sees a recording change
+            # after remove() has returned
+            with self.lock:
+                frames = sys._current_frames()
+                for thread_id, recording in list(self.active.items()):
+                    if started - recording.started > MAX_RECORDING_SECONDS:
+                        del self.active[thread_id]
+                        continue
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        recording.add(frame, started)
+                del frames
+            self._guard(started, time.perf_counter())
+
+    def _guard(self, started, ended):
+        """Back off when sampling takes too large a share of wall time."""
+        self.sampling_time += ended - started
+        window = ended - self.window_started
+        if window < 1.0:
+            return
+        overhead = self.sampling_time / window
+        if overhead > self.max_overhead:
+            self.interval = min(self.interval * 2, 1.0)
+        elif overhead < self.max_overhead / 4 and self.interval > self.base_interval:
+            self.interval = max(self.interval / 2, self.base_interval)
+        self.sampling_time = 0.0
+        self.window_started = ended
+
+
+_sampler = None
+_sampler_lock = threading.Lock()
+
+
+def _get_sampler():
+    global _sampler
+    with _sampler_lock:
+        if _sampler is None:
+            _sampler = Sampler(
+                _setting("PROFILE_INTERVAL_MS", 5, float) / 1000,
+                _setting("PROFILE_MAX_OVERHEAD", 0.02, float),
+            )
+        return _sampler
+
+
+def wanted(query_flag=False):
+    """Whether to profile this rerun, given whether ``?profile=1`` was passed."""
+    mode = _setting("PROFILE", "off").lower()
+    if mode in ("query", "on") and query_flag:
+        return True
+    return mode == "on" and random.random() < _setting("PROFILE_SAMPLE_RATE", 0.1, float)
+
+
+def begin(page, query_flag=False):
+    """Start profiling the current rerun; returns a recording, or None when off."""
+    if not wanted(query_flag):
+        return None
+    recording = Recording(page)
+    _get_sampler().add(recording)
+    return recording
+
+
+def _slug(text):
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-") or "page"
+
+
+def _rotate(directory, keep):
+    files = sorted(
+        (entry for entry in os.scandir(directory) if entry.name.endswith(".speedscope.json")),
+        key=lambda entry: entry.stat().st_mtime,
+    )
+    for entry in files[:max(len(files) - keep, 0)]:
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
+
+
+def end(recording):
+    """Stop a recording and write it; returns the file path, or None if nothing was written."""
+    if recording is None:
+        return None
+    ended = time.perf_counter()
+    _get_sampler().remove(recording)
+    elapsed_ms = (ended - recording.started) * 1000
+    if elapsed_ms < _setting("PROFILE_MIN_MS", 50, float) or not recording.samples:
+        return None
+    directory = _setting("PROFILE_DIR", DEFAULT_DIR)
+    os.makedirs(directory, exist_ok=True)
+    stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(recording.started_wall))
+    stamp += f"{recording.started_wall % 1:.3f}"[1:]
+    path = os.path.join(directory, f"{stamp}-{_slug(recording.page)}-{elapsed_ms:.0f}ms.speedscope.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(recording.to_speedscope(ended), f, separators=(",", ":"))
+    _rotate(directory, _setting("PROFILE_MAX_FILES", 200, int))
+    recording.path = path
+    return path
+
+
+def _fragment_rerun():
+    """Whether the calling script thread is rerunning fragments rather than the whole page."""
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+        ctx = get_script_run_ctx(suppress_warning=True)
+    except Exception:
+        ctx = None
+    return bool(ctx is not None and ctx.fragment_ids_this_run)
+
+
+def fragment(page, query_flag=False):
+    """Decorator for fragment functions: profile the function when it reruns on its own.
+
+    In a full rerun the fragment runs inside the page's recording, so it
+    isn't recorded twice.
+    """
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _fragment_rerun():
+                return func(*args, **kwargs)
+            recording = begin(f"{page} {func.__name__}", query_flag)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                end(recording)
+        return wrapper
+    return decorate
@@ -0,0 +1,259 @@
+"""Local BM25 retrieval over the PubMed articles the app has already fetched.
+
+Every article table that comes back from efetch is added to a SQLite document
+store (``RETRIEVAL_PATH``) and to an in-memory index. The index is a list of
+segments, each a sparse CSC term-frequency matrix (documents x vocabulary), so
+adding articles appends a small segment instead of rebuilding everything.
+Segments are merged once there are too many. A query slices just the query
+term columns from each segment and scores them with BM25, so answering takes
+milliseconds even with 100k+ abstracts and never touches the network.
+
+Dense embeddings were left out: BM25 alone meets the latency target, and
+they would need a model this app doesn't ship.
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+
+import numpy as np
+import scipy.sparse as sp
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), ".data", "retrieval.sqlite3")
+
+K1 = 1.2
+B = 0.75
+MAX_SEGMENTS = 8
+
+_TOKEN = re.compile(r"[a-z0-9]+(?:-[a-z0-9]+)*")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the their this to was were "
+    "which with we our these those than then there been not no but can may also after before between "
+    "during into over under using used use study studies patients patient results result".split()
+)
+
+# "what's new for X", "what is new in X", "latest on X" -> X
+_QUESTION = re.compile(r"^\s*(?:what'?s|what is)\s+new\s+(?:for|in|on|about)\s+|^\s*latest\s+(?:on|for|in)\s+", re.I)
+
+
+def tokenize(text):
+    return [token for token in _TOKEN.findall(text.lower()) if len(token) > 1 and token not in STOPWORDS]
+
+
+def question_topic(question):
+    """Strip "what's new for" style phrasing, leaving the topic to search for."""
+    return _QUESTION.sub("", question).strip(" ?.!")
+
+
+class _Segment:
+    def __init__(self, tf, doc_ids):
+        self.tf = tf.tocsc()
+        self.doc_ids = doc_ids
+        self.lengths = np.asarray(tf.sum(axis=1)).ravel().astype(np.float32)
+
+
+class BM25Index:
+    def __init__(self):
+        self.vocabulary = {}
+        self.doc_freq = np.zeros(0, dtype=np.int64)
+        self.segments = []
+        self.n_docs = 0
+        self.total_length = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, doc_ids, texts):
+        """Index a batch of documents; ``doc_ids`` are row numbers in the store.
+
+        Safe to run alongside ``search``, but not alongside another ``add``
+        (``ArticleIndex.refresh`` serializes them).
+        """
+        rows, cols = [], []
+        for row, text in enumerate(texts):
+            for token in tokenize(text):
+                col = self.vocabulary.get(token)
+                if col is None:
+                    col = self.vocabulary[token] = len(self.vocabulary)
+                rows.append(row)
+                cols.append(col)
+        if not texts:
+            return
+        n_terms = len(self.vocabulary)
+        # Duplicate (row, col) pairs are summed, which gives term frequencies
+        tf = sp.coo_matrix(
+            (np.ones(len(rows), dtype=np.float32), (np.array(rows, dtype=np.int32), np.array(cols, dtype=np.int32))),
+            shape=(len(texts), n_terms),
+        ).tocsr()
+        tf.sum_duplicates()
+        segment = _Segment(tf, np.asarray(doc_ids, dtype=np.int64))
+        with self._lock:
+            doc_freq = np.zeros(n_terms, dtype=np.int64)
+            doc_freq[: len(self.doc_freq)] = self.doc_freq
+            doc_freq += np.diff(segment.tf.indptr)
+            self.doc_freq = doc_freq
+            self.segments.append(segment)
+            self.n_docs += len(texts)
+            self.total_length += float(segment.lengths.sum())
+            if len(self.segments) > MAX_SEGMENTS:
+                self._merge()
+
+    def _merge(self):
+        # Fold the small segments together and leave the big one alone unless
+        # they have grown to its size, so each document is rewritten O(log n) times
+        segments = sorted(self.segments, key=lambda segment: -len(segment.doc_ids))
+        largest, rest = segments[0], segments[1:]
+        if sum(len(segment.doc_ids) for segment in rest) >= len(largest.doc_ids):
+            largest, rest = None, segments
+        n_terms = len(self.vocabulary)
+        tf = sp.vstack([self._padded(segment.tf, n_terms) for segment in rest], format="csr")
+        merged = _Segment(tf, np.concatenate([segment.doc_ids for segment in rest]))
+        self.segments = [merged] if largest is None else [largest, merged]
+
+    @staticmethod
+    def _padded(matrix, n_terms):
+        if matrix.shape[1] == n_terms:
+            return matrix
+        matrix = matrix.tocsr()
+        return sp.csr_matrix((matrix.data, matrix.indices, matrix.indptr), shape=(matrix.shape[0], n_terms))
+
+    def search(self, query, k=10):
+        """``[(doc_id, score)]`` for the best ``k`` documents."""
+        tokens = tokenize(query)
+        with self._lock:
+            segments = list(self.segments)
+            n_docs, total_length, doc_freq = self.n_docs, self.total_length, self.doc_freq
+            # add() grows the vocabulary before it publishes doc_freq and the
+            # segment; a term without a doc_freq entry is in no published segment
+            cols = sorted({col for col in map(self.vocabulary.get, tokens) if col is not None and col < len(doc_freq)})
+        if not cols or not n_docs:
+            return []
+        df = doc_freq[cols].astype(np.float64)
+        idf = np.log1p((n_docs - df + 0.5) / (df + 0.5)).astype(np.float32)
+        avg_length = total_length / n_docs
+
+        all_ids, all_scores = [], []
+        for segment in segments:
+            present = [i for i, col in enumerate(cols) if col < segment.tf.shape[1]]
+            if not present:
+                continue
+            sub = segment.tf[:, [cols[i] for i in present]].tocsc()
+            if not sub.nnz:
+                continue
+            # BM25 on the non-zero entries only
+            rows = sub.indices
+            term_of = np.repeat(np.arange(sub.shape[1]), np.diff(sub.indptr))
+            tf = sub.data
+            norm = K1 * (1 - B + B * segment.lengths[rows] / avg_length)
+            weights = idf[present][term_of] * tf * (K1 + 1) / (tf + norm)
+            scores = np.bincount(rows, weights=weights, minlength=sub.shape[0])
+            hits = np.flatnonzero(scores)
+            all_ids.append(segment.doc_ids[hits])
+            all_scores.append(scores[hits])
+        if not all_ids:
+            return []
+        ids = np.concatenate(all_ids)
+        scores = np.concatenate(all_scores)
+        top = np.argpartition(-scores, min(k, len(scores) - 1))[:k]
+        top = top[np.argsort(-scores[top])]
+        return list(zip(ids[top].tolist(), scores[top].tolist()))
+
+
+class ArticleIndex:
+    """SQLite document store plus the in-memory BM25 index over it."""
+
+    COLUMNS = ("pmid", "title", "journal", "published", "link", "abstract")
+
+    def __init__(self, path=None):
+        self.path = path or os.environ.get("RETRIEVAL_PATH", DEFAULT_PATH)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        self._conn().execute(
+            "CREATE TABLE IF NOT EXISTS articles ("
+            " id INTEGER PRIMARY KEY,"
+            " pmid TEXT UNIQUE NOT NULL,"
+            " title TEXT, journal TEXT, published TEXT, link TEXT, abstract TEXT,"
+            " added_at REAL NOT NULL)"
+        )
+        self.bm25 = BM25Index()
+        self._loaded_up_to = 0
+        self._refresh_lock = threading.Lock()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def refresh(self):
+        """Index rows added since the last refresh (by this or any other replica)."""
+        with self._refresh_lock:
+            rows = self._conn().execute(
+                "SELECT id, title, abstract FROM articles WHERE id > ? ORDER BY id", (self._loaded_up_to,)
+            ).fetchall()
+            if rows:
+                self.bm25.add([row[0] for row in rows], [f"{row[1]} {row[1]} {row[2]}" for row in rows])
+                self._loaded_up_to = rows[-1][0]
+        return len(rows)
+
+    def add_articles(self, table):
+        """Store an article table from ``tables.article_table`` and index the new rows."""
+        rows = [
+            (a["PMID"], a["Title"], a["Journal"], a["Published"], a["Link"], a["Abstract"], time.time())
+            for a in table.to_pylist()
+            if a["PMID"]
+        ]
+        conn = self._conn()
+        with conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO articles (pmid, title, journal, published, link, abstract, added_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+        self.refresh()
+
+    def __len__(self):
+        return self.bm25.n_docs
+
+    def search(self, query, k=10):
+        """Best matching articles as dicts, with a ``score`` key."""
+        self.refresh()
+        hits = self.bm25.search(query, k=k)
+        if not hits:
+            return []
+        ids = [doc_id for doc_id, _ in hits]
+        rows = self._conn().execute(
+            f"SELECT id, {', '.join(self.COLUMNS)} FROM articles WHERE id IN ({','.join('?' * len(ids))})", ids
+        ).fetchall()
+        by_id = {row[0]: dict(zip(self.COLUMNS, row[1:])) for row in rows}
+        return [dict(by_id[doc_id], score=score) for doc_id, score in hits if doc_id in by_id]
+
+
+def answer(question, k=5):
+    """Articles answering a question from the local index only.
+
+    "What's new for X" questions list the newest of the relevant articles
+    (PMIDs are assigned in order, so a higher PMID is a newer record); other
+    questions list the best matches.
+    """
+    topic = question_topic(question)
+    if topic == question.strip(" ?.!"):
+        return get_index().search(topic, k=k)
+    hits = get_index().search(topic, k=k * 4)
+    hits.sort(key=lambda hit: -int(hit["pmid"]) if hit["pmid"].isdigit() else 0)
+    return hits[:k]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = ArticleIndex()
+        return _index
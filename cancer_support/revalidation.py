@@ -0,0 +1,109 @@
+"""Conditional GETs for cached upstream calls.
+
+When a cached entry made with ``cached(..., revalidate=True)`` goes stale, the
+cache keeps its body and the ``ETag``/``Last-Modified`` validators that came
+with it. The refetch runs inside ``conditional()``, so ``get()`` sends
+``If-None-Match``/``If-Modified-Since``. A ``304 Not Modified`` raises
+``NotModified``; the cache then extends the old entry instead of downloading
+and parsing it again.
+
+``get()`` also counts requests, 304s and body bytes per upstream. ``stats()``
+reports them, so it is visible which services actually honour validators.
+A ``stream=True`` response is read with ``iter_body()``, which counts its
+bytes as they arrive.
+"""
+import contextlib
+import threading
+from collections import Counter, defaultdict
+
+from cancer_support import admission
+from cancer_support.transport import get_session
+
+_local = threading.local()
+_stats = defaultdict(Counter)
+_stats_lock = threading.Lock()
+
+
+class NotModified(Exception):
+    """The upstream answered 304: the cached body is still current."""
+
+
+@contextlib.contextmanager
+def conditional(validators=None):
+    """Send ``validators`` with the ``get()`` calls made inside the block.
+
+    Yields a dict that collects the validators of the response.
+    """
+    previous = getattr(_local, "state", None)
+    received = {}
+    _local.state = (validators or {}, received)
+    try:
+        yield received
+    finally:
+        _local.state = previous
+
+
+def get(upstream, url, headers=None, **kwargs):
+    """``get_session().get`` with conditional headers; raises ``NotModified`` on a 304.
+
+    Waits for the upstream's admission control first (see admission.py).
+    """
+    validators, received = getattr(_local, "state", None) or ({}, {})
+    headers = dict(headers or {})
+    if validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
+    # The cache's validators always carry fresh_until; only a sent validator makes it conditional
+    sent = "If-None-Match" in headers or "If-Modified-Since" in headers
+    admission.acquire(upstream)
+    response = get_session().get(url, headers=headers, **kwargs)
+
+    # Content-Length is the size on the wire when the body was compressed
+    size = response.headers.get("Content-Length")
+    with _stats_lock:
+        counts = _stats[upstream]
+        counts["requests"] += 1
+        counts["conditional"] += sent
+        if size and size.isdigit():
+            counts["bytes"] += int(size)
+        elif not kwargs.get("stream"):
+            counts["bytes"] += len(response.content)
+        counts["not_modified"] += response.status_code == 304
+    if response.status_code == 304:
+        raise NotModified(url)
+    response.raise_for_status()
+    if response.headers.get("ETag"):
+        received["etag"] = response.headers["ETag"]
+    if response.headers.get("Last-Modified"):
+        received["last_modified"] = response.headers["Last-Modified"]
+    return response
+
+
+def iter_body(upstream, response, chunk_size=16 * 1024):
+    """Decoded body chunks of a ``stream=True`` response from ``get()``."""
+    size = response.headers.get("Content-Length")
+    counted = bool(size and size.isdigit())
+    try:
+        for chunk in response.iter_content(chunk_size):
+            if not counted:
+                with _stats_lock:
+                    _stats[upstream]["bytes"] += len(chunk)
+            yield chunk
+    finally:
+        # Hands the connection back to the pool even if parsing stopped early
+        response.close()
+
+
+def stats():
+    """``{upstream: {"requests", "conditional", "not_modified", "bytes", "not_modified_rate"}}``."""
+    with _stats_lock:
+        snapshot = {upstream: dict(counts) for upstream, counts in _stats.items()}
+    for counts in snapshot.values():
+        counts["not_modified_rate"] = counts["not_modified"] / counts["conditional"] if counts["conditional"] else 0.0
+    return snapshot
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats.clear()
@@ -0,0 +1,277 @@
+"""Offline drive times to hospitals over a road graph from an OpenStreetMap extract.
+
+``scripts/build_road_graph.py`` turns an extract into ``data/roads.bin``
+(``ROAD_GRAPH_PATH``). Ways are split at junctions, so the graph keeps one
+node per junction or dead end. Each stretch of road between two of them
+becomes one edge, weighted with its free-flow drive time (``maxspeed``, or
+``SPEEDS`` by highway class). Shape points never reach the graph, which
+makes it several times smaller than the raw extract. Edges are stored in
+CSR order, so the file is memory-mapped and used as a
+``scipy.sparse.csr_matrix`` without copying or parsing.
+
+A query snaps the origin and every hospital to their nearest junction
+(``cKDTree`` on the unit sphere). It then runs one Dijkstra from the origin,
+bounded at the cut-off (``scipy.sparse.csgraph``), which gives the times to
+all the hospitals at once. The straight-line legs to and from the road are
+added at ``ACCESS_KMH``. Points farther than ``SNAP_KM`` from any junction
+are outside the extract and get no time. A hospital without a time is never
+filtered out. When the origin itself is off the graph, nothing is filtered
+and the rows keep their straight-line order.
+
+File layout, all little-endian, arrays in this order after the header:
+
+    header   magic "RTG1", n_nodes, n_edges   (uint32 x 2)
+    indptr   int32[n_nodes + 1]
+    indices  int32[n_edges]     edge targets
+    seconds  float64[n_edges]   drive time
+    lat      float32[n_nodes]
+    lon      float32[n_nodes]
+"""
+import mmap
+import os
+import re
+import struct
+import threading
+
+import numpy as np
+import pyarrow as pa
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+from scipy.spatial import cKDTree
+
+from cancer_support import lodging
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "roads.bin")
+
+MAGIC = b"RTG1"
+HEADER = struct.Struct("<4sII")
+
+# km/h by highway class when a way has no usable maxspeed; classes not
+# listed aren't driven on
+SPEEDS = {
+    "motorway": 100, "motorway_link": 60,
+    "trunk": 80, "trunk_link": 50,
+    "primary": 60, "primary_link": 45,
+    "secondary": 50, "secondary_link": 40,
+    "tertiary": 40, "tertiary_link": 35,
+    "unclassified": 35, "residential": 25, "road": 30,
+    "living_street": 10, "service": 15,
+}
+
+ACCESS_KMH = 20.0
+SNAP_KM = float(os.environ.get("ROUTING_SNAP_KM", 5.0))
+MAX_MINUTES = float(os.environ.get("ROUTING_MAX_MINUTES", 120))
+
+_MPH = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*mph\s*$")
+_KMH = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*(?:km/h)?\s*$")
+
+
+def way_speed(tags):
+    """km/h for a way's tags, or None if cars can't use it."""
+    speed = SPEEDS.get(tags.get("highway"))
+    if speed is None or tags.get("access") in ("no", "private") or tags.get("motor_vehicle") == "no":
+        return None
+    maxspeed = tags.get("maxspeed", "")
+    mph = _MPH.match(maxspeed)
+    kmh = _KMH.match(maxspeed)
+    if mph:
+        return float(mph.group(1)) * 1.609344 or speed
+    if kmh:
+        return float(kmh.group(1)) or speed
+    return speed
+
+
+def way_direction(tags):
+    """1 one way along the nodes, -1 against them, 0 both ways."""
+    oneway = tags.get("oneway", "")
+    if oneway in ("yes", "true", "1"):
+        return 1
+    if oneway in ("-1", "reverse"):
+        return -1
+    if oneway == "no":
+        return 0
+    implied = tags.get("highway") in ("motorway", "motorway_link") or tags.get("junction") == "roundabout"
+    return 1 if implied else 0
+
+
+def build_graph(node_ids, lat, lon, ways):
+    """CSR arrays ``(indptr, indices, seconds, lat, lon)`` of the junction graph.
+
+    ``node_ids``/``lat``/``lon`` describe every node the ways use, and
+    ``ways`` is a list of ``(node ids, km/h, direction)``. A way's nodes must
+    all be known (split ways where the extract cut them off).
+    """
+    node_ids = np.asarray(node_ids, dtype=np.int64)
+    order = np.argsort(node_ids)
+    node_ids, lat, lon = node_ids[order], np.asarray(lat)[order], np.asarray(lon)[order]
+    ways = [way for way in ways if len(way[0]) >= 2]
+    lengths = np.array([len(refs) for refs, _, _ in ways], dtype=np.int64)
+    refs = np.searchsorted(node_ids, np.concatenate([np.asarray(refs, dtype=np.int64) for refs, _, _ in ways]))
+    way = np.repeat(np.arange(len(ways)), lengths)
+    starts = np.cumsum(lengths) - lengths
+    ends = starts + lengths - 1
+
+    # Junctions: nodes used more than once, and the ends of every way
+    uses = np.bincount(refs, minlength=len(node_ids))
+    uses[refs[starts]] += 1
+    uses[refs[ends]] += 1
+    junction = uses >= 2
+
+    # Consecutive node pairs within a way, with their drive time
+    pair = np.flatnonzero(way[:-1] == way[1:])
+    a, b = refs[pair], refs[pair + 1]
+    mean_lat = np.radians((lat[a] + lat[b]) / 2)
+    dy = np.radians(lat[b] - lat[a])
+    dx = np.radians(lon[b] - lon[a]) * np.cos(mean_lat)
+    km = lodging.EARTH_RADIUS_KM * np.hypot(dx, dy)
+    kmh = np.array([speed for _, speed, _ in ways], dtype=np.float64)
+    seconds = km / kmh[way[pair]] * 3600
+
+    # Pairs from one junction to the next make a stretch: one edge
+    stretch = np.cumsum(junction[a]) - 1
+    total = np.bincount(stretch, weights=seconds)
+    first = np.ones(len(pair), dtype=bool)
+    first[1:] = stretch[1:] != stretch[:-1]
+    last = np.ones(len(pair), dtype=bool)
+    last[:-1] = first[1:]
+    source, target = a[first], b[last]
+    direction = np.array([direction for _, _, direction in ways], dtype=np.int8)[way[pair[first]]]
+
+    # Both directions unless one way; zero-time edges would read as missing
+    total = np.maximum(total, 0.01)
+    forward = direction >= 0
+    backward = direction <= 0
+    u = np.concatenate([source[forward], target[backward]])
+    v = np.concatenate([target[forward], source[backward]])
+    t = np.concatenate([total[forward], total[backward]])
+    keep = u != v
+    u, v, t = u[keep], v[keep], t[keep]
+
+    # Renumber the junctions and keep the fastest of parallel edges
+    index = np.cumsum(junction) - 1
+    u, v = index[u], index[v]
+    by_edge = np.lexsort((t, v, u))
+    u, v, t = u[by_edge], v[by_edge], t[by_edge]
+    unique = np.ones(len(u), dtype=bool)
+    unique[1:] = (u[1:] != u[:-1]) | (v[1:] != v[:-1])
+    u, v, t = u[unique], v[unique], t[unique]
+    n = int(junction.sum())
+    indptr = np.concatenate([[0], np.cumsum(np.bincount(u, minlength=n))])
+    return indptr, v, t, lat[junction], lon[junction]
+
+
+def write_graph(path, indptr, indices, seconds, lat, lon):
+    """Write a road graph file from ``build_graph``'s arrays."""
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(lat), len(indices)))
+        f.write(np.asarray(indptr, dtype="<i4").tobytes())
+        f.write(np.asarray(indices, dtype="<i4").tobytes())
+        f.write(np.asarray(seconds, dtype="<f8").tobytes())
+        f.write(np.asarray(lat, dtype="<f4").tobytes())
+        f.write(np.asarray(lon, dtype="<f4").tobytes())
+
+
+class RoadGraph:
+    def __init__(self, path=DEFAULT_PATH):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buf = memoryview(self._mmap)
+        magic, n_nodes, n_edges = HEADER.unpack_from(buf)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a road graph file")
+
+        offset = HEADER.size
+
+        def take(dtype, count):
+            nonlocal offset
+            array = np.frombuffer(buf, dtype=dtype, count=count, offset=offset)
+            offset += array.nbytes
+            return array
+
+        indptr = take("<i4", n_nodes + 1)
+        indices = take("<i4", n_edges)
+        seconds = take("<f8", n_edges)
+        # int32 indices and float64 weights are what csgraph works in, so
+        # neither the matrix nor a query copies the mapped arrays
+        self.matrix = csr_matrix((seconds, indices, indptr), shape=(n_nodes, n_nodes), copy=False)
+        self.lat = take("<f4", n_nodes)
+        self.lon = take("<f4", n_nodes)
+        self.tree = cKDTree(lodging.unit_vectors(self.lat, self.lon))
+
+    def __len__(self):
+        return len(self.lat)
+
+    def snap(self, lat, lon):
+        """``(junction, km)`` for each point: its nearest junction and how far it is."""
+        chord, node = self.tree.query(lodging.unit_vectors(lat, lon))
+        return node, 2 * lodging.EARTH_RADIUS_KM * np.arcsin(np.minimum(chord / 2, 1.0))
+
+    def covers(self, lat, lon):
+        """Whether a point is close enough to a junction to route from."""
+        _, (km,) = self.snap([lat], [lon])
+        return km <= SNAP_KM
+
+    def drive_minutes(self, origin_lat, origin_lon, lat, lon, max_minutes=MAX_MINUTES):
+        """Minutes from the origin to each point: inf past ``max_minutes``, NaN if off the graph."""
+        (origin,), (origin_km,) = self.snap([origin_lat], [origin_lon])
+        minutes = np.full(len(lat), np.nan)
+        if not len(lat) or origin_km > SNAP_KM:
+            return minutes
+        nodes, km = self.snap(lat, lon)
+        # One search from the origin, stopped at the cut-off, reaches every target
+        seconds = dijkstra(self.matrix, directed=True, indices=int(origin), limit=max_minutes * 60)
+        minutes = (seconds[nodes] + (origin_km + km) / ACCESS_KMH * 3600) / 60
+        minutes[minutes > max_minutes] = np.inf
+        minutes[km > SNAP_KM] = np.nan
+        return minutes
+
+
+_graph = None
+_graph_lock = threading.Lock()
+
+
+def get_graph():
+    """Shared graph, or None when no road graph has been built."""
+    global _graph
+    with _graph_lock:
+        if _graph is None:
+            path = os.environ.get("ROAD_GRAPH_PATH", DEFAULT_PATH)
+            if not os.path.exists(path):
+                return None
+            _graph = RoadGraph(path)
+        return _graph
+
+
+def available():
+    return get_graph() is not None
+
+
+def covers(coords):
+    """Whether drive times can be computed from ``coords`` (a graph exists and reaches it)."""
+    graph = get_graph()
+    return graph is not None and graph.covers(coords["lat"], coords["lon"])
+
+
+def add_drive_times(coords, table, max_minutes=None):
+    """``table`` with a "Drive (min)" column, nearest first, within ``max_minutes`` if given.
+
+    Without a road graph, or from an origin it doesn't reach, the column is
+    empty and the rows keep their order. Hospitals off the graph are kept,
+    without a time, after the others.
+    """
+    graph = get_graph()
+    if graph is None:
+        return table.append_column("Drive (min)", pa.nulls(table.num_rows, pa.float64()))
+    minutes = graph.drive_minutes(
+        coords["lat"], coords["lon"],
+        table["Latitude"].to_numpy(), table["Longitude"].to_numpy(),
+        max_minutes=max_minutes or MAX_MINUTES,
+    )
+    # Unknown times (NaN) sort last and stay; a cut-off drops only those past it (inf)
+    order = np.argsort(minutes, kind="stable")
+    if max_minutes:
+        order = order[~np.isinf(minutes[order])]
+    minutes = np.round(minutes[order], 1)
+    minutes[np.isinf(minutes)] = np.nan
+    table = table.take(pa.array(order))
+    return table.append_column("Drive (min)", pa.array(minutes, pa.float64(), from_pandas=True))
@@ -0,0 +1,107 @@
+"""The hospital, research and trial searches, shared by the pages and the JSON API.
+
+Each function runs one search end to end through the cached fetches in
+``sources``, with the same arguments the pages have always used, so the
+Streamlit app, ``api.py`` and the cache warmer all hit the same cache keys
+and connection pools. Results are Arrow tables. Rows still reach a
+``tables.row_listener`` while a response downloads, so the pages can show
+them as they are parsed.
+
+A trial's full record (eligibility, contacts, sites) is fetched only when
+its card is opened, and is cached by NCT id. ``prefetch_trial_details``
+fetches the next few cards' records in the background, so opening them is a
+cache hit.
+"""
+import concurrent.futures
+import logging
+import os
+import threading
+
+from cancer_support import centers, routing, sources, tables
+
+logger = logging.getLogger(__name__)
+
+HOSPITAL_RADIUS = 50000
+RESEARCH_LIMIT = 10
+TRIALS_LIMIT = 20
+
+PHASES = ("All", "Phase 1", "Phase 2", "Phase 3", "Phase 4")
+
+PREFETCH_TRIALS = int(os.environ.get("TRIAL_PREFETCH", 3))
+PREFETCH_WORKERS = 2
+
+_prefetch_pool = None
+_prefetching = set()
+_prefetch_lock = threading.Lock()
+
+
+class LocationNotFound(LookupError):
+    """Neither the gazetteer nor Nominatim knows the location."""
+
+
+def find_hospitals(location, oncology_only=False, max_minutes=None):
+    """``(coords, hospitals)`` within 50 km of ``location``; raises ``LocationNotFound``.
+
+    With a road graph, hospitals are ordered by drive time and those more
+    than ``max_minutes`` away are left out (``routing.py``). NCI-designated
+    cancer centers are marked and listed first (``centers.py``).
+    """
+    coords = sources.resolve_location(location)
+    if not coords:
+        raise LocationNotFound(location)
+    hospitals = sources.overpass_hospitals(
+        coords["lat"], coords["lon"], radius=HOSPITAL_RADIUS, oncology_only=oncology_only
+    )
+    # rank_hospitals' sort is stable, so each group stays in drive-time order
+    hospitals = routing.add_drive_times(coords, hospitals, max_minutes)
+    return coords, centers.rank_hospitals(hospitals)
+
+
+def latest_research(term, limit=RESEARCH_LIMIT):
+    """The newest ``limit`` PubMed articles about ``term`` (an empty table when there are none)."""
+    id_list = sources.pubmed_search(term, retmax=limit)
+    if not id_list:
+        return tables.ARTICLE_SCHEMA.empty_table()
+    return sources.pubmed_articles(id_list)
+
+
+def find_trials(cancer_type, location, phase="All", limit=TRIALS_LIMIT):
+    """Trials for a cancer type near ``location``, optionally in one phase."""
+    return sources.trials_search(sources.trials_query(cancer_type, location, phase), max_rnk=limit)
+
+
+def trial_details(nct_id):
+    """The compact full record of one trial (``tables.trial_record``), cached by NCT id."""
+    return sources.trial_details(nct_id)
+
+
+def _prefetch(nct_id):
+    try:
+        sources.trial_details(nct_id)
+    except Exception as e:
+        # The card fetches (and reports) it again if it is opened
+        logger.info("Prefetching trial %s failed: %s", nct_id, e)
+    finally:
+        with _prefetch_lock:
+            _prefetching.discard(nct_id)
+
+
+def prefetch_trial_details(nct_ids):
+    """Fetch the records of ``nct_ids`` in the background, unless cached or already on their way.
+
+    The pool's threads have no session, so admission control puts their
+    fetches in the background lane, behind any interactive search.
+    """
+    global _prefetch_pool
+    for nct_id in nct_ids:
+        if not nct_id or sources.trial_details.expires_at(nct_id) is not None:
+            continue
+        with _prefetch_lock:
+            if nct_id in _prefetching:
+                continue
+            _prefetching.add(nct_id)
+            if _prefetch_pool is None:
+                _prefetch_pool = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=PREFETCH_WORKERS, thread_name_prefix="trial-prefetch"
+                )
+        _prefetch_pool.submit(_prefetch, nct_id)
@@ -0,0 +1,212 @@
+"""Bounded per-session memory for results kept between reruns.
+
+Large results a session keeps between reruns, such as the lodging panel's
+hospitals and lodging tables, live here rather than in ``st.session_state``.
+That way the process can count them and hold them under a fixed budget:
+
+- Each object is charged to its session at its in-memory size: Arrow
+  ``nbytes``, pandas ``memory_usage(deep=True)``, or a recursive estimate
+  for dicts and lists.
+- When the total passes ``SESSION_MEMORY_MB`` (default 256), the least
+  recently used objects are dropped. Sessions idle for longer than
+  ``SESSION_IDLE_SECONDS`` (default 60) lose theirs first. One session holds
+  at most ``SESSION_MEMORY_MAX_MB`` (default 32).
+- An entry remembers the call that made it, usually one of the cached
+  fetches in ``sources``. A dropped object is rebuilt from that call when
+  its session needs it again. The rebuild is a cache hit that decodes
+  compact Arrow IPC, not an upstream request.
+
+``stats()`` reports bytes per session, totals, evictions and rebuilds.
+"""
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import pyarrow as pa
+
+MB = 1024 * 1024
+
+# Calls remembered for dropped objects, so they can be rebuilt (oldest forgotten first)
+MAX_TOMBSTONES = 10000
+
+
+def sizeof(value, _seen=None):
+    """Approximate bytes held by ``value`` (Arrow, pandas and numpy data included)."""
+    if isinstance(value, (pa.Table, pa.RecordBatch, pa.Array, pa.ChunkedArray)):
+        return value.nbytes
+    if hasattr(value, "memory_usage") and hasattr(value, "dtypes"):
+        # pandas DataFrame or Series
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum()) if hasattr(usage, "sum") else int(usage)
+    if hasattr(value, "nbytes") and hasattr(value, "dtype"):
+        return int(value.nbytes)
+    _seen = set() if _seen is None else _seen
+    if id(value) in _seen:
+        return 0
+    _seen.add(id(value))
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(sizeof(k, _seen) + sizeof(v, _seen) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(sizeof(item, _seen) for item in value)
+    return size
+
+
+class Entry:
+    __slots__ = ("call", "value", "nbytes")
+
+    def __init__(self, call, value, nbytes):
+        self.call = call
+        self.value = value
+        self.nbytes = nbytes
+
+
+class Store:
+    """Objects per ``(session, name)`` in one LRU order, under a global byte budget."""
+
+    def __init__(self, budget, session_max, idle_after, clock=time.monotonic):
+        self.budget = budget
+        self.session_max = session_max
+        self.idle_after = idle_after
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.tombstones = OrderedDict()
+        self.session_bytes = {}
+        self.last_seen = {}
+        self.total = 0
+        self.evicted = 0
+        self.rebuilt = 0
+
+    def keep(self, session, name, func, *args, **kwargs):
+        """``func(*args, **kwargs)``, reusing the object kept for the same call."""
+        call = (func, args, tuple(sorted(kwargs.items())))
+        with self.lock:
+            entry = self.entries.get((session, name))
+            if entry is not None and entry.call == call:
+                self.entries.move_to_end((session, name))
+                self.last_seen[session] = self.clock()
+                return entry.value
+            if self.tombstones.get((session, name)) == call:
+                self.rebuilt += 1
+        value = func(*args, **kwargs)
+        self._put(session, name, call, value)
+        return value
+
+    def _put(self, session, name, call, value):
+        nbytes = sizeof(value)
+        with self.lock:
+            self._remove((session, name))
+            self.tombstones.pop((session, name), None)
+            if nbytes > self.session_max:
+                # Too big to keep at all; the caller still gets it for this rerun
+                self._bury((session, name), call)
+                return
+            self.entries[(session, name)] = Entry(call, value, nbytes)
+            self.last_seen[session] = self.clock()
+            self.session_bytes[session] = self.session_bytes.get(session, 0) + nbytes
+            self.total += nbytes
+            self._shrink(session)
+
+    def _remove(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return None
+        session = key[0]
+        self.session_bytes[session] -= entry.nbytes
+        if not self.session_bytes[session]:
+            del self.session_bytes[session]
+            del self.last_seen[session]
+        self.total -= entry.nbytes
+        return entry
+
+    def _bury(self, key, call):
+        self.tombstones[key] = call
+        while len(self.tombstones) > MAX_TOMBSTONES:
+            self.tombstones.popitem(last=False)
+
+    def _evict(self, key):
+        entry = self._remove(key)
+        self._bury(key, entry.call)
+        self.evicted += 1
+
+    def _shrink(self, session):
+        """Evict until ``session`` and the process are within their budgets."""
+        while self.session_bytes.get(session, 0) > self.session_max:
+            self._evict(next(key for key in self.entries if key[0] == session))
+        if self.total <= self.budget:
+            return
+        now = self.clock()
+        idle, active = [], []
+        for key in self.entries:
+            (idle if now - self.last_seen.get(key[0], 0) > self.idle_after else active).append(key)
+        # Idle sessions first, then active ones (the caller's own last), each oldest first
+        active.sort(key=lambda key: key[0] == session)
+        for key in idle + active:
+            if self.total <= self.budget:
+                break
+            self._evict(key)
+
+    def stats(self):
+        with self.lock:
+            per_session = dict(self.session_bytes)
+            return {
+                "budget": self.budget,
+                "bytes": self.total,
+                "objects": len(self.entries),
+                "sessions": len(per_session),
+                "per_session": per_session,
+                "max_session_bytes": max(per_session.values(), default=0),
+                "mean_session_bytes": self.total / len(per_session) if per_session else 0.0,
+                "evicted": self.evicted,
+                "rebuilt": self.rebuilt,
+            }
+
+
+def _megabytes(name, default):
+    return float(os.environ.get(name, default)) * MB
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = Store(
+                budget=_megabytes("SESSION_MEMORY_MB", 256),
+                session_max=_megabytes("SESSION_MEMORY_MAX_MB", 32),
+                idle_after=float(os.environ.get("SESSION_IDLE_SECONDS", 60)),
+            )
+        return _store
+
+
+def current_session():
+    """The Streamlit session id of the calling script thread (``"local"`` outside one)."""
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+        ctx = get_script_run_ctx(suppress_warning=True)
+    except Exception:
+        ctx = None
+    return ctx.session_id if ctx is not None else "local"
+
+
+def keep(name, func, *args, **kwargs):
+    """``func(*args, **kwargs)``, kept for the calling session under ``name`` until evicted."""
+    return get_store().keep(current_session(), name, func, *args, **kwargs)
+
+
+def stats():
+    """Kept bytes per session and in total, with eviction and rebuild counts."""
+    return get_store().stats()
+
+
+def reset():
+    global _store
+    with _store_lock:
+        _store = None
@@ -0,0 +1,163 @@
+"""One function per upstream call, each cached in its own namespace.
+
+Cached fetches go through ``revalidation.get`` so a stale entry is refreshed
+with a conditional request (see cache.cached and revalidation.py).
+"""
+import logging
+
+from cancer_support import dedup, gazetteer, overpass, retrieval, revalidation, tables
+from cancer_support.cache import cached
+
+NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
+OVERPASS_URL = "http://overpass-api.de/api/interpreter"
+ESEARCH_URL = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esearch.fcgi"
+EFETCH_URL = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/efetch.fcgi"
+TRIALS_URL = "https://clinicaltrials.gov/api/query/study/search/brief"
+TRIAL_URL = "https://clinicaltrials.gov/api/v2/studies/{nct_id}"
+
+logger = logging.getLogger(__name__)
+
+HOUR = 60 * 60
+DAY = 24 * HOUR
+
+
+@cached("nominatim", ttl=30 * DAY)
+def geocode(location):
+    """Return ``{"lat": ..., "lon": ...}`` for a place name, or None."""
+    params = {"q": location, "format": "json", "limit": 1}
+    response = revalidation.get("nominatim", NOMINATIM_URL, params=params, timeout=10)
+    results = response.json()
+    if not results:
+        return None
+    return {"lat": float(results[0]["lat"]), "lon": float(results[0]["lon"])}
+
+
+def resolve_location(location):
+    """Coordinates for a city or ZIP code: offline gazetteer first, then Nominatim."""
+    match = gazetteer.lookup(location)
+    if match:
+        return {"lat": match.lat, "lon": match.lon}
+    return geocode(location)
+
+
+@cached("overpass", ttl=DAY, codec=tables.ArrowCodec, revalidate=True)
+def overpass_hospitals(lat, lon, radius=50000, oncology_only=False):
+    """Hospitals around a point as an Arrow table."""
+    query = overpass.hospital_query(lat, lon, radius=radius, oncology_only=oncology_only)
+    # requests sends "Accept-Encoding: gzip, deflate", which Overpass honours
+    response = revalidation.get("overpass", OVERPASS_URL, params={"data": query}, timeout=30)
+    hospitals = tables.hospital_table(response.json().get("elements", []))
+    # One row per campus rather than one per node/way/relation
+    return dedup.dedupe_hospitals(hospitals)
+
+
+@cached("overpass", ttl=DAY, codec=tables.ArrowDictCodec, revalidate=True)
+def overpass_area(lat, lon, radius=50000, oncology_only=False):
+    """Hospitals and lodging around a point in one request: ``{"hospitals": ..., "lodging": ...}``."""
+    query = overpass.area_query(lat, lon, radius=radius, oncology_only=oncology_only)
+    response = revalidation.get("overpass", OVERPASS_URL, params={"data": query}, timeout=30)
+    groups = tables.split_elements(response.json().get("elements", []))
+    return {
+        "hospitals": dedup.dedupe_hospitals(tables.hospital_table(groups.get("hospital", []))),
+        # Hotels sharing a name a few hundred metres apart are often separate buildings
+        "lodging": dedup.dedupe_hospitals(tables.lodging_table(groups.get("lodging", [])), threshold_m=100.0),
+    }
+
+
+@cached("pubmed", ttl=HOUR, revalidate=True)
+def pubmed_search(term, retmax=10):
+    """Newest PMIDs for a search term."""
+    params = {
+        "db": "pubmed",
+        "term": term,
+        "retmax": retmax,
+        "sort": "pub date",
+        "retmode": "json",
+    }
+    response = revalidation.get("pubmed", ESEARCH_URL, params=params, timeout=10)
+    return response.json()["esearchresult"]["idlist"]
+
+
+# ESearch won't page past this many results for one query
+ESEARCH_LIMIT = 10000
+
+
+def pubmed_search_since(term, mindate, maxdate, page_size=500):
+    """Every PMID added to PubMed (Entrez date) between two ``YYYY/MM/DD`` dates.
+
+    Pages through the results with ``retstart``. Raises ``ValueError`` when
+    more than ``ESEARCH_LIMIT`` match, since the rest couldn't be listed. Not
+    cached: the alert engine calls it once per term per run.
+    """
+    pmids = []
+    while True:
+        params = {
+            "db": "pubmed",
+            "term": term,
+            "datetype": "edat",
+            "mindate": mindate,
+            "maxdate": maxdate,
+            "retstart": len(pmids),
+            "retmax": page_size,
+            "retmode": "json",
+        }
+        response = revalidation.get("pubmed", ESEARCH_URL, params=params, timeout=10)
+        result = response.json()["esearchresult"]
+        count = int(result["count"])
+        if count > ESEARCH_LIMIT:
+            raise ValueError(f"{count} PubMed results for {term!r} since {mindate}; only {ESEARCH_LIMIT} can be listed")
+        pmids.extend(result["idlist"])
+        if not result["idlist"] or len(pmids) >= count:
+            return pmids
+
+
+@cached("pubmed", ttl=7 * DAY, codec=tables.ArrowCodec, revalidate=True)
+def pubmed_articles(pmids):
+    """Article table for a list of PMIDs."""
+    params = {
+        "db": "pubmed",
+        "id": ",".join(pmids),
+        "retmode": "xml",
+        "rettype": "abstract",
+    }
+    # Streamed, so rows reach a tables.row_listener while the body downloads
+    response = revalidation.get("pubmed", EFETCH_URL, params=params, timeout=10, stream=True)
+    articles = tables.article_stream_table(revalidation.iter_body("pubmed", response))
+    # Feed the local search index; it must never break the research page
+    try:
+        retrieval.get_index().add_articles(articles)
+    except Exception as e:
+        logger.warning("Could not index articles: %s", e)
+    return articles
+
+
+def trials_query(cancer_type, location, phase="All"):
+    """ClinicalTrials.gov search expression; ZIP codes become the nearest city name."""
+    place = gazetteer.lookup(location)
+    location_term = place.name if place and place.name else location
+    query = f"{cancer_type} AND {location_term}"
+    if phase != "All":
+        query += f" AND {phase}"
+    return query
+
+
+@cached("clinicaltrials", ttl=6 * HOUR, codec=tables.ArrowCodec, revalidate=True)
+def trials_search(query, max_rnk=20):
+    """Trial table for a search expression."""
+    params = {
+        "expr": query,
+        "min_rnk": 1,
+        "max_rnk": max_rnk,
+        "fmt": "xml",
+    }
+    response = revalidation.get("clinicaltrials", TRIALS_URL, params=params, timeout=10, stream=True)
+    return tables.trial_stream_table(revalidation.iter_body("clinicaltrials", response))
+
+
+@cached("clinicaltrials", ttl=DAY, revalidate=True)
+def trial_details(nct_id):
+    """Compact full record for one trial: summary, eligibility, contacts and sites."""
+    # The classic site's displayxml records are gone; the v2 API serves the study as JSON
+    url = TRIAL_URL.format(nct_id=nct_id)
+    response = revalidation.get("clinicaltrials", url, params={"format": "json"}, timeout=10)
+    return tables.trial_record(response.content)
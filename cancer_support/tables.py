@@ -0,0 +1,382 @@
+"""Columnar (Arrow) result tables for hospitals, articles and trials.
+
+Parsers append straight into typed column buffers instead of building one dict
+per row, and the finished ``pyarrow.Table`` goes to ``st.dataframe`` as is.
+The same tables are what the cache stores, as compressed Arrow IPC streams.
+
+The article and trial parsers also have streaming forms that take the HTTP
+body chunk by chunk (``XMLPullParser``) and finish each ``PubmedArticle`` or
+``clinical_study`` as soon as its closing tag arrives. Inside
+``row_listener(callback)`` every finished row is passed to the callback, which
+is how the search pages show the first results before the last have been
+downloaded.
+
+``trial_record`` is the exception: it turns one trial's full record, JSON
+from the ClinicalTrials.gov v2 API, into a compact dict for the expandable
+trial cards.
+"""
+import contextlib
+import json
+import threading
+from array import array
+import xml.etree.ElementTree as ET
+
+import numpy as np
+import pyarrow as pa
+
+from cancer_support import cache, overpass
+
+UNNAMED_HOSPITAL = "Unnamed Hospital"
+
+_local = threading.local()
+
+# Typed buffers for numeric columns; everything else is a Python list
+_NUMERIC_BUFFERS = {
+    pa.float64(): ("d", np.float64),
+    pa.int64(): ("q", np.int64),
+}
+
+HOSPITAL_SCHEMA = pa.schema(
+    [
+        ("Name", pa.string()),
+        ("Latitude", pa.float64()),
+        ("Longitude", pa.float64()),
+        ("osm_type", pa.string()),
+        ("osm_id", pa.int64()),
+    ]
+    + [(tag, pa.string()) for tag in overpass.HOSPITAL_TAGS if tag != "name"]
+)
+
+# Hospital results once routing.add_drive_times and centers.rank_hospitals have run
+RANKED_HOSPITAL_SCHEMA = pa.schema(
+    list(HOSPITAL_SCHEMA)
+    + [("Drive (min)", pa.float64()), ("Cancer center", pa.string()), ("NCI designation", pa.string())]
+)
+
+UNNAMED_LODGING = "Unnamed Lodging"
+
+LODGING_SCHEMA = pa.schema(
+    [
+        ("Name", pa.string()),
+        ("Category", pa.string()),
+        ("Latitude", pa.float64()),
+        ("Longitude", pa.float64()),
+        ("osm_type", pa.string()),
+        ("osm_id", pa.int64()),
+    ]
+    + [(tag, pa.string()) for tag in overpass.LODGING_TAGS if tag not in ("name", "tourism", "social_facility")]
+)
+
+LODGING_CATEGORIES = {
+    "hotel": "Hotel",
+    "motel": "Motel",
+    "guest_house": "Guest house",
+    "hostel": "Hostel",
+    "apartment": "Apartment",
+}
+
+ARTICLE_SCHEMA = pa.schema([
+    ("PMID", pa.string()),
+    ("Title", pa.string()),
+    ("Journal", pa.string()),
+    ("Published", pa.string()),
+    ("Link", pa.string()),
+    ("Abstract", pa.string()),
+])
+
+TRIAL_SCHEMA = pa.schema([
+    ("NCT ID", pa.string()),
+    ("Title", pa.string()),
+    ("Status", pa.string()),
+    ("Phase", pa.string()),
+    ("Locations", pa.string()),
+    ("Link", pa.string()),
+])
+
+
+class TableBuilder:
+    """Accumulates rows column by column and finishes into an Arrow table."""
+
+    def __init__(self, schema):
+        self.schema = schema
+        self.columns = {}
+        for field in schema:
+            typecode = _NUMERIC_BUFFERS.get(field.type)
+            self.columns[field.name] = array(typecode[0]) if typecode else []
+
+    def append(self, *values):
+        """Append one row, values in schema order."""
+        for column, value in zip(self.columns.values(), values):
+            column.append(value)
+
+    def __len__(self):
+        return len(next(iter(self.columns.values()), ()))
+
+    def finish(self):
+        arrays = []
+        for field in self.schema:
+            column = self.columns[field.name]
+            if field.type in _NUMERIC_BUFFERS:
+                # Zero-copy view of the typed buffer
+                arrays.append(pa.array(np.frombuffer(column, dtype=_NUMERIC_BUFFERS[field.type][1])))
+            else:
+                arrays.append(pa.array(column, type=field.type))
+        return pa.Table.from_arrays(arrays, schema=self.schema)
+
+
+def hospital_table(elements):
+    """Overpass elements -> hospital table; elements without coordinates are skipped."""
+    builder = TableBuilder(HOSPITAL_SCHEMA)
+    columns = builder.columns
+    names, lats, lons = columns["Name"], columns["Latitude"], columns["Longitude"]
+    osm_types, osm_ids = columns["osm_type"], columns["osm_id"]
+    tag_columns = [(tag, columns[tag]) for tag in overpass.HOSPITAL_TAGS if tag != "name"]
+    for element in elements:
+        lat, lon = overpass.element_coords(element)
+        if lat is None or lon is None:
+            continue
+        tags = element.get("tags", {})
+        names.append(tags.get("name") or UNNAMED_HOSPITAL)
+        # 7 decimals is OSM's own precision (~1 cm)
+        lats.append(round(float(lat), 7))
+        lons.append(round(float(lon), 7))
+        osm_types.append(tags.get("_type") or element.get("type", ""))
+        osm_ids.append(int(element.get("id", 0)))
+        for tag, column in tag_columns:
+            column.append(tags.get(tag, ""))
+    return builder.finish()
+
+
+def lodging_table(elements):
+    """Converted "lodging" elements -> lodging table."""
+    builder = TableBuilder(LODGING_SCHEMA)
+    tag_columns = LODGING_SCHEMA.names[6:]
+    for element in elements:
+        lat, lon = overpass.element_coords(element)
+        if lat is None or lon is None:
+            continue
+        tags = element.get("tags", {})
+        if tags.get("social_facility"):
+            category = "Hospitality house"
+        else:
+            category = LODGING_CATEGORIES.get(tags.get("tourism", ""), "Lodging")
+        builder.append(
+            tags.get("name") or UNNAMED_LODGING,
+            category,
+            round(float(lat), 7),
+            round(float(lon), 7),
+            tags.get("_type") or element.get("type", ""),
+            int(element.get("id", 0)),
+            *(tags.get(tag, "") for tag in tag_columns),
+        )
+    return builder.finish()
+
+
+def split_elements(elements):
+    """Group converted Overpass elements by their element type ("hospital", "lodging")."""
+    groups = {}
+    for element in elements:
+        groups.setdefault(element.get("type"), []).append(element)
+    return groups
+
+
+def _text(element, path, default=""):
+    found = element.find(path)
+    if found is None:
+        return default
+    # itertext() keeps text inside inline markup such as <i> in titles
+    return "".join(found.itertext()).strip() or default
+
+
+def article_row(article):
+    """Column values for one <PubmedArticle> element."""
+    citation = article.find("MedlineCitation")
+    pmid = _text(citation, "PMID")
+    pub_date = citation.find("Article/Journal/JournalIssue/PubDate")
+    published = ""
+    if pub_date is not None:
+        published = " ".join(
+            part for part in (_text(pub_date, "Year"), _text(pub_date, "Month"), _text(pub_date, "Day")) if part
+        ) or _text(pub_date, "MedlineDate")
+    return (
+        pmid,
+        _text(citation, "Article/ArticleTitle", "No Title"),
+        _text(citation, "Article/Journal/Title"),
+        published,
+        f"https://pubmed.ncbi.nlm.nih.gov/{pmid}/",
+        # Structured abstracts are split into several labelled sections
+        " ".join("".join(part.itertext()).strip() for part in citation.findall("Article/Abstract/AbstractText")),
+    )
+
+
+def article_table(xml):
+    """PubmedArticleSet XML -> article table."""
+    builder = TableBuilder(ARTICLE_SCHEMA)
+    root = ET.fromstring(xml)
+    for article in root.iter("PubmedArticle"):
+        builder.append(*article_row(article))
+    return builder.finish()
+
+
+def article_stream_table(chunks):
+    """Like ``article_table``, parsing an iterable of byte chunks as they arrive."""
+    return stream_table(chunks, "PubmedArticle", article_row, ARTICLE_SCHEMA)
+
+
+def trial_row(study):
+    """Column values for one <clinical_study> element."""
+    locations = []
+    for country in study.findall("location_countries/location_country"):
+        locations.append(_text(country, "location") or (country.text or "").strip() or "Unknown")
+    nct_id = _text(study, "id_info/nct_id")
+    return (
+        nct_id,
+        _text(study, "official_title", "No Title"),
+        _text(study, "overall_status", "Status Unknown"),
+        _text(study, "phase", "N/A"),
+        ", ".join(locations),
+        f"https://clinicaltrials.gov/ct2/show/{nct_id}" if nct_id else "#",
+    )
+
+
+def trial_table(xml):
+    """clinical_studies XML -> trial table."""
+    builder = TableBuilder(TRIAL_SCHEMA)
+    root = ET.fromstring(xml)
+    for study in root.iter("clinical_study"):
+        builder.append(*trial_row(study))
+    return builder.finish()
+
+
+def trial_stream_table(chunks):
+    """Like ``trial_table``, parsing an iterable of byte chunks as they arrive."""
+    return stream_table(chunks, "clinical_study", trial_row, TRIAL_SCHEMA)
+
+
+def _lines(text):
+    """A text block with its indentation removed, one non-empty line per line."""
+    lines = (line.strip() for line in (text or "").splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def _label(value):
+    """An API v2 enum ("NOT_YET_RECRUITING") as text ("Not yet recruiting")."""
+    return (value or "").replace("_", " ").capitalize()
+
+
+def trial_record(payload, max_sites=50):
+    """ClinicalTrials.gov API v2 study JSON -> compact dict of the details a trial card shows.
+
+    Not a table: one study's eligibility, contacts and sites, cached per NCT id.
+    """
+    study = json.loads(payload) if isinstance(payload, (bytes, str)) else payload
+    protocol = study.get("protocolSection", {})
+    identification = protocol.get("identificationModule", {})
+    status = protocol.get("statusModule", {})
+    eligibility = protocol.get("eligibilityModule", {})
+    contacts_locations = protocol.get("contactsLocationsModule", {})
+    contacts = [
+        {"name": contact.get("name", ""), "phone": contact.get("phone", ""), "email": contact.get("email", "")}
+        for contact in contacts_locations.get("centralContacts", [])
+    ]
+    sites = [
+        {
+            "facility": location.get("facility", ""),
+            "city": location.get("city", ""),
+            "state": location.get("state", ""),
+            "status": _label(location.get("status")),
+        }
+        for location in contacts_locations.get("locations", [])
+    ]
+    healthy = eligibility.get("healthyVolunteers")
+    return {
+        "nct_id": identification.get("nctId", ""),
+        "summary": " ".join(protocol.get("descriptionModule", {}).get("briefSummary", "").split()),
+        "conditions": protocol.get("conditionsModule", {}).get("conditions", []),
+        "interventions": [
+            f"{_label(item.get('type'))}: {item.get('name', '')}".lstrip(": ")
+            for item in protocol.get("armsInterventionsModule", {}).get("interventions", [])
+        ],
+        "criteria": _lines(eligibility.get("eligibilityCriteria")),
+        "sex": _label(eligibility.get("sex")),
+        "min_age": eligibility.get("minimumAge", ""),
+        "max_age": eligibility.get("maximumAge", ""),
+        "healthy_volunteers": "" if healthy is None else ("Yes" if healthy else "No"),
+        "contacts": contacts,
+        "sites": sites[:max_sites],
+        "site_count": len(sites),
+        "sponsor": protocol.get("sponsorCollaboratorsModule", {}).get("leadSponsor", {}).get("name", ""),
+        "start_date": status.get("startDateStruct", {}).get("date", ""),
+        "completion_date": status.get("primaryCompletionDateStruct", {}).get("date", ""),
+    }
+
+
+@contextlib.contextmanager
+def row_listener(callback):
+    """Call ``callback(row)`` with each row dict a streaming parse finishes inside the block.
+
+    A cached result is returned without parsing, so it makes no calls.
+    """
+    previous = getattr(_local, "listener", None)
+    _local.listener = callback
+    try:
+        yield
+    finally:
+        _local.listener = previous
+
+
+def stream_table(chunks, tag, row, schema):
+    """Build a table from every ``tag`` element, parsing XML one chunk at a time."""
+    listener = getattr(_local, "listener", None)
+    builder = TableBuilder(schema)
+    parser = ET.XMLPullParser(events=("end",))
+
+    def drain():
+        for _, element in parser.read_events():
+            if element.tag != tag:
+                continue
+            values = row(element)
+            builder.append(*values)
+            if listener is not None:
+                listener(dict(zip(schema.names, values)))
+            # Finished rows don't need their subtree any more
+            element.clear()
+
+    for chunk in chunks:
+        parser.feed(chunk)
+        drain()
+    parser.close()
+    drain()
+    return builder.finish()
+
+
+def to_ipc(table):
+    """Serialize a table as a zstd-compressed Arrow IPC stream."""
+    sink = pa.BufferOutputStream()
+    options = pa.ipc.IpcWriteOptions(compression="zstd")
+    with pa.ipc.new_stream(sink, table.schema, options=options) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def from_ipc(data):
+    return pa.ipc.open_stream(pa.py_buffer(data)).read_all()
+
+
+class ArrowCodec:
+    """Cache codec that stores tables in the same Arrow format the UI renders."""
+
+    pack = staticmethod(to_ipc)
+    unpack = staticmethod(from_ipc)
+
+
+class ArrowDictCodec:
+    """Cache codec for a dict of named tables (one IPC stream each, msgpack around them)."""
+
+    @staticmethod
+    def pack(tables):
+        return cache.pack({name: to_ipc(table) for name, table in tables.items()})
+
+    @staticmethod
+    def unpack(data):
+        return {name: from_ipc(blob) for name, blob in cache.unpack(data).items()}
@@ -0,0 +1,193 @@
+"""Shared HTTP session for the upstream APIs, with record/replay fixtures.
+
+Every call to Nominatim, Overpass, PubMed and ClinicalTrials.gov goes through
+``get_session()``. The session mode is picked with environment variables:
+
+- ``UPSTREAM_MODE=live`` (default): talk to the real services.
+- ``UPSTREAM_MODE=record``: talk to the real services and save every response
+  to the fixture store.
+- ``UPSTREAM_MODE=replay``: never touch the network; serve saved responses
+  from memory, optionally sleeping ``UPSTREAM_REPLAY_LATENCY_MS`` per call.
+
+The fixture store is a directory (``UPSTREAM_FIXTURES``, default
+``fixtures/upstream``) holding one gzip file per request, named after a hash
+of the method, full URL and body.
+"""
+import gzip
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+USER_AGENT = "CancerSupportApp/1.0 (your_email@example.com)"
+DEFAULT_FIXTURES = os.path.join(os.path.dirname(os.path.dirname(__file__)), "fixtures", "upstream")
+
+# Headers that describe the wire encoding rather than the stored body
+_DROPPED_HEADERS = ("content-encoding", "content-length", "transfer-encoding", "connection")
+
+
+def fixture_key(method, url, body=None):
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    digest = hashlib.sha1()
+    digest.update(method.upper().encode("ascii"))
+    digest.update(b" ")
+    digest.update(url.encode("utf-8"))
+    if body:
+        digest.update(b"\n")
+        digest.update(body)
+    return digest.hexdigest()
+
+
+class FixtureStore:
+    """Directory of gzip-compressed recorded responses."""
+
+    def __init__(self, path=DEFAULT_FIXTURES):
+        self.path = path
+        self._entries = None
+        self._lock = threading.Lock()
+
+    def _file(self, key):
+        return os.path.join(self.path, f"{key}.bin.gz")
+
+    def save(self, request, response):
+        meta = {
+            "method": request.method,
+            "url": request.url,
+            "status": response.status_code,
+            "reason": response.reason,
+            "headers": {k: v for k, v in response.headers.items() if k.lower() not in _DROPPED_HEADERS},
+        }
+        key = fixture_key(request.method, request.url, request.body)
+        os.makedirs(self.path, exist_ok=True)
+        # Write to a temp file first so a concurrent replay never sees half a fixture
+        tmp_path = f"{self._file(key)}.{os.getpid()}.tmp"
+        with gzip.open(tmp_path, "wb") as f:
+            f.write(json.dumps(meta).encode("utf-8") + b"\n")
+            f.write(response.content)
+        os.replace(tmp_path, self._file(key))
+        if self._entries is not None:
+            self._entries[key] = (meta, response.content)
+
+    def load(self):
+        """Read every fixture into memory (done once, on first lookup)."""
+        entries = {}
+        if os.path.isdir(self.path):
+            for name in os.listdir(self.path):
+                if not name.endswith(".bin.gz"):
+                    continue
+                with gzip.open(os.path.join(self.path, name), "rb") as f:
+                    header, body = f.read().split(b"\n", 1)
+                entries[name[: -len(".bin.gz")]] = (json.loads(header), body)
+        return entries
+
+    def lookup(self, method, url, body=None):
+        with self._lock:
+            if self._entries is None:
+                self._entries = self.load()
+        return self._entries.get(fixture_key(method, url, body))
+
+    def __len__(self):
+        with self._lock:
+            if self._entries is None:
+                self._entries = self.load()
+        return len(self._entries)
+
+
+class RecordingAdapter(HTTPAdapter):
+    """Normal HTTP adapter that also writes each response to a fixture store."""
+
+    def __init__(self, store, **kwargs):
+        super().__init__(**kwargs)
+        self.store = store
+
+    def send(self, request, **kwargs):
+        response = super().send(request, **kwargs)
+        # A 304 answers a conditional request only; replaying it for a plain
+        # one would leave the caller without a body
+        if response.status_code != 304:
+            self.store.save(request, response)
+        return response
+
+
+class ReplayAdapter(BaseAdapter):
+    """Adapter that answers from a fixture store and never opens a socket."""
+
+    def __init__(self, store, latency=0.0):
+        super().__init__()
+        self.store = store
+        self.latency = latency
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        entry = self.store.lookup(request.method, request.url, request.body)
+        if entry is None:
+            raise requests.exceptions.ConnectionError(
+                f"No recorded fixture for {request.method} {request.url}", request=request
+            )
+        if self.latency:
+            time.sleep(self.latency)
+        meta, body = entry
+        return build_response(request, meta["status"], meta["headers"], body, reason=meta.get("reason"), connection=self)
+
+    def close(self):
+        pass
+
+
+def build_response(request, status, headers, body, reason=None, connection=None):
+    """Build a ``requests.Response`` around an in-memory body."""
+    response = requests.Response()
+    response.status_code = status
+    response.reason = reason or ""
+    response.headers = CaseInsensitiveDict(headers)
+    response.raw = io.BytesIO(body)
+    response.url = request.url
+    response.request = request
+    response.encoding = get_encoding_from_headers(response.headers)
+    response.connection = connection
+    return response
+
+
+def upstream_mode():
+    return os.environ.get("UPSTREAM_MODE", "live").lower()
+
+
+def make_session(mode=None, fixtures=None, latency_ms=None):
+    """Create a session for the given mode (defaults come from the environment)."""
+    mode = mode or upstream_mode()
+    fixtures = fixtures or os.environ.get("UPSTREAM_FIXTURES", DEFAULT_FIXTURES)
+    if latency_ms is None:
+        latency_ms = float(os.environ.get("UPSTREAM_REPLAY_LATENCY_MS", "0"))
+
+    session = requests.Session()
+    session.headers["User-Agent"] = USER_AGENT
+    if mode == "record":
+        adapter = RecordingAdapter(FixtureStore(fixtures))
+    elif mode == "replay":
+        adapter = ReplayAdapter(FixtureStore(fixtures), latency=latency_ms / 1000.0)
+    elif mode == "live":
+        adapter = HTTPAdapter()
+    else:
+        raise ValueError(f"Unknown UPSTREAM_MODE: {mode}")
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Process-wide session shared by every page (and its connection pool)."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = make_session()
+        return _session
@@ -0,0 +1,100 @@
+"""Typeahead suggestions for the location and cancer-type inputs.
+
+``PrefixIndex`` keeps every word-start suffix of every label ("lung cancer",
+"cancer" for "Lung Cancer") in one sorted list, so a prefix lookup is two
+``bisect`` calls plus a slice. Labels are ranked by their position in the
+source list (most popular first).
+"""
+import bisect
+import functools
+import os
+
+import numpy as np
+import streamlit as st
+
+from cancer_support import gazetteer
+
+CANCER_TERMS_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "cancer_terms.txt")
+
+
+class PrefixIndex:
+    def __init__(self, labels):
+        self.labels = []
+        self._canonical = {}
+        entries = []
+        for label in labels:
+            key = gazetteer.normalize(label)
+            if not key or key in self._canonical:
+                continue
+            rank = len(self.labels)
+            self.labels.append(label)
+            self._canonical[key] = rank
+            words = key.split()
+            for start in range(len(words)):
+                entries.append((" ".join(words[start:]), rank))
+        entries.sort()
+        self.keys = [key for key, _ in entries]
+        self.ranks = np.array([rank for _, rank in entries], dtype=np.int32)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def suggest(self, text, limit=6):
+        """Best-ranked labels with a word starting with ``text``."""
+        prefix = gazetteer.normalize(text)
+        if not prefix:
+            return []
+        lo = bisect.bisect_left(self.keys, prefix)
+        hi = bisect.bisect_left(self.keys, prefix + "\uffff", lo)
+        # np.unique sorts, so the lowest (most popular) ranks come first
+        return [self.labels[rank] for rank in np.unique(self.ranks[lo:hi])[:limit]]
+
+    def canonical(self, text):
+        """The indexed spelling of ``text`` if it matches a label exactly, else ``text``."""
+        rank = self._canonical.get(gazetteer.normalize(text))
+        return text if rank is None else self.labels[rank]
+
+
+@functools.lru_cache(maxsize=None)
+def cancer_type_index():
+    with open(CANCER_TERMS_PATH, encoding="utf-8") as f:
+        terms = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    return PrefixIndex(terms)
+
+
+@functools.lru_cache(maxsize=None)
+def location_index():
+    table = gazetteer.get_gazetteer()
+    if table is None:
+        return PrefixIndex([])
+    # "Boston, MA" rather than "Boston" so same-named cities stay distinct
+    return PrefixIndex(f"{place.name}, {place.state}" for place in table.places())
+
+
+def _apply_suggestion(key):
+    choice = st.session_state.get(f"{key}_suggestion")
+    if choice:
+        st.session_state[key] = choice
+        st.session_state[f"{key}_suggestion"] = None
+
+
+def text_input_with_suggestions(label, default, index, key):
+    """``st.text_input`` with clickable suggestions from ``index`` underneath.
+
+    Returns the canonical spelling of the entered text, so "breast cancer" and
+    "Breast  Cancer" share one cache entry downstream.
+    """
+    if key not in st.session_state:
+        st.session_state[key] = default
+    value = st.text_input(label, key=key)
+    suggestions = [s for s in index.suggest(value) if s != value]
+    if suggestions:
+        st.pills(
+            "Suggestions",
+            suggestions,
+            key=f"{key}_suggestion",
+            on_change=_apply_suggestion,
+            args=(key,),
+            label_visibility="collapsed",
+        )
+    return index.canonical(value)
@@ -0,0 +1,219 @@
+"""Background cache warming for page defaults and popular queries.
+
+A daemon thread runs once at startup and then every ``CACHE_WARMER_INTERVAL``
+seconds (default 15 minutes). Each run refreshes the page defaults plus the
+``CACHE_WARMER_TOP_N`` most popular searches whose cache entries are missing or
+have less than ``REFRESH_AHEAD`` of their TTL left, so the first visitor after
+a deploy or an expiry doesn't pay the upstream latency.
+
+Popularity comes from ``record()``, which the app calls on every search.
+Counts decay each run and are merged into the shared cache backend, so with
+the SQLite backend every replica contributes. A lease in the backend makes
+sure only one replica per host does the refreshing. Set ``CACHE_WARMER=off``
+to disable.
+"""
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from collections import Counter
+
+from cancer_support import cache, gazetteer, service, sources
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUERIES = [
+    ("hospitals", ["New York"]),
+    ("research", ["Breast Cancer"]),
+    ("trials", ["Lung Cancer", "New York", "All"]),
+]
+
+# Seconds between warmer calls to each upstream, well inside their usage policies
+MIN_INTERVAL = {
+    "nominatim": 1.0,
+    "overpass": 5.0,
+    "pubmed": 0.5,
+    "clinicaltrials": 1.0,
+}
+
+# Refresh entries with less than this fraction of their TTL remaining
+REFRESH_AHEAD = 0.2
+
+# Popularity counts are multiplied by this every run, so old searches fade out
+DECAY = 0.9
+
+_counts = Counter()
+_counts_lock = threading.Lock()
+_last_call = {}
+_state = {
+    "running": False,
+    "last_run": None,
+    "next_run": None,
+    "last_duration": None,
+    "refreshed": 0,
+    "fresh": 0,
+    "errors": [],
+    "queries": [],
+}
+_state_lock = threading.Lock()
+_thread = None
+_stop = threading.Event()
+
+
+def record(kind, *args):
+    """Count one search, e.g. ``record("research", "Breast Cancer")``."""
+    with _counts_lock:
+        _counts[json.dumps([kind, list(args)])] += 1
+
+
+def state():
+    """Snapshot of what the warmer last did (served by the API's ``/health``)."""
+    with _state_lock:
+        return dict(_state, errors=list(_state["errors"]), queries=list(_state["queries"]))
+
+
+def _wait_turn(namespace):
+    interval = MIN_INTERVAL.get(namespace, 1.0)
+    wait = _last_call.get(namespace, 0.0) + interval - time.monotonic()
+    if wait > 0:
+        time.sleep(wait)
+    _last_call[namespace] = time.monotonic()
+
+
+def _ensure(fetch, *args, **kwargs):
+    """Return ``fetch(*args)``, refreshing it first if its entry is missing or nearly stale."""
+    expires_at = fetch.expires_at(*args, **kwargs)
+    if expires_at is not None and expires_at - time.time() > REFRESH_AHEAD * fetch.ttl:
+        _bump("fresh")
+        return fetch(*args, **kwargs)
+    _wait_turn(fetch.namespace)
+    _bump("refreshed")
+    return fetch.refresh(*args, **kwargs)
+
+
+def _bump(field):
+    with _state_lock:
+        _state[field] += 1
+
+
+# The calls below mirror the ones the app makes (see service.py), so they hit the same cache keys
+
+def warm_hospitals(location):
+    match = gazetteer.lookup(location)
+    coords = {"lat": match.lat, "lon": match.lon} if match else _ensure(sources.geocode, location)
+    if coords:
+        _ensure(sources.overpass_hospitals, coords["lat"], coords["lon"], radius=service.HOSPITAL_RADIUS, oncology_only=False)
+
+
+def warm_lodging(location):
+    match = gazetteer.lookup(location)
+    coords = {"lat": match.lat, "lon": match.lon} if match else _ensure(sources.geocode, location)
+    if coords:
+        _ensure(sources.overpass_area, coords["lat"], coords["lon"], radius=50000)
+
+
+def warm_research(cancer_type):
+    id_list = _ensure(sources.pubmed_search, cancer_type, retmax=service.RESEARCH_LIMIT)
+    if id_list:
+        _ensure(sources.pubmed_articles, id_list)
+
+
+def warm_trials(cancer_type, location, phase):
+    _ensure(sources.trials_search, sources.trials_query(cancer_type, location, phase), max_rnk=service.TRIALS_LIMIT)
+
+
+WARMERS = {
+    "hospitals": warm_hospitals,
+    "lodging": warm_lodging,
+    "research": warm_research,
+    "trials": warm_trials,
+}
+
+
+def _merge_popularity():
+    """Fold this replica's new counts into the shared, decayed totals."""
+    with _counts_lock:
+        delta = dict(_counts)
+        _counts.clear()
+    backend = cache.get_backend()
+    totals = backend.get("warmer", "popularity") or {}
+    totals = {query: count * DECAY for query, count in totals.items() if count * DECAY >= 0.5}
+    for query, count in delta.items():
+        totals[query] = totals.get(query, 0) + count
+    backend.set("warmer", "popularity", totals, ttl=7 * sources.DAY)
+    return totals
+
+
+def popular_queries(totals, top_n):
+    ranked = sorted(totals.items(), key=lambda item: -item[1])
+    queries = []
+    for query, _ in ranked:
+        kind, args = json.loads(query)
+        if kind in WARMERS and (kind, args) not in DEFAULT_QUERIES:
+            queries.append((kind, args))
+        if len(queries) == top_n:
+            break
+    return queries
+
+
+def run_once(top_n=10, lease_ttl=60):
+    """One warming pass; returns False if another replica holds the lease."""
+    totals = _merge_popularity()
+    owner = f"{socket.gethostname()}:{os.getpid()}"
+    backend = cache.get_backend()
+    if not backend.add_raw("warmer", "lease", cache.pack(owner), lease_ttl) and backend.get("warmer", "lease") != owner:
+        return False
+
+    queries = DEFAULT_QUERIES + popular_queries(totals, top_n)
+    started = time.time()
+    errors = []
+    with _state_lock:
+        # fresh/refreshed count this run only
+        _state.update(running=True, refreshed=0, fresh=0, queries=[[kind, args] for kind, args in queries])
+    for kind, args in queries:
+        try:
+            WARMERS[kind](*args)
+        except Exception as e:
+            logger.warning("Cache warmer failed for %s %s: %s", kind, args, e)
+            errors.append(f"{kind} {args}: {e}")
+    with _state_lock:
+        _state.update(running=False, last_run=started, last_duration=time.time() - started, errors=errors)
+    return True
+
+
+def _loop(interval, top_n):
+    while not _stop.is_set():
+        with _state_lock:
+            _state["next_run"] = None
+        try:
+            run_once(top_n=top_n, lease_ttl=interval * 0.9)
+        except Exception:
+            logger.exception("Cache warmer run failed")
+        with _state_lock:
+            _state["next_run"] = time.time() + interval
+        _stop.wait(interval)
+
+
+def start(interval=None, top_n=None):
+    """Start the warmer thread once per process (safe to call on every rerun)."""
+    global _thread
+    if os.environ.get("CACHE_WARMER", "on").lower() in ("off", "0", "false"):
+        return
+    with _state_lock:
+        if _thread is not None:
+            return
+        interval = interval or float(os.environ.get("CACHE_WARMER_INTERVAL", 15 * 60))
+        top_n = top_n or int(os.environ.get("CACHE_WARMER_TOP_N", 10))
+        _stop.clear()
+        _thread = threading.Thread(target=_loop, args=(interval, top_n), name="cache-warmer", daemon=True)
+        _thread.start()
+
+
+def stop():
+    global _thread
+    _stop.set()
+    if _thread is not None:
+        _thread.join()
+        _thread = None
@@ -0,0 +1,100 @@
+"""Build resized PNG and WebP copies of the images in assets/manifest.json.
+
+    python scripts/build_assets.py [--fetch]
+
+Originals live at each entry's ``source`` path and are committed with the
+repo. ``--fetch`` downloads any original that is missing from its ``url``
+first. Output goes to static/assets/ as ``<name>-<width>.<hash>.<ext>`` plus an
+``index.json`` that ``cancer_support.assets`` reads. Files from earlier
+builds that are no longer referenced are removed.
+"""
+import argparse
+import hashlib
+import io
+import json
+import os
+import sys
+
+import requests
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cancer_support import assets  # noqa: E402
+from cancer_support.transport import USER_AGENT  # noqa: E402
+
+WEBP_QUALITY = 85
+
+
+def fetch(url, path):
+    response = requests.get(url, headers={"User-Agent": USER_AGENT}, timeout=30)
+    response.raise_for_status()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(response.content)
+
+
+def encode(image, image_format):
+    buffer = io.BytesIO()
+    if image_format == "webp":
+        image.save(buffer, "WEBP", quality=WEBP_QUALITY, method=6)
+    else:
+        image.save(buffer, "PNG", optimize=True)
+    return buffer.getvalue()
+
+
+def build_image(name, entry, output_dir):
+    """Write every variant of one image; returns its index entry."""
+    source = os.path.join(assets.ROOT, entry["source"])
+    with Image.open(source) as original:
+        original.load()
+    if original.mode not in ("RGB", "RGBA"):
+        original = original.convert("RGBA")
+    # Never upscale: widths past the original collapse into the original size
+    widths = sorted({min(width, original.width) for width in entry["widths"]})
+    variants = []
+    for width in widths:
+        height = round(original.height * width / original.width)
+        image = original if width == original.width else original.resize((width, height), Image.LANCZOS)
+        for image_format in ("webp", "png"):
+            data = encode(image, image_format)
+            digest = hashlib.sha256(data).hexdigest()[:12]
+            filename = f"{name}-{width}.{digest}.{image_format}"
+            with open(os.path.join(output_dir, filename), "wb") as f:
+                f.write(data)
+            variants.append({"width": width, "height": height, "format": image_format, "file": filename, "bytes": len(data)})
+    return {"width": original.width, "height": original.height, "variants": variants}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--manifest", default=assets.MANIFEST_PATH)
+    parser.add_argument("--output", default=assets.OUTPUT_DIR)
+    parser.add_argument("--fetch", action="store_true", help="download missing originals from their url")
+    args = parser.parse_args()
+
+    with open(args.manifest, encoding="utf-8") as f:
+        manifest = json.load(f)["images"]
+    os.makedirs(args.output, exist_ok=True)
+
+    index = {}
+    for name, entry in manifest.items():
+        source = os.path.join(assets.ROOT, entry["source"])
+        if not os.path.exists(source):
+            if not args.fetch or not entry.get("url"):
+                sys.exit(f"{entry['source']} is missing; rerun with --fetch to download it (entries with a url)")
+            fetch(entry["url"], source)
+        index[name] = build_image(name, entry, args.output)
+        sizes = ", ".join(f"{v['width']}px {v['format']} {v['bytes']:,} B" for v in index[name]["variants"])
+        print(f"{name}: {sizes}")
+
+    keep = {variant["file"] for entry in index.values() for variant in entry["variants"]} | {"index.json"}
+    for filename in os.listdir(args.output):
+        if filename not in keep:
+            os.remove(os.path.join(args.output, filename))
+    with open(os.path.join(args.output, "index.json"), "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=2, sort_keys=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Build data/gazetteer.bin, the offline ZIP/place centroid table.
+
+    python scripts/build_gazetteer.py [--zcta 2023_Gaz_zcta_national.txt]
+                                      [--places data/us_places.csv]
+                                      [--census-places 2023_Gaz_place_national.txt]
+                                      [--zip-prefixes data/zip_prefixes.csv]
+
+Inputs:
+
+- ``--places``: CSV with ``name,state,lat,lon`` in priority order (the bundled
+  data/us_places.csv lists large US cities by population).
+- ``--census-places``: optional Census Gazetteer places file; appended after
+  ``--places`` so bundled names keep priority.
+- ``--zip-prefixes``: CSV with ``prefix,name,state,lat,lon``, one row per
+  3-digit ZIP prefix (the bundled data/zip_prefixes.csv places each at the
+  city of its USPS sectional center). Each row is stored as ZIP
+  ``<prefix>00`` and resolves any ZIP in that area the table doesn't list;
+  its city is added to the places after all the others.
+- ``--zcta``: optional Census Gazetteer ZCTA file, which adds exact ZIP code
+  centroids. Both Census files are at
+  https://www.census.gov/geographies/reference-files/time-series/geo/gazetteer-files.html
+"""
+import argparse
+import csv
+import os
+import re
+import sys
+
+from scipy.spatial import cKDTree
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cancer_support import gazetteer  # noqa: E402
+from cancer_support.lodging import unit_vectors  # noqa: E402
+
+# Census place names end in the kind of place: "Boston city", "Hershey CDP"
+_PLACE_SUFFIX = re.compile(r"\s+(city|town|village|borough|CDP|municipality|city and borough)$")
+
+
+def read_places(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return [(row["name"], row["state"], float(row["lat"]), float(row["lon"])) for row in csv.DictReader(f)]
+
+
+def read_census_places(path):
+    places = []
+    with open(path, newline="", encoding="latin-1") as f:
+        reader = csv.DictReader(f, delimiter="\t")
+        for row in reader:
+            row = {key.strip(): value.strip() for key, value in row.items()}
+            name = _PLACE_SUFFIX.sub("", row["NAME"])
+            places.append((name, row["USPS"], float(row["INTPTLAT"]), float(row["INTPTLONG"])))
+    return places
+
+
+def read_zcta(path):
+    zips = []
+    with open(path, newline="", encoding="latin-1") as f:
+        reader = csv.DictReader(f, delimiter="\t")
+        for row in reader:
+            row = {key.strip(): value.strip() for key, value in row.items()}
+            zips.append((int(row["GEOID"]), float(row["INTPTLAT"]), float(row["INTPTLONG"])))
+    return zips
+
+
+def read_zip_prefixes(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return [
+            (int(row["prefix"]), row["name"], row["state"], float(row["lat"]), float(row["lon"]))
+            for row in csv.DictReader(f)
+        ]
+
+
+def add_prefix_places(prefixes, places):
+    """Place index for each prefix's city, appending the cities ``places`` lacks."""
+    index = {}
+    for i, (name, state, _, _) in enumerate(places):
+        index.setdefault((gazetteer.normalize(name), state), i)
+    result = []
+    for _, name, state, lat, lon in prefixes:
+        key = (gazetteer.normalize(name), state)
+        if key not in index:
+            index[key] = len(places)
+            places.append((name, state, lat, lon))
+        result.append(index[key])
+    return result
+
+
+def nearest_places(zips, places):
+    """Index of the nearest place for each ZIP centroid."""
+    if not zips or not places:
+        return [-1] * len(zips)
+    tree = cKDTree(unit_vectors([p[2] for p in places], [p[3] for p in places]))
+    _, index = tree.query(unit_vectors([z[1] for z in zips], [z[2] for z in zips]))
+    return index.tolist()
+
+
+def main():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--places", default=os.path.join(root, "data", "us_places.csv"))
+    parser.add_argument("--census-places")
+    parser.add_argument("--zip-prefixes", default=os.path.join(root, "data", "zip_prefixes.csv"))
+    parser.add_argument("--zcta")
+    parser.add_argument("--output", default=gazetteer.DEFAULT_PATH)
+    args = parser.parse_args()
+
+    places = read_places(args.places)
+    if args.census_places:
+        places += read_census_places(args.census_places)
+    prefixes = read_zip_prefixes(args.zip_prefixes) if args.zip_prefixes else []
+    prefix_places = add_prefix_places(prefixes, places)
+    zips = read_zcta(args.zcta) if args.zcta else []
+    zips = [(code, lat, lon, place) for (code, lat, lon), place in zip(zips, nearest_places(zips, places))]
+    listed = {code for code, _, _, _ in zips}
+    zips += [
+        (prefix * 100, lat, lon, place)
+        for (prefix, _, _, lat, lon), place in zip(prefixes, prefix_places)
+        if prefix * 100 not in listed
+    ]
+
+    gazetteer.write_table(args.output, zips, places)
+    print(f"Wrote {args.output}: {len(zips)} ZIP codes and prefixes, {len(places)} places, {os.path.getsize(args.output):,} bytes")
+
+
+if __name__ == "__main__":
+    main()
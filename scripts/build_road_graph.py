@@ -0,0 +1,97 @@
+"""Build data/roads.bin, the offline road graph for drive times.
+
+    python scripts/build_road_graph.py new-york-latest.osm.bz2 [--output data/roads.bin]
+
+The input is an OpenStreetMap XML extract (``.osm``, ``.osm.gz`` or
+``.osm.bz2``), such as a metro extract from https://download.geofabrik.de or
+https://extract.bbbike.org. Convert a ``.osm.pbf`` first, for example with
+``osmium cat extract.osm.pbf -o extract.osm``. Every node is held in memory
+while the file is read, so use a metro or state extract rather than a
+continent.
+"""
+import argparse
+import bz2
+import gzip
+import os
+import sys
+import time
+import xml.etree.ElementTree as ET
+from array import array
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cancer_support import routing  # noqa: E402
+
+
+def open_extract(path):
+    if path.endswith(".bz2"):
+        return bz2.open(path, "rb")
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+def read_extract(path):
+    """``(node ids, lat, lon, ways)`` for the drivable ways, as ``routing.build_graph`` takes them."""
+    node_ids, lat, lon = array("q"), array("d"), array("d")
+    ways = []
+    with open_extract(path) as f:
+        events = ET.iterparse(f, events=("start", "end"))
+        _, root = next(events)
+        for event, element in events:
+            if event != "end":
+                continue
+            if element.tag == "node":
+                node_ids.append(int(element.get("id")))
+                lat.append(float(element.get("lat")))
+                lon.append(float(element.get("lon")))
+            elif element.tag == "way":
+                tags = {tag.get("k"): tag.get("v") for tag in element.iter("tag")}
+                speed = routing.way_speed(tags)
+                if speed is not None:
+                    refs = [int(nd.get("ref")) for nd in element.iter("nd")]
+                    ways.append((refs, speed, routing.way_direction(tags)))
+            elif element.tag != "relation":
+                # A way's tags and node refs are read when the way ends
+                continue
+            root.clear()
+    return node_ids, lat, lon, ways
+
+
+def complete_ways(node_ids, ways):
+    """Split ways where the extract cut off their nodes, so every node is known."""
+    known = set(node_ids)
+    complete = []
+    for refs, speed, direction in ways:
+        run = []
+        for ref in refs:
+            if ref in known:
+                run.append(ref)
+                continue
+            if len(run) >= 2:
+                complete.append((run, speed, direction))
+            run = []
+        if len(run) >= 2:
+            complete.append((run, speed, direction))
+    return complete
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("extract")
+    parser.add_argument("--output", default=routing.DEFAULT_PATH)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    node_ids, lat, lon, ways = read_extract(args.extract)
+    ways = complete_ways(node_ids, ways)
+    parsed = time.perf_counter()
+    routing.write_graph(args.output, *routing.build_graph(node_ids, lat, lon, ways))
+    header = routing.HEADER.unpack_from(open(args.output, "rb").read(routing.HEADER.size))
+    print(f"Wrote {args.output}: {header[1]:,} junctions, {header[2]:,} edges from {len(ways):,} ways, "
+          f"{os.path.getsize(args.output):,} bytes (read {parsed - started:.1f}s, "
+          f"built {time.perf_counter() - parsed:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
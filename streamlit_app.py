@@ -1,15 +1,46 @@
 # app.py
+import contextlib
+import functools
+
 import streamlit as st
-import pandas as pd
-import requests
-import folium
 from streamlit_folium import folium_static
-from datetime import datetime
-import xmltodict
+import math
+import os
+import numpy as np
+import requests
+
+from cancer_support import (
+    admission, alerts, assets, export, finance, lodging, maps, profiling, retrieval, revalidation, routing, service,
+    session_store, sources, tables, warmer,
+)
+from cancer_support.typeahead import cancer_type_index, location_index, text_input_with_suggestions
+
+
+def busy_message(rejected):
+    """Shown when admission control turns a search away (see cancer_support/admission.py)."""
+    return f"Searches are busy right now. Please try again in about {math.ceil(rejected.wait)} seconds."
+
+def download_buttons(kind, table):
+    """Download buttons for one result table; the file is only encoded when clicked."""
+    formats = export.formats_for(table.schema)
+    for column, fmt in zip(st.columns(len(formats)), formats):
+        label, mime, _ = export.FORMATS[fmt]
+        column.download_button(
+            f"Download {label}",
+            data=functools.partial(export.to_bytes, fmt, table),
+            file_name=export.file_name(kind, fmt),
+            mime=mime,
+            # Downloading mustn't rerun the panel, which would clear the results
+            on_click="ignore",
+            key=f"{kind}_download_{fmt}",
+        )
 
 # Set page configuration
 st.set_page_config(page_title="Cancer Support App", layout="wide")
 
+# Keep default and popular searches warm in the cache (starts once per process)
+warmer.start()
+
 # Sidebar Navigation
 st.sidebar.title("Navigation")
 options = st.sidebar.radio("Go to", [
@@ -23,6 +54,10 @@ options = st.sidebar.radio("Go to", [
     "Interactive Tools & Extras"
 ])
 
+# Opt-in flame graphs per rerun (PROFILE env var, or ?profile=1 when allowed)
+profile_requested = st.query_params.get("profile") == "1"
+profile = profiling.begin(options, query_flag=profile_requested)
+
 # Home Page
 if options == "Home":
     st.title("Cancer Support Web Application")
@@ -37,7 +72,10 @@ if options == "Home":
     - **Emotional & Social Support**: Access mental health resources and support groups.
     - **Interactive Tools & Extras**: Utilize tools like checklists and donation hubs.
     """)
-    st.image("https://www.cancer.org/content/dam/cancer-org/images/logos/cancerorg-logo.png", use_column_width=True)
+    # Built into /app/static by scripts/build_assets.py
+    banner = assets.image_url("home-banner", width=1280)
+    if banner:
+        st.image(banner, width="stretch")
 
 # Locate the Best Cancer Hospitals Nearby
 elif options == "Locate Hospitals":
@@ -45,60 +83,68 @@ elif options == "Locate Hospitals":
     
     st.markdown("""
     **Find top-rated cancer hospitals specializing in your area. Use the interactive map below to explore nearby facilities.**
+
+    NCI-designated cancer centers are marked in purple and listed first.
     """)
     
-    # User input for location
-    location = st.text_input("Enter your city or ZIP code:", "New York")
-    
-    if st.button("Find Hospitals"):
-        with st.spinner("Searching for hospitals..."):
-            # Geocoding using Nominatim
-            geocode_url = f"https://nominatim.openstreetmap.org/search?q={location}&format=json&limit=1"
-            geocode_response = requests.get(geocode_url).json()
-            
-            if geocode_response:
-                lat = float(geocode_response[0]['lat'])
-                lon = float(geocode_response[0]['lon'])
-                
-                # Overpass API to find hospitals
-                overpass_url = "http://overpass-api.de/api/interpreter"
-                overpass_query = f"""
-                [out:json];
-                (
-                  node["amenity"="hospital"](around:50000,{lat},{lon});
-                  way["amenity"="hospital"](around:50000,{lat},{lon});
-                  relation["amenity"="hospital"](around:50000,{lat},{lon});
-                );
-                out center;
-                """
-                overpass_response = requests.get(overpass_url, params={'data': overpass_query}).json()
-                
-                hospitals = []
-                for element in overpass_response['elements']:
-                    name = element['tags'].get('name', 'Unnamed Hospital')
-                    lat_h = element.get('lat', element.get('center', {}).get('lat'))
-                    lon_h = element.get('lon', element.get('center', {}).get('lon'))
-                    if lat_h and lon_h:
-                        hospitals.append({"Name": name, "Latitude": lat_h, "Longitude": lon_h})
-                
-                if hospitals:
-                    df_hospitals = pd.DataFrame(hospitals)
-                    
-                    # Display on map
-                    m = folium.Map(location=[lat, lon], zoom_start=12)
-                    folium.Marker([lat, lon], popup="Your Location", icon=folium.Icon(color='red')).add_to(m)
-                    
-                    for idx, row in df_hospitals.iterrows():
-                        folium.Marker([row['Latitude'], row['Longitude']], popup=row['Name']).add_to(m)
-                    
-                    folium_static(m, width=700, height=500)
+    # Searching and the results rerun on their own, not the whole page
+    @st.fragment
+    @profiling.fragment(options, query_flag=profile_requested)
+    def hospital_panel():
+        # User input for location
+        location = text_input_with_suggestions("Enter your city or ZIP code:", "New York", location_index(), key="hospital_location")
+        oncology_only = st.checkbox("Only show facilities tagged with an oncology specialty")
+        # Only offered when a road graph has been built (scripts/build_road_graph.py)
+        max_minutes = st.slider("Maximum drive time (minutes):", 10, 120, 60, step=5) if routing.available() else None
+    
+        if st.button("Find Hospitals"):
+            warmer.record("hospitals", location)
+            try:
+                with st.spinner("Searching for hospitals..."):
+                    # Geocoding (offline gazetteer, falling back to Nominatim), then Overpass
+                    try:
+                        geocode_result, hospitals = service.find_hospitals(
+                            location, oncology_only=oncology_only, max_minutes=max_minutes
+                        )
+                    except service.LocationNotFound:
+                        geocode_result = None
+
+                    if geocode_result:
+                        lat = geocode_result['lat']
+                        lon = geocode_result['lon']
+
+                        if hospitals.num_rows:
+                            # Display on map
+                            folium_static(maps.hospital_map(lat, lon, hospitals), width=700, height=500)
                     
-                    st.subheader("List of Hospitals")
-                    st.dataframe(df_hospitals)
-                else:
-                    st.error("No hospitals found within a 50km radius.")
-            else:
-                st.error("Location not found. Please try a different location.")
+                            st.subheader("List of Hospitals")
+                            designations = hospitals['NCI designation'].to_pylist()
+                            centers_found = sum(1 for designation in designations if designation)
+                            if centers_found:
+                                st.caption(f"{centers_found} of these are NCI-designated cancer centers, listed first.")
+                            columns = ["Name", "NCI designation", "Cancer center", "Latitude", "Longitude"]
+                            if max_minutes and routing.covers(geocode_result):
+                                columns.insert(1, "Drive (min)")
+                            elif max_minutes:
+                                st.info(
+                                    "Drive times aren't available for this location (it is outside the road map), "
+                                    "so all hospitals within 50 km are listed."
+                                )
+                            # Arrow tables go to the frontend without a pandas conversion
+                            st.dataframe(hospitals.select(columns))
+                            download_buttons("hospitals", hospitals)
+                        elif max_minutes and routing.covers(geocode_result):
+                            st.error(f"No hospitals found within a {max_minutes}-minute drive.")
+                        else:
+                            st.error("No hospitals found within a 50km radius.")
+                    else:
+                        st.error("Location not found. Please try a different location.")
+            except admission.Rejected as e:
+                st.warning(busy_message(e))
+            except requests.exceptions.RequestException:
+                st.error("Failed to search for hospitals. Please try again later.")
+
+    hospital_panel()
 
 # Accommodation Resources
 elif options == "Accommodation Resources":
@@ -125,6 +171,61 @@ elif options == "Accommodation Resources":
     - [Airbnb](https://www.airbnb.com/) - Affordable lodging options.
     """)
     
+    st.header("Lodging Near Your Hospital")
+    # The search, distance slider and hospital picker rerun only this panel
+    @st.fragment
+    @profiling.fragment(options, query_flag=profile_requested)
+    def lodging_panel():
+        lodging_location = text_input_with_suggestions("Enter your city or ZIP code:", "New York", location_index(), key="lodging_location")
+        max_km = st.slider("Show lodging within (km):", min_value=1, max_value=20, value=5)
+        if st.button("Find Lodging"):
+            warmer.record("lodging", lodging_location)
+            st.session_state["lodging_search"] = lodging_location
+
+        # Kept in session state so picking a hospital reruns the panel without a new search
+        if "lodging_search" in st.session_state:
+            try:
+                with st.spinner("Searching for hospitals and lodging..."):
+                    coords = sources.resolve_location(st.session_state["lodging_search"])
+                    # Hospitals and lodging come back from one Overpass request. The
+                    # tables are kept for the session (within its memory budget) so
+                    # moving the slider or picking a hospital doesn't decode them again
+                    area = session_store.keep(
+                        "lodging_area", sources.overpass_area, coords["lat"], coords["lon"], radius=50000
+                    ) if coords else None
+            except admission.Rejected as e:
+                st.warning(busy_message(e))
+            except requests.exceptions.RequestException:
+                st.error("Failed to search for hospitals and lodging. Please try again later.")
+            else:
+                if area is None:
+                    st.error("Location not found. Please try a different location.")
+                elif not area["hospitals"].num_rows:
+                    st.error("No hospitals found within a 50km radius.")
+                else:
+                    hospitals, places = area["hospitals"], area["lodging"]
+                    join = lodging.nearest_lodging(hospitals, places, max_km=max_km)
+                    counts = lodging.lodging_counts(join, hospitals.num_rows)
+                    names = hospitals["Name"].to_pylist()
+                    # Hospitals with the most lodging nearby first
+                    order = sorted(range(hospitals.num_rows), key=lambda row: (-counts[row], names[row]))
+                    hospital_row = st.selectbox(
+                        "Hospital:", order, format_func=lambda row: f"{names[row]} ({counts[row]} nearby)", key="lodging_hospital"
+                    )
+                    nearby = lodging.lodging_for(join, places, hospital_row)
+                    if nearby.num_rows:
+                        hospital_at = [hospitals["Latitude"][hospital_row].as_py(), hospitals["Longitude"][hospital_row].as_py()]
+                        folium_static(maps.lodging_map(hospital_at, names[hospital_row], nearby), width=700, height=400)
+                        st.dataframe(
+                            nearby.select(["Name", "Category", "Distance (km)", "addr:street", "phone", "website"]),
+                            column_config={"website": st.column_config.LinkColumn()},
+                            hide_index=True,
+                        )
+                    else:
+                        st.info(f"No lodging mapped within {max_km} km of this hospital.")
+
+    lodging_panel()
+
     st.header("Booking Links")
     st.markdown("""
     - [Reserve a Ronald McDonald House](https://www.rmhc.org/find-a-house)
@@ -139,68 +240,119 @@ elif options == "Latest Research":
     **Stay updated with the latest research, treatment advancements, and breakthroughs related to your specific cancer type.**
     """)
     
-    cancer_type = st.text_input("Enter your cancer type (e.g., Breast Cancer):", "Breast Cancer")
-    
-    if st.button("Get Latest Research"):
-        with st.spinner("Fetching latest research articles..."):
-            # Fetch latest 10 articles from PubMed
-            base_url = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esearch.fcgi"
-            params = {
-                "db": "pubmed",
-                "term": cancer_type,
-                "retmax": 10,
-                "sort": "pub date",
-                "retmode": "json"
-            }
-            response = requests.get(base_url, params=params).json()
-            id_list = response['esearchresult']['idlist']
-            
-            if id_list:
-                # Fetch article details
-                fetch_url = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/efetch.fcgi"
-                fetch_params = {
-                    "db": "pubmed",
-                    "id": ",".join(id_list),
-                    "retmode": "xml",
-                    "rettype": "abstract"
-                }
-                fetch_response = requests.get(fetch_url, params=fetch_params).text
-                
-                # Parse XML response using xmltodict
-                try:
-                    data_dict = xmltodict.parse(fetch_response)
-                    articles = data_dict.get('PubmedArticleSet', {}).get('PubmedArticle', [])
-                    
-                    if isinstance(articles, dict):
-                        articles = [articles]
-                    
-                    st.markdown("### Latest Research Articles")
-                    for article in articles:
-                        title = article.get('MedlineCitation', {}).get('Article', {}).get('ArticleTitle', 'No Title')
-                        pmid = article.get('MedlineCitation', {}).get('PMID', {}).get('#text', '')
-                        link = f"https://pubmed.ncbi.nlm.nih.gov/{pmid}/"
-                        st.markdown(f"#### [{title}]({link})")
-                except Exception as e:
-                    st.error("Error parsing research articles.")
+    # Only this panel reruns while typing, searching or subscribing; the alert
+    # topic stays in the panel so its default follows the search box
+    @st.fragment
+    @profiling.fragment(options, query_flag=profile_requested)
+    def research_panel():
+        cancer_type = text_input_with_suggestions(
+            "Enter your cancer type (e.g., Breast Cancer):", "Breast Cancer", cancer_type_index(), key="research_cancer_type"
+        )
+    
+        if st.button("Get Latest Research"):
+            warmer.record("research", cancer_type)
+            # Each article is listed as soon as it is parsed from the response;
+            # a cached result arrives whole instead. The tabs open with the first.
+            results = st.container()
+            tabs = []
+            streamed = []
+
+            def open_tabs():
+                if not tabs:
+                    results.markdown("### Latest Research Articles")
+                    tabs.extend(results.tabs(["List", "Table"]))
+                return tabs
+
+            def show_article(article):
+                list_tab, _ = open_tabs()
+                streamed.append(article)
+                list_tab.markdown(f"#### [{article['Title']}]({article['Link']})")
+
+            try:
+                # Fetch the latest 10 articles from PubMed and parse their details
+                with st.spinner("Fetching latest research articles..."), tables.row_listener(show_article):
+                    articles = service.latest_research(cancer_type)
+            except admission.Rejected as e:
+                st.warning(busy_message(e))
+            except requests.exceptions.RequestException:
+                st.error("Failed to fetch research articles.")
+            except Exception as e:
+                st.error("Error parsing research articles.")
             else:
-                st.warning("No articles found for the specified cancer type.")
+                if articles.num_rows:
+                    list_tab, table_tab = open_tabs()
+                    if not streamed:
+                        titles = articles['Title'].to_pylist()
+                        links = articles['Link'].to_pylist()
+                        list_tab.markdown("\n".join(f"#### [{title}]({link})" for title, link in zip(titles, links)))
+                    with table_tab:
+                        st.dataframe(
+                            articles.drop_columns(["Abstract"]),
+                            column_config={"Link": st.column_config.LinkColumn()},
+                            hide_index=True,
+                        )
+                        download_buttons("research", articles)
+                else:
+                    st.warning("No articles found for the specified cancer type.")
 
-    # Placeholder for Notifications and AI Chatbot
-    st.markdown("---")
-    st.header("Stay Informed")
-    st.markdown("""
-    **Subscribe to email notifications** to receive updates on newly published studies and breakthroughs.
+        # Notifications and questions answered from the local research index
+        st.markdown("---")
+        st.header("Stay Informed")
+        st.markdown("""
+        **Subscribe to email notifications** to receive updates on newly published studies and breakthroughs.
+        """)
 
-    *Feature coming soon!*
-    """)
+        with st.form("research_alerts"):
+            alert_email = st.text_input("Email address:")
+            alert_term = st.text_input("Topic to follow:", cancer_type)
+            subscribe_col, unsubscribe_col = st.columns(2)
+            subscribe_clicked = subscribe_col.form_submit_button("Subscribe")
+            unsubscribe_clicked = unsubscribe_col.form_submit_button("Unsubscribe")
+
+            if subscribe_clicked or unsubscribe_clicked:
+                if not alerts.valid_email(alert_email):
+                    st.error("Please enter a valid email address.")
+                else:
+                    with contextlib.closing(alerts.connect()) as conn:
+                        if subscribe_clicked:
+                            if alerts.subscribe(conn, alert_email, cancer_type_index().canonical(alert_term)):
+                                st.success(f"Subscribed! You'll get a digest when new articles on {alert_term} are published.")
+                            else:
+                                st.info(f"You're already subscribed to {alert_term}.")
+                        elif alerts.unsubscribe(conn, alert_email, alert_term):
+                            st.success(f"Unsubscribed from {alert_term}.")
+                        else:
+                            st.info("No matching subscription found.")
+
+    research_panel()
 
     st.header("AI Chatbot Assistance")
     st.markdown("""
     **Have questions about the latest research or treatments?**
 
-    *AI chatbot integration is under development!*
+    Answers come from the articles already collected by this app, e.g. *What's new for triple negative breast cancer?*
     """)
 
+    # Asking a question reruns only the answers
+    @st.fragment
+    @profiling.fragment(options, query_flag=profile_requested)
+    def research_answers():
+        question = st.text_input("Ask about the research:", key="research_question")
+        if question:
+            index = retrieval.get_index()
+            answers = retrieval.answer(question)
+            if answers:
+                st.caption(f"Searched {len(index):,} collected abstracts.")
+                for article in answers:
+                    st.markdown(f"**[{article['title']}]({article['link']})**  \n{article['journal']}, {article['published']}")
+                    if article["abstract"]:
+                        abstract = article["abstract"]
+                        st.caption(abstract if len(abstract) <= 400 else abstract[:400].rsplit(" ", 1)[0] + "…")
+            else:
+                st.info("Nothing matching that yet. Search for the topic above to collect articles about it.")
+
+    research_answers()
+
 # Financial Support and Legal Options
 elif options == "Financial Support":
     st.title("Financial Support and Legal Options")
@@ -216,9 +368,9 @@ elif options == "Financial Support":
     - **How to Apply**: [Corporate Angel Network Application](https://apexlg.com/an-example-of-social-entrepreneurship-from-nbcs-shark-tank/)
     """)
     
-    st.header("Tax-Free Retirement Withdrawals")
+    st.header("Penalty-Free Retirement Withdrawals")
     st.markdown("""
-    Stage IV patients can withdraw money from retirement accounts tax-free under specific conditions.
+    Stage IV patients can withdraw money from retirement accounts without the 10% early-withdrawal penalty under specific conditions. Income tax still applies.
     
     **More Information**:
     - [Diana Award](https://diana-award.org.uk/)
@@ -234,16 +386,65 @@ elif options == "Financial Support":
     st.header("Interactive Financial Calculator")
     st.markdown("Estimate potential savings, grants, or tax benefits based on your data.")
     
-    with st.form("financial_calculator"):
-        income = st.number_input("Enter your annual income ($):", min_value=0, value=50000, step=1000)
-        retirement_withdraw = st.number_input("Enter amount to withdraw from retirement account ($):", min_value=0, value=10000, step=1000)
-        submitted = st.form_submit_button("Calculate")
-        
-        if submitted:
-            # Placeholder calculation: Assuming 0% tax for Stage IV withdrawals
-            tax = 0  # Placeholder logic
-            st.write(f"**Estimated Tax on Withdrawal:** ${tax}")
-            st.success("Calculation completed. Please consult a financial advisor for accurate information.")
+    # Every input change reruns just the calculator
+    @st.fragment
+    @profiling.fragment(options, query_flag=profile_requested)
+    def calculator_panel():
+        brackets = finance.load_brackets()
+        calc_col, status_col = st.columns(2)
+        income = calc_col.number_input("Enter your annual income ($):", min_value=0, value=50000, step=1000)
+        retirement_withdraw = calc_col.number_input("Enter amount to withdraw from retirement account ($):", min_value=0, value=10000, step=1000)
+        filing_status = status_col.selectbox("Filing status:", brackets.statuses)
+        under_59 = status_col.checkbox("I am under 59½", value=True)
+        exception = status_col.checkbox("A disability or terminal illness exception applies", value=True)
+        penalty = under_59 and not exception
+
+        # The whole grid is one vectorized pass, so the charts follow every input change
+        withdrawals = np.linspace(0, max(retirement_withdraw * 2, 20000), 81)
+        incomes = np.linspace(0, max(income * 2, 100000), 81)
+        by_withdrawal = finance.scenarios([income], withdrawals, penalty=penalty)
+        by_income = finance.scenarios(incomes, [retirement_withdraw], penalty=penalty)
+        current = finance.scenarios([income], [retirement_withdraw], [filing_status], penalty=penalty)
+
+        tax_col, penalty_col, net_col, rate_col = st.columns(4)
+        tax_col.metric("Estimated tax on withdrawal", f"${current['income_tax'].item():,.0f}")
+        penalty_col.metric("Early-withdrawal penalty", f"${current['penalty'].item():,.0f}")
+        net_col.metric("You keep", f"${current['net'].item():,.0f}")
+        rate_col.metric("Marginal rate", f"{finance.marginal_rate(income + retirement_withdraw, filing_status):.0%}")
+
+        # A fixed Vega-Lite spec: st.line_chart builds and schema-validates an
+        # Altair chart on every rerun, which took most of the panel's time
+        def rate_chart(x_label, x, rates):
+            st.vega_lite_chart(
+                {
+                    x_label: np.tile(x, len(brackets.statuses)),
+                    "Filing status": np.repeat(brackets.statuses, len(x)),
+                    "Effective rate": rates.ravel(),
+                },
+                {
+                    "mark": {"type": "line"},
+                    "encoding": {
+                        "x": {"field": x_label, "type": "quantitative"},
+                        "y": {"field": "Effective rate", "type": "quantitative", "axis": {"format": "%"}},
+                        "color": {"field": "Filing status", "type": "nominal", "sort": brackets.statuses},
+                    },
+                },
+                width="stretch",
+            )
+
+        chart_withdrawal, chart_income = st.columns(2)
+        with chart_withdrawal:
+            st.markdown("**Effective rate by withdrawal amount**")
+            rate_chart("Withdrawal ($)", withdrawals, by_withdrawal["effective_rate"][:, 0])
+        with chart_income:
+            st.markdown("**Effective rate by other income**")
+            rate_chart("Income ($)", incomes, by_income["effective_rate"][:, :, 0])
+        st.caption(
+            f"Federal income tax only, {brackets.year} brackets with the standard deduction. "
+            "State taxes are not included. Please consult a financial advisor for accurate information."
+        )
+
+    calculator_panel()
 
 # Clinical Trials Finder
 elif options == "Clinical Trials":
@@ -253,58 +454,117 @@ elif options == "Clinical Trials":
     **Find relevant clinical trials based on your condition, location, and treatment phase. Participate in studies to access cutting-edge treatments.**
     """)
     
-    cancer_type = st.text_input("Enter your cancer type (e.g., Lung Cancer):", "Lung Cancer")
-    location = st.text_input("Enter your location or ZIP code:", "New York")
-    phase = st.selectbox("Select Trial Phase:", ["All", "Phase 1", "Phase 2", "Phase 3", "Phase 4"])
-    
-    if st.button("Find Clinical Trials"):
-        with st.spinner("Searching for clinical trials..."):
-            # Construct search query
-            query = f"{cancer_type} AND {location}"
-            if phase != "All":
-                query += f" AND {phase}"
-            
-            base_url = "https://clinicaltrials.gov/api/query/study/search/brief"
-            params = {
-                "expr": query,
-                "min_rnk": 1,
-                "max_rnk": 20,
-                "fmt": "xml"
-            }
-            response = requests.get(base_url, params=params)
-            
-            if response.status_code == 200:
+    # Only this panel reruns while searching
+    @st.fragment
+    @profiling.fragment(options, query_flag=profile_requested)
+    def trials_panel():
+        cancer_type = text_input_with_suggestions(
+            "Enter your cancer type (e.g., Lung Cancer):", "Lung Cancer", cancer_type_index(), key="trials_cancer_type"
+        )
+        location = text_input_with_suggestions("Enter your location or ZIP code:", "New York", location_index(), key="trials_location")
+        phase = st.selectbox("Select Trial Phase:", service.PHASES)
+    
+        if st.button("Find Clinical Trials"):
+            warmer.record("trials", cancer_type, location, phase)
+            st.session_state["trials_search"] = (cancer_type, location, phase)
+
+        def show_details(nct_id):
+            try:
+                with st.spinner("Loading trial details..."):
+                    details = service.trial_details(nct_id)
+            except admission.Rejected as e:
+                st.warning(busy_message(e))
+                return
+            except requests.exceptions.RequestException:
+                st.error("Failed to fetch the trial's details.")
+                return
+            except Exception:
+                st.error("Error parsing the trial's details.")
+                return
+            if details["summary"]:
+                st.markdown(details["summary"])
+            facts = [
+                ("Conditions", ", ".join(details["conditions"])),
+                ("Interventions", "; ".join(details["interventions"])),
+                ("Sponsor", details["sponsor"]),
+                ("Dates", " to ".join(date for date in (details["start_date"], details["completion_date"]) if date)),
+                ("Sex", details["sex"]),
+                ("Ages", " to ".join(age for age in (details["min_age"], details["max_age"]) if age and age != "N/A")),
+                ("Healthy volunteers", details["healthy_volunteers"]),
+            ]
+            st.markdown("  \n".join(f"**{label}:** {value}" for label, value in facts if value))
+            for contact in details["contacts"]:
+                st.markdown("**Contact:** " + " · ".join(value for value in contact.values() if value))
+            if details["criteria"]:
+                st.markdown("**Eligibility criteria**")
+                st.text(details["criteria"])
+            if details["sites"]:
+                st.markdown(f"**Sites ({details['site_count']})**")
+                st.dataframe(details["sites"], hide_index=True)
+
+        # Kept in session state, and the table for the session, so opening a
+        # trial's card reruns the panel without a new search
+        if "trials_search" in st.session_state:
+            with st.spinner("Searching for clinical trials..."):
+                # Trials are shown as soon as each one is parsed from the
+                # response; the tabs open with the first of them
+                results = st.container()
+                tabs = []
+                shown = []
+                opened = []
+
+                def open_tabs():
+                    if not tabs:
+                        results.markdown("### Found Clinical Trials")
+                        tabs.extend(results.tabs(["List", "Table"]))
+                    return tabs
+
+                def show_trial(trial):
+                    # The full record is fetched only when the card is opened
+                    list_tab, _ = open_tabs()
+                    card = list_tab.expander(
+                        f"{trial['Title']} · {trial['Status']}",
+                        key=f"trial_{len(shown)}_{trial['NCT ID']}",
+                        on_change="rerun",
+                    )
+                    card.markdown(
+                        f"**Phase:** {trial['Phase']}  \n"
+                        f"**Locations:** {trial['Locations']}  \n"
+                        f"[{trial['NCT ID']} on ClinicalTrials.gov]({trial['Link']})"
+                    )
+                    if card.open:
+                        opened.append(len(shown))
+                        with card:
+                            show_details(trial["NCT ID"])
+                    shown.append(trial)
+
                 try:
-                    data_dict = xmltodict.parse(response.content)
-                    studies = data_dict.get('clinical_studies', {}).get('clinical_study', [])
-                    
-                    if isinstance(studies, dict):
-                        studies = [studies]
-                    
-                    if studies:
-                        st.markdown("### Found Clinical Trials")
-                        for study in studies:
-                            title = study.get('official_title', 'No Title')
-                            status = study.get('overall_status', 'Status Unknown')
-                            location_list = study.get('location_countries', {}).get('location_country', [])
-                            if isinstance(location_list, dict):
-                                location_list = [location_list]
-                            locations = ", ".join([loc.get('location', 'Unknown') for loc in location_list])
-                            phase_text = study.get('phase', 'N/A')
-                            nct_id = study.get('id_info', {}).get('nct_id', '')
-                            link = f"https://clinicaltrials.gov/ct2/show/{nct_id}" if nct_id else "#"
-                            
-                            st.markdown(f"#### [{title}]({link})")
-                            st.write(f"**Status:** {status}")
-                            st.write(f"**Phase:** {phase_text}")
-                            st.write(f"**Locations:** {locations}")
-                            st.markdown("---")
-                    else:
-                        st.warning("No clinical trials found for the given criteria.")
+                    with tables.row_listener(show_trial):
+                        trials = session_store.keep("trials", service.find_trials, *st.session_state["trials_search"])
+                except admission.Rejected as e:
+                    st.warning(busy_message(e))
+                except requests.exceptions.RequestException:
+                    st.error("Failed to fetch clinical trials data.")
                 except Exception as e:
                     st.error("Error parsing clinical trials data.")
-            else:
-                st.error("Failed to fetch clinical trials data.")
+                else:
+                    if trials.num_rows:
+                        list_tab, table_tab = open_tabs()
+                        if not shown:
+                            for trial in trials.to_pylist():
+                                show_trial(trial)
+                        # The cards after an open one are likely opened next
+                        nct_ids = trials["NCT ID"].to_pylist()
+                        service.prefetch_trial_details(
+                            nct_id for row in opened for nct_id in nct_ids[row + 1:row + 1 + service.PREFETCH_TRIALS]
+                        )
+                        with table_tab:
+                            st.dataframe(trials, column_config={"Link": st.column_config.LinkColumn()}, hide_index=True)
+                            download_buttons("trials", trials)
+                    else:
+                        st.warning("No clinical trials found for the given criteria.")
+
+    trials_panel()
 
     st.markdown("---")
     st.header("Enrollment Guide")
@@ -357,46 +617,87 @@ elif options == "Interactive Tools & Extras":
     st.header("Checklist Generator")
     st.markdown("Create your personalized to-do list based on your needs.")
     
-    with st.form("checklist_form"):
-        financial_tasks = st.multiselect("Financial Tasks", [
-            "Apply for insurance",
-            "Meet with financial advisor",
-            "Fill out tax forms",
-            "Explore Corporate Angel Network",
-            "Plan budget for treatments"
-        ])
-        medical_appointments = st.multiselect("Medical Appointments", [
-            "Schedule doctor's visit",
-            "Radiation therapy session",
-            "Chemotherapy session",
-            "Follow-up consultations",
-            "Get second opinion"
-        ])
-        other_tasks = st.multiselect("Other Tasks", [
-            "Call support group",
-            "Arrange transportation",
-            "Update personal documents",
-            "Organize living space",
-            "Plan meals"
-        ])
+    # Submitting reruns only the checklist
+    @st.fragment
+    @profiling.fragment(options, query_flag=profile_requested)
+    def checklist_panel():
+        with st.form("checklist_form"):
+            financial_tasks = st.multiselect("Financial Tasks", [
+                "Apply for insurance",
+                "Meet with financial advisor",
+                "Fill out tax forms",
+                "Explore Corporate Angel Network",
+                "Plan budget for treatments"
+            ])
+            medical_appointments = st.multiselect("Medical Appointments", [
+                "Schedule doctor's visit",
+                "Radiation therapy session",
+                "Chemotherapy session",
+                "Follow-up consultations",
+                "Get second opinion"
+            ])
+            other_tasks = st.multiselect("Other Tasks", [
+                "Call support group",
+                "Arrange transportation",
+                "Update personal documents",
+                "Organize living space",
+                "Plan meals"
+            ])
         
-        submitted = st.form_submit_button("Generate Checklist")
+            submitted = st.form_submit_button("Generate Checklist")
         
-        if submitted:
-            st.markdown("### Your Personalized Checklist")
-            if financial_tasks:
-                st.markdown("**Financial Tasks:**")
-                for task in financial_tasks:
-                    st.write(f"- [ ] {task}")
-            if medical_appointments:
-                st.markdown("**Medical Appointments:**")
-                for task in medical_appointments:
-                    st.write(f"- [ ] {task}")
-            if other_tasks:
-                st.markdown("**Other Tasks:**")
-                for task in other_tasks:
-                    st.write(f"- [ ] {task}")
+            if submitted:
+                st.markdown("### Your Personalized Checklist")
+                if financial_tasks:
+                    st.markdown("**Financial Tasks:**")
+                    for task in financial_tasks:
+                        st.write(f"- [ ] {task}")
+                if medical_appointments:
+                    st.markdown("**Medical Appointments:**")
+                    for task in medical_appointments:
+                        st.write(f"- [ ] {task}")
+                if other_tasks:
+                    st.markdown("**Other Tasks:**")
+                    for task in other_tasks:
+                        st.write(f"- [ ] {task}")
+
+    checklist_panel()
     
+    st.markdown("---")
+
+    # Batch Export
+    st.header("Batch Export")
+    st.markdown("Export results for many locations or cancer types at once, as one CSV, Parquet or GeoJSON file.")
+
+    # Filling in the export reruns only this panel
+    @st.fragment
+    @profiling.fragment(options, query_flag=profile_requested)
+    def export_panel():
+        kinds = {"Hospitals": "hospitals", "Research articles": "research", "Clinical trials": "trials"}
+        kind = kinds[st.radio("Export:", list(kinds), horizontal=True, key="export_kind")]
+        prompt = "Locations, one per line:" if kind == "hospitals" else "Cancer types, one per line:"
+        queries = [line.strip() for line in st.text_area(prompt, key="export_queries").splitlines() if line.strip()]
+        export_options = {}
+        if kind == "trials":
+            location_col, phase_col = st.columns(2)
+            export_options["location"] = location_col.text_input("Location or ZIP code:", "New York", key="export_location")
+            export_options["phase"] = phase_col.selectbox("Trial phase:", service.PHASES, key="export_phase")
+        _, schema = export.KINDS[kind]
+        fmt = st.selectbox("Format:", export.formats_for(schema), format_func=lambda fmt: export.FORMATS[fmt][0])
+        # The file is built on click, in a thread outside this session's script,
+        # so the searches are attributed to the session here
+        session = admission.current_identity()[0]
+        st.download_button(
+            f"Download results of {len(queries)} search{'es' if len(queries) > 1 else ''}" if queries else "Download",
+            data=lambda: b"".join(export.export(kind, queries, fmt, session=session, **export_options)),
+            file_name=export.file_name(kind, fmt),
+            mime=export.FORMATS[fmt][1],
+            on_click="ignore",
+            disabled=not queries,
+        )
+
+    export_panel()
+
     st.markdown("---")
     
     # Donation Hub
@@ -410,3 +711,21 @@ elif options == "Interactive Tools & Extras":
     - **Crowdfunder**: [Start a Campaign](https://www.crowdfunder.com/)
     """)
 
+profile_path = profiling.end(profile)
+if profile_path and profile_requested:
+    st.sidebar.caption(f"Profile written to `{profile_path}`")
+
+# Operator view of this process's caches and queues (DIAGNOSTICS=on, then ?diagnostics=1)
+if os.environ.get("DIAGNOSTICS", "off").lower() == "on" and st.query_params.get("diagnostics") == "1":
+    with st.sidebar.expander("Diagnostics"):
+        memory = session_store.stats()
+        per_session = memory.pop("per_session")
+        memory["this_session_bytes"] = per_session.get(session_store.current_session(), 0)
+        st.caption("Session memory")
+        st.json(memory, expanded=False)
+        st.caption("Admission control")
+        st.json(admission.stats(), expanded=False)
+        st.caption("Conditional requests")
+        st.json(revalidation.stats(), expanded=False)
+        st.caption("Cache warmer")
+        st.json(warmer.state(), expanded=False)
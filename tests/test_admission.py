@@ -0,0 +1,136 @@
+import math
+import threading
+import time
+
+import pytest
+
+from cancer_support import admission, cache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def queued(scheduler):
+    return sum(scheduler.stats()["queued"].values())
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def admission_order(scheduler, clock, requests):
+    """Queue ``(session, lane)`` requests in order on a drained bucket, then hand out one token at a time."""
+    admitted = []
+    threads = []
+    for session, lane in requests:
+        thread = threading.Thread(
+            target=lambda session=session, lane=lane: (
+                scheduler.acquire(session, lane), admitted.append((session, lane)),
+            ),
+            daemon=True,
+        )
+        thread.start()
+        threads.append(thread)
+        wait_for(lambda: queued(scheduler) == len(threads))
+    for served in range(1, len(requests) + 1):
+        clock.now += 1 / scheduler.rate
+        wait_for(lambda: len(admitted) == served)
+    for thread in threads:
+        thread.join(timeout=5)
+    return admitted
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+def drained(clock, rate=10.0, burst=3):
+    scheduler = admission.Scheduler("test", rate, burst, clock=clock)
+    for _ in range(burst):
+        assert scheduler.acquire("warmup") == 0.0
+    return scheduler
+
+
+def test_bucket_refills_at_rate_up_to_burst(clock):
+    scheduler = drained(clock, rate=2.0, burst=3)
+    assert scheduler.stats()["tokens"] == 0.0
+    clock.now += 0.5
+    assert scheduler.stats()["tokens"] == pytest.approx(1.0)
+    clock.now += 0.25
+    assert scheduler.stats()["tokens"] == pytest.approx(1.5)
+    clock.now += 60
+    assert scheduler.stats()["tokens"] == 3.0
+
+
+def test_estimate_counts_queue_and_rejects_past_max_wait(clock):
+    scheduler = drained(clock, rate=2.0, burst=1)
+    assert scheduler.estimate("a") == pytest.approx(0.5)
+    with pytest.raises(admission.Rejected) as rejected:
+        scheduler.acquire("a", max_wait=0.1)
+    assert rejected.value.wait == pytest.approx(0.5)
+    assert scheduler.stats()["rejected"] == 1
+    assert queued(scheduler) == 0
+
+
+def test_interactive_lane_goes_before_background(clock):
+    scheduler = drained(clock)
+    order = admission_order(scheduler, clock, [
+        ("warmer", "background"),
+        ("warmer", "background"),
+        ("user", "interactive"),
+    ])
+    assert order == [("user", "interactive"), ("warmer", "background"), ("warmer", "background")]
+
+
+def test_sessions_take_turns_within_a_lane(clock):
+    scheduler = drained(clock)
+    order = admission_order(scheduler, clock, [
+        ("busy", "interactive"),
+        ("busy", "interactive"),
+        ("busy", "interactive"),
+        ("quiet", "interactive"),
+    ])
+    assert [session for session, _ in order] == ["busy", "quiet", "busy", "busy"]
+    assert scheduler.stats()["admitted"] == 3 + 4
+
+
+@pytest.fixture
+def shared(monkeypatch):
+    monkeypatch.setenv("UPSTREAM_MODE", "live")
+    monkeypatch.setenv("ADMISSION", "on")
+    monkeypatch.setenv("ADMISSION_SHARED", "on")
+    monkeypatch.setenv("ADMISSION_RATE_SHAREDTEST", "1/5")
+    monkeypatch.setenv("ADMISSION_MAX_WAIT_INTERACTIVE", "2")
+    monkeypatch.setattr(cache, "_backend", cache.MemoryBackend())
+    admission.reset()
+    yield cache._backend
+    admission.reset()
+
+
+def test_shared_slot_is_claimed(shared):
+    with admission.identity("user", "interactive"):
+        assert admission.acquire("sharedtest") < 1.0
+    assert admission.stats()["sharedtest"]["shared_rejected"] == 0
+
+
+def test_shared_slot_beyond_max_wait_is_rejected(shared):
+    # Other replicas hold the next ten one-second slots
+    now = math.floor(time.time())
+    for slot in range(now, now + 10):
+        shared.add_raw("admission:sharedtest", str(slot), b"", ttl=60)
+    started = time.monotonic()
+    with admission.identity("user", "interactive"), pytest.raises(admission.Rejected) as rejected:
+        admission.acquire("sharedtest")
+    assert time.monotonic() - started < 1.0
+    assert rejected.value.wait > 2
+    stats = admission.stats()["sharedtest"]
+    assert (stats["rejected"], stats["shared_rejected"]) == (1, 1)
@@ -0,0 +1,143 @@
+import pytest
+
+from cancer_support import alerts, sources
+
+
+class FakeResponse:
+    def __init__(self, payload):
+        self.payload = payload
+
+    def json(self):
+        return self.payload
+
+
+@pytest.fixture
+def pubmed(monkeypatch):
+    """ESearch over ``pubmed.pmids`` (edat-filtered by the test) and an efetch stand-in."""
+
+    class PubMed:
+        pmids = []
+        requests = []
+
+    def get(upstream, url, params=None, **kwargs):
+        PubMed.requests.append(params)
+        start, size = params["retstart"], params["retmax"]
+        return FakeResponse({"esearchresult": {
+            "count": str(len(PubMed.pmids)),
+            "idlist": PubMed.pmids[start:start + size],
+        }})
+
+    monkeypatch.setattr(sources.revalidation, "get", get)
+    monkeypatch.setattr(alerts, "fetch_articles", lambda pmids: {
+        pmid: {"PMID": pmid, "Title": f"Article {pmid}", "Journal": "J", "Published": "2026", "Link": ""}
+        for pmid in pmids
+    })
+    return PubMed
+
+
+class FakeSMTP:
+    def __init__(self):
+        self.sent = []
+
+    def send_message(self, message):
+        self.sent.append(message)
+
+
+def set_today(monkeypatch, day):
+    monkeypatch.setattr(alerts, "_today", lambda: day)
+
+
+def test_search_since_pages_past_one_request(pubmed):
+    pubmed.pmids = [str(n) for n in range(1234)]
+    assert sources.pubmed_search_since("melanoma", "2026/10/01", "2026/10/02") == pubmed.pmids
+    assert [params["retstart"] for params in pubmed.requests] == [0, 500, 1000]
+
+
+def test_search_since_refuses_results_it_cannot_list(pubmed):
+    pubmed.pmids = [str(n) for n in range(sources.ESEARCH_LIMIT + 1)]
+    with pytest.raises(ValueError):
+        sources.pubmed_search_since("cancer", "2026/10/01", "2026/10/02")
+
+
+def test_failed_search_keeps_the_high_water_mark(pubmed, monkeypatch):
+    conn = alerts.connect(":memory:")
+    set_today(monkeypatch, "2026/10/01")
+    alerts.subscribe(conn, "a@example.org", "Cancer")
+    pubmed.pmids = [str(n) for n in range(sources.ESEARCH_LIMIT + 1)]
+    set_today(monkeypatch, "2026/10/02")
+    assert alerts.run(conn, smtp=FakeSMTP()) == (0, 0)
+    assert conn.execute("SELECT high_water FROM terms").fetchone() == ("2026/10/01",)
+
+
+def test_seen_keeps_only_the_overlap_day(pubmed, monkeypatch):
+    conn = alerts.connect(":memory:")
+    smtp = FakeSMTP()
+    set_today(monkeypatch, "2026/10/01")
+    alerts.subscribe(conn, "a@example.org", "Melanoma")
+
+    pubmed.pmids = ["1", "2"]
+    alerts.run(conn, smtp=smtp)
+    # Later the same day: 1 and 2 come back with the overlap and aren't mailed again
+    pubmed.pmids = ["1", "2", "3"]
+    alerts.run(conn, smtp=smtp)
+    assert [message["Subject"] for message in smtp.sent] == [
+        "2 new research articles for you", "1 new research article for you",
+    ]
+    assert conn.execute("SELECT COUNT(*) FROM seen").fetchone() == (3,)
+
+    # Next day: the search starts at 2026/10/01, so 3 (added that day) can still return
+    set_today(monkeypatch, "2026/10/02")
+    pubmed.pmids = ["3", "4"]
+    alerts.run(conn, smtp=smtp)
+    assert len(smtp.sent) == 3
+    # 3 was added by 2026/10/01, so a search from 2026/10/02 can't return it: pruned
+    assert conn.execute("SELECT pmid, seen_on FROM seen").fetchall() == [("4", "2026/10/02")]
+    assert conn.execute("SELECT high_water FROM terms").fetchone() == ("2026/10/02",)
+
+
+class FailingSMTP(FakeSMTP):
+    """Accepts ``limit`` messages, then fails."""
+
+    def __init__(self, limit):
+        super().__init__()
+        self.limit = limit
+
+    def send_message(self, message):
+        if len(self.sent) == self.limit:
+            raise ConnectionError("SMTP went away")
+        super().send_message(message)
+
+
+def test_failed_send_resumes_without_mailing_twice(pubmed, monkeypatch):
+    conn = alerts.connect(":memory:")
+    set_today(monkeypatch, "2026/10/01")
+    for email in ("a@example.org", "b@example.org", "c@example.org"):
+        alerts.subscribe(conn, email, "Melanoma")
+    pubmed.pmids = ["1", "2"]
+
+    failing = FailingSMTP(limit=1)
+    with pytest.raises(ConnectionError):
+        alerts.run(conn, smtp=failing)
+    assert [message["To"] for message in failing.sent] == ["a@example.org"]
+    # The PMIDs and the mark were committed with the queued digests
+    assert conn.execute("SELECT COUNT(*) FROM outbox").fetchone() == (2,)
+    assert conn.execute("SELECT COUNT(*) FROM seen").fetchone() == (2,)
+
+    retry = FakeSMTP()
+    assert alerts.run(conn, smtp=retry) == (1, 2)
+    assert [message["To"] for message in retry.sent] == ["b@example.org", "c@example.org"]
+    assert conn.execute("SELECT COUNT(*) FROM outbox").fetchone() == (0,)
+
+
+def test_pending_digests_block_new_searches_until_sent(pubmed, monkeypatch):
+    conn = alerts.connect(":memory:")
+    set_today(monkeypatch, "2026/10/01")
+    alerts.subscribe(conn, "a@example.org", "Melanoma")
+    pubmed.pmids = ["1"]
+    with pytest.raises(ConnectionError):
+        alerts.run(conn, smtp=FailingSMTP(limit=0))
+    searches = len(pubmed.requests)
+    with pytest.raises(ConnectionError):
+        alerts.run(conn, smtp=FailingSMTP(limit=0))
+    assert len(pubmed.requests) == searches
+    assert conn.execute("SELECT COUNT(*) FROM outbox").fetchone() == (1,)
@@ -0,0 +1,167 @@
+import pytest
+
+from cancer_support import cache, revalidation
+
+
+class Clock:
+    """Stands in for the ``time`` module inside cache.py."""
+
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache, "time", clock)
+    return clock
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path, clock):
+    if request.param == "memory":
+        return cache.MemoryBackend()
+    return cache.SQLiteBackend(str(tmp_path / "cache.sqlite3"))
+
+
+def test_entries_expire_after_their_ttl(backend, clock):
+    backend.set("ns", "k", {"a": [1, 2]}, ttl=10)
+    assert backend.get("ns", "k") == {"a": [1, 2]}
+    assert backend.expires_at("ns", "k") == clock.now + 10
+    assert backend.get("other", "k") is None
+    clock.now += 10
+    assert backend.get("ns", "k") is None
+    assert backend.expires_at("ns", "k") is None
+
+
+def test_add_only_replaces_expired_entries(backend, clock):
+    assert backend.add_raw("ns", "slot", b"first", ttl=10)
+    assert not backend.add_raw("ns", "slot", b"second", ttl=10)
+    assert backend.get_raw("ns", "slot") == b"first"
+    clock.now += 10
+    assert backend.add_raw("ns", "slot", b"third", ttl=10)
+    assert backend.get_raw("ns", "slot") == b"third"
+
+
+def test_touch_extends_only_live_entries(backend, clock):
+    backend.set_raw("ns", "k", b"v", ttl=10)
+    clock.now += 5
+    assert backend.touch("ns", "k", ttl=10)
+    clock.now += 9
+    assert backend.get_raw("ns", "k") == b"v"
+    clock.now += 1
+    assert not backend.touch("ns", "k", ttl=10)
+    assert not backend.touch("ns", "missing", ttl=10)
+
+
+def test_delete_and_clear(backend):
+    for namespace in ("a", "b"):
+        for key in ("1", "2"):
+            backend.set_raw(namespace, key, b"v", ttl=10)
+    backend.delete("a", "1")
+    backend.clear("b")
+    assert [backend.get_raw(ns, k) for ns in ("a", "b") for k in ("1", "2")] == [None, b"v", None, None]
+    backend.clear()
+    assert backend.get_raw("a", "2") is None
+
+
+def test_memory_backend_drops_least_recently_used_over_its_byte_budget(clock):
+    backend = cache.MemoryBackend(max_bytes=10)
+    backend.set_raw("ns", "a", b"xxxx", ttl=10)
+    backend.set_raw("ns", "b", b"xxxx", ttl=10)
+    backend.get_raw("ns", "a")
+    backend.set_raw("ns", "c", b"xxxx", ttl=10)
+    assert [backend.get_raw("ns", k) is not None for k in "abc"] == [True, False, True]
+
+
+def test_unknown_backend_is_refused():
+    with pytest.raises(ValueError):
+        cache.make_backend("redis")
+
+
+@pytest.fixture
+def memory(monkeypatch, clock):
+    monkeypatch.setattr(cache, "_backend", cache.MemoryBackend())
+    return cache._backend
+
+
+def test_cached_stores_results_but_not_none(memory, clock):
+    calls = []
+
+    @cache.cached("lookup", ttl=60)
+    def lookup(name):
+        calls.append(name)
+        return None if name == "missing" else {"name": name}
+
+    assert lookup("a") == lookup("a") == {"name": "a"}
+    assert lookup("missing") is lookup("missing") is None
+    assert calls == ["a", "missing", "missing"]
+    assert lookup.expires_at("a") == clock.now + 60
+    lookup.refresh("a")
+    assert calls[-1] == "a"
+    clock.now += 60
+    lookup("a")
+    assert calls.count("a") == 3
+
+
+class Upstream:
+    """A ``get_session()`` whose one resource carries ETag ``etag``."""
+
+    def __init__(self):
+        self.etag = '"v1"'
+        self.sent = []
+
+    def get(self, url, headers=None, **kwargs):
+        self.sent.append(headers.get("If-None-Match"))
+        status = 304 if headers.get("If-None-Match") == self.etag else 200
+        return Response(status, {"ETag": self.etag}, self.etag.strip('"').encode())
+
+
+class Response:
+    def __init__(self, status_code, headers, content):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+    def raise_for_status(self):
+        pass
+
+
+def test_revalidated_entry_is_kept_on_304(memory, clock, monkeypatch):
+    upstream = Upstream()
+    monkeypatch.setenv("ADMISSION", "off")
+    monkeypatch.setattr(revalidation, "get_session", lambda: upstream)
+    parsed = []
+
+    @cache.cached("stub", ttl=60, revalidate=True)
+    def fetch():
+        body = revalidation.get("stub", "http://upstream.invalid/").content.decode()
+        parsed.append(body)
+        return body
+
+    assert fetch() == "v1"
+    clock.now += 30
+    assert fetch() == "v1"
+    assert upstream.sent == [None]
+
+    # Stale: a conditional request, and the 304 keeps the body without calling the parser
+    clock.now += 31
+    assert fetch.expires_at() is None
+    assert fetch() == "v1"
+    assert upstream.sent == [None, '"v1"']
+    assert parsed == ["v1"]
+    assert fetch.expires_at() == clock.now + 60
+
+    # Changed upstream: the next revalidation gets the new body in full
+    upstream.etag = '"v2"'
+    clock.now += 61
+    assert fetch() == "v2"
+    assert parsed == ["v1", "v2"]
+
+    # Kept REVALIDATE_KEEP TTLs past staleness, then gone: fetched unconditionally
+    clock.now += 60 * (1 + cache.REVALIDATE_KEEP)
+    assert fetch() == "v2"
+    assert upstream.sent[-1] is None
@@ -0,0 +1,77 @@
+import pyarrow as pa
+
+from cancer_support import centers
+
+CAMPUSES = [
+    {"center": "Alpha Cancer Center", "designation": "Comprehensive Cancer Center",
+     "site": "Alpha University Hospital", "lat": "40.0", "lon": "-75.0"},
+    # About 550 m from Alpha
+    {"center": "Beta Cancer Center", "designation": "Cancer Center",
+     "site": "Beta Memorial Hospital", "lat": "40.005", "lon": "-75.0"},
+    {"center": "Gamma Cancer Center", "designation": "Comprehensive Cancer Center",
+     "site": "Gamma Medical Center", "lat": "42.0", "lon": "-71.0"},
+]
+
+
+def hospitals(*rows):
+    return pa.table({
+        "Name": [name for name, _, _ in rows],
+        "Latitude": pa.array([lat for _, lat, _ in rows], pa.float64()),
+        "Longitude": pa.array([lon for _, _, lon in rows], pa.float64()),
+    })
+
+
+TABLE = hospitals(
+    ("Alpha University Hospital - Main Campus", 40.001, -75.0),
+    ("Beta Memorial", 40.0045, -75.0),
+    # The right name, 400 km from its campus
+    ("Gamma Medical Center", 40.0, -75.001),
+    # Next to a campus, under another name
+    ("Community Hospital", 42.0, -71.0),
+    ("Gamma Medical Center", 42.001, -71.0),
+    # Nothing distinctive left once generic words go
+    ("Medical Center", 40.0, -75.0),
+)
+
+
+def test_match_needs_both_distance_and_name():
+    index = centers.CenterIndex(CAMPUSES)
+    none = len(index)
+    assert index.match(TABLE).tolist() == [0, 1, none, none, 2, none]
+
+
+def test_a_hospital_near_several_campuses_takes_the_best_name():
+    index = centers.CenterIndex(CAMPUSES)
+    table = hospitals(("Beta Memorial Hospital", 40.0025, -75.0), ("Alpha Hospital", 40.0025, -75.0))
+    assert index.match(table).tolist() == [1, 0]
+
+
+def test_empty_inputs_match_nothing():
+    assert centers.CenterIndex(CAMPUSES).match(hospitals()).tolist() == []
+    assert centers.CenterIndex([]).match(TABLE).tolist() == [0] * TABLE.num_rows
+
+
+def test_rank_puts_comprehensive_centers_first(monkeypatch):
+    monkeypatch.setattr(centers, "get_index", lambda: centers.CenterIndex(CAMPUSES))
+    ranked = centers.rank_hospitals(TABLE)
+    assert list(zip(ranked["Name"].to_pylist(), ranked["NCI designation"].to_pylist())) == [
+        ("Alpha University Hospital - Main Campus", "Comprehensive Cancer Center"),
+        ("Gamma Medical Center", "Comprehensive Cancer Center"),
+        ("Beta Memorial", "Cancer Center"),
+        ("Gamma Medical Center", ""),
+        ("Community Hospital", ""),
+        ("Medical Center", ""),
+    ]
+    assert ranked["Cancer center"].to_pylist()[:3] == ["Alpha Cancer Center", "Gamma Cancer Center", "Beta Cancer Center"]
+    # Ranking again replaces the columns rather than adding more
+    assert centers.rank_hospitals(ranked).column_names == ranked.column_names
+
+
+def test_bundled_centers_match_an_osm_spelling():
+    table = hospitals(("Memorial Sloan-Kettering Cancer Center", 40.7645, -73.9563))
+    assert centers.rank_hospitals(table)["NCI designation"].to_pylist() == ["Comprehensive Cancer Center"]
+
+
+def test_name_key_drops_generic_words():
+    assert centers.name_key("The University of Texas M.D. Anderson Cancer Center") == "texas m d anderson"
+    assert centers.name_key("Medical Center") == ""
@@ -0,0 +1,71 @@
+from cancer_support import dedup, tables
+
+# About 111 m of latitude
+STEP = 0.001
+
+
+def element(osm_type, osm_id, lat, name=None, lon=-74.0, **tags):
+    if name:
+        tags["name"] = name
+    return {"type": osm_type, "id": osm_id, "lat": lat, "lon": lon, "tags": tags}
+
+
+def names_and_types(table):
+    return list(zip(table["Name"].to_pylist(), table["osm_type"].to_pylist()))
+
+
+def test_named_copies_and_unnamed_neighbours_merge_into_the_richest():
+    table = tables.hospital_table([
+        element("node", 1, 40.7, "Mount Sinai Hospital"),
+        element("way", 2, 40.7 + STEP, "The Mount Sinai Hospital", phone="212-555-0100"),
+        element("node", 3, 40.7 + 0.5 * STEP),
+        element("node", 4, 40.75, "Elsewhere Medical Center"),
+    ])
+    assert names_and_types(dedup.dedupe_hospitals(table)) == [
+        ("The Mount Sinai Hospital", "way"), ("Elsewhere Medical Center", "node"),
+    ]
+
+
+def test_distinct_campuses_are_kept():
+    table = tables.hospital_table([
+        # Same name, 2 km apart
+        element("way", 1, 40.7, "Northwell Health"),
+        element("way", 2, 40.7 + 18 * STEP, "Northwell Health"),
+        # Different names next door
+        element("way", 3, 40.8, "Children's Hospital"),
+        element("way", 4, 40.8 + STEP, "Women's Hospital"),
+    ])
+    assert dedup.dedupe_hospitals(table).num_rows == 4
+
+
+def test_unnamed_element_joins_only_its_nearest_named_neighbour():
+    table = tables.hospital_table([
+        element("node", 1, 40.7, "Alpha Hospital"),
+        element("node", 2, 40.7 + 0.8 * STEP),
+        element("node", 3, 40.7 + 2 * STEP, "Beta Hospital"),
+    ])
+    labels = dedup.cluster_ids(table)
+    assert labels[0] == labels[1] != labels[2]
+    assert dedup.dedupe_hospitals(table)["Name"].to_pylist() == ["Alpha Hospital", "Beta Hospital"]
+
+
+def test_unnamed_elements_alone_merge_among_themselves():
+    table = tables.hospital_table([
+        element("node", 1, 40.7),
+        element("way", 2, 40.7 + STEP),
+        element("node", 3, 40.9),
+    ])
+    assert names_and_types(dedup.dedupe_hospitals(table)) == [
+        (tables.UNNAMED_HOSPITAL, "way"), (tables.UNNAMED_HOSPITAL, "node"),
+    ]
+
+
+def test_small_tables_pass_through():
+    assert dedup.dedupe_hospitals(tables.hospital_table([])).num_rows == 0
+    one = tables.hospital_table([element("node", 1, 40.7, "Alpha Hospital")])
+    assert dedup.dedupe_hospitals(one) is one
+
+
+def test_normalize_name():
+    assert dedup.normalize_name("The Hospital of St. Barnabás") == "hospital st barnabas"
+    assert dedup.normalize_name(tables.UNNAMED_HOSPITAL) == ""
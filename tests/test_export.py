@@ -0,0 +1,110 @@
+import io
+import json
+
+import pyarrow as pa
+import pyarrow.csv
+import pyarrow.parquet
+import pytest
+import requests
+
+from cancer_support import export, tables
+
+
+def hospitals(*names, lat=40.7):
+    return pa.Table.from_pylist(
+        [{"Name": name, "Latitude": lat + n * 0.01, "Longitude": -74.0, "osm_id": n} for n, name in enumerate(names)],
+        schema=tables.RANKED_HOSPITAL_SCHEMA,
+    )
+
+
+def labelled_batch():
+    schema = export.KINDS["hospitals"][1].insert(0, pa.field("Location", pa.string()))
+    batch = [
+        export.labelled(hospitals("Alpha", "Beta"), "Location", "New York"),
+        export.labelled(hospitals(lat=42.3), "Location", "Nowhere"),
+        export.labelled(hospitals("Gamma", lat=42.3), "Location", "Boston"),
+    ]
+    return schema, batch
+
+
+def decode(fmt, data):
+    if fmt == "csv":
+        return pyarrow.csv.read_csv(io.BytesIO(data))
+    return pyarrow.parquet.read_table(io.BytesIO(data))
+
+
+@pytest.mark.parametrize("fmt", ["csv", "parquet"])
+def test_tabular_formats_round_trip(fmt):
+    schema, batch = labelled_batch()
+    table = decode(fmt, b"".join(export.encode(fmt, schema, batch)))
+    assert table["Location"].to_pylist() == ["New York", "New York", "Boston"]
+    assert table["Name"].to_pylist() == ["Alpha", "Beta", "Gamma"]
+    assert table["Latitude"].to_pylist() == pytest.approx([40.7, 40.71, 42.3])
+    if fmt == "parquet":
+        assert table.schema.equals(schema)
+
+
+def test_small_results_share_a_parquet_row_group(monkeypatch):
+    schema, batch = labelled_batch()
+    data = b"".join(export.encode("parquet", schema, batch))
+    assert pyarrow.parquet.ParquetFile(io.BytesIO(data)).num_row_groups == 1
+    monkeypatch.setattr(export, "ROW_GROUP_ROWS", 1)
+    data = b"".join(export.encode("parquet", schema, batch))
+    assert pyarrow.parquet.ParquetFile(io.BytesIO(data)).num_row_groups == 2
+
+
+def test_geojson_round_trip():
+    schema, batch = labelled_batch()
+    collection = json.loads(b"".join(export.encode("geojson", schema, batch)))
+    assert collection["type"] == "FeatureCollection"
+    features = collection["features"]
+    assert [f["geometry"]["coordinates"] for f in features] == [[-74.0, 40.7], [-74.0, 40.71], [-74.0, 42.3]]
+    assert [(f["properties"]["Location"], f["properties"]["Name"]) for f in features] == [
+        ("New York", "Alpha"), ("New York", "Beta"), ("Boston", "Gamma"),
+    ]
+    assert "Latitude" not in features[0]["properties"]
+    assert json.loads(b"".join(export.encode("geojson", schema, []))) == {"type": "FeatureCollection", "features": []}
+
+
+def test_bad_formats_are_refused_before_streaming():
+    with pytest.raises(ValueError, match="format must be one of"):
+        export.encode("xlsx", tables.RANKED_HOSPITAL_SCHEMA, [])
+    with pytest.raises(ValueError, match="coordinates"):
+        export.encode("geojson", tables.ARTICLE_SCHEMA, [])
+    assert export.formats_for(tables.ARTICLE_SCHEMA) == ["csv", "parquet"]
+    with pytest.raises(ValueError, match="kind must be one of"):
+        export.export("lodging", ["New York"], "csv")
+    with pytest.raises(ValueError, match="needs a location"):
+        export.export("trials", ["Lung Cancer"], "csv")
+
+
+def test_export_keeps_query_order(monkeypatch):
+    results = {"New York": hospitals("Alpha"), "Boston": hospitals("Beta", "Gamma")}
+    monkeypatch.setattr(export, "search", lambda kind, query, **options: results[query])
+    data = b"".join(export.export("hospitals", ["New York", "Boston"], "csv", session="test", window=1))
+    table = decode("csv", data)
+    assert table["Location"].to_pylist() == ["New York", "Boston", "Boston"]
+    assert table["Name"].to_pylist() == ["Alpha", "Beta", "Gamma"]
+
+
+def test_a_failed_search_leaves_an_error_row_in_its_place(monkeypatch):
+    def search(kind, query, **options):
+        if query == "Atlantis":
+            raise requests.exceptions.ConnectionError("Overpass went away")
+        return hospitals(f"{query} General")
+
+    monkeypatch.setattr(export, "search", search)
+    queries = ["New York", "Atlantis", "Boston"]
+    table = decode("csv", b"".join(export.export("hospitals", queries, "csv", session="test")))
+    assert list(zip(table["Location"].to_pylist(), table["Name"].to_pylist())) == [
+        ("New York", "New York General"),
+        ("Atlantis", "Search failed: upstream request failed"),
+        ("Boston", "Boston General"),
+    ]
+    collection = json.loads(b"".join(export.export("hospitals", queries, "geojson", session="test")))
+    failed = collection["features"][1]
+    assert failed["geometry"] is None
+    assert failed["properties"]["Name"] == "Search failed: upstream request failed"
+    table = decode("parquet", b"".join(export.export("hospitals", queries, "parquet", session="test")))
+    assert table["Name"].to_pylist()[1] == "Search failed: upstream request failed"
+    assert table["Latitude"].to_pylist()[1] is None
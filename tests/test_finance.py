@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from cancer_support import finance
+
+
+def reference_tax(taxable, floors, rates):
+    """Bracket by bracket, the way the tax tables read."""
+    tax = 0.0
+    for floor, ceiling, rate in zip(floors, list(floors[1:]) + [float("inf")], rates):
+        tax += max(min(taxable, ceiling) - floor, 0) * rate
+    return tax
+
+
+@pytest.fixture
+def brackets():
+    return finance.load_brackets()
+
+
+def status(brackets, name):
+    return brackets.statuses.index(name)
+
+
+def test_tax_at_bracket_boundaries(brackets):
+    single = status(brackets, "Single")
+    assert finance.income_tax(0, single) == 0
+    assert finance.income_tax(-5000, single) == 0
+    assert finance.income_tax(11600, single) == pytest.approx(1160)
+    assert finance.income_tax(11601, single) == pytest.approx(1160.12)
+    assert finance.income_tax(47150, single) == pytest.approx(1160 + 0.12 * (47150 - 11600))
+    assert finance.income_tax(47151, single) - finance.income_tax(47150, single) == pytest.approx(0.22)
+
+
+def test_every_status_matches_the_tables(brackets):
+    incomes = np.array([0, 1, 11600, 16550, 23200, 94300, 100500, 100525, 365600, 609350, 731200, 2_000_000], dtype=float)
+    for row, name in enumerate(brackets.statuses):
+        taxes = finance.income_tax(incomes, row)
+        table = [f for f in brackets.floors[row] if f < finance._STATUS_STRIDE - 1]
+        expected = [reference_tax(income, table, brackets.rates[row]) for income in incomes]
+        assert taxes == pytest.approx(expected), name
+
+
+def test_status_broadcasts_against_income(brackets):
+    statuses = np.arange(len(brackets.statuses))[:, None]
+    taxes = finance.income_tax(np.array([23200.0, 500000.0]), statuses)
+    assert taxes.shape == (len(brackets.statuses), 2)
+    # Joint filers reach the 12% bracket at twice the single floor
+    assert taxes[status(brackets, "Married filing jointly"), 0] == pytest.approx(2320)
+    assert taxes[status(brackets, "Single"), 0] == pytest.approx(1160 + 0.12 * (23200 - 11600))
+    # Separate filers reach 37% at 365,600 instead of 609,350
+    assert taxes[status(brackets, "Married filing separately"), 1] > taxes[status(brackets, "Single"), 1]
+
+
+def test_scenarios_tax_the_withdrawal_on_top_of_income(brackets):
+    result = finance.scenarios([14600, 60000], [0, 10000], statuses=["Single", "Head of household"])
+    assert result["income_tax"].shape == (2, 2, 2)
+    # Income exactly uses up the single standard deduction: the withdrawal starts at 10%
+    assert result["income_tax"][0, 0, 1] == pytest.approx(1000)
+    assert result["penalty"][0, 0, 1] == pytest.approx(1000)
+    assert result["net"][0, 0, 1] == pytest.approx(8000)
+    assert result["effective_rate"][0, 0, 1] == pytest.approx(0.2)
+    # Nothing withdrawn, nothing owed
+    assert not result["income_tax"][..., 0].any() and not result["effective_rate"][..., 0].any()
+    # A head of household keeps more of the same withdrawal at the same income
+    assert result["net"][1, 1, 1] > result["net"][0, 1, 1]
+
+
+def test_scenarios_without_the_penalty(brackets):
+    result = finance.scenarios([50000], [20000], statuses=["Single"], penalty=False)
+    assert result["penalty"][0, 0, 0] == 0
+    assert result["net"][0, 0, 0] == pytest.approx(20000 - result["income_tax"][0, 0, 0])
+
+
+def test_marginal_rate_moves_up_at_the_floor(brackets):
+    deduction = 14600
+    assert finance.marginal_rate(deduction + 47150 - 1, "Single") == 0.12
+    assert finance.marginal_rate(deduction + 47150, "Single") == 0.22
+    assert finance.marginal_rate(0, "Married filing jointly") == 0.10
@@ -0,0 +1,18 @@
+from cancer_support import gazetteer
+
+
+def test_bundled_table_resolves_zip_codes():
+    assert gazetteer.lookup("10001")[2:] == ("New York", "NY")
+    assert gazetteer.lookup("02115-1234")[2:] == ("Boston", "MA")
+    assert gazetteer.lookup("00100") is None
+
+
+def test_listed_zip_wins_over_its_area(tmp_path):
+    path = str(tmp_path / "gazetteer.bin")
+    places = [("Boston", "MA", 42.36, -71.06), ("Cambridge", "MA", 42.37, -71.11)]
+    gazetteer.write_table(path, [(2100, 42.36, -71.06, 0), (2139, 42.36, -71.10, 1)], places)
+    table = gazetteer.Gazetteer(path)
+    assert table.lookup("02139")[2:] == ("Cambridge", "MA")
+    assert table.lookup("02115")[2:] == ("Boston", "MA")
+    assert table.lookup("02200") is None
+    assert table.lookup("cambridge ma").name == "Cambridge"
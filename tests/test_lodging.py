@@ -0,0 +1,51 @@
+import pyarrow as pa
+import pytest
+
+from cancer_support import lodging
+
+
+def points(*coords, names=None):
+    return pa.table({
+        "Name": names or [f"Place {n}" for n in range(len(coords))],
+        "Latitude": pa.array([lat for lat, _ in coords], pa.float64()),
+        "Longitude": pa.array([lon for _, lon in coords], pa.float64()),
+    })
+
+
+HOSPITALS = points((40.7, -74.0), (41.5, -74.0), (35.0, -80.0))
+# 0.01 degrees of latitude is about 1.11 km
+PLACES = points((40.73, -74.0), (40.71, -74.0), (40.8, -74.0), (41.501, -74.0), names=["C", "A", "Far", "B"])
+
+
+def test_nearest_within_the_cut_off_first():
+    join = lodging.nearest_lodging(HOSPITALS, PLACES, max_km=5)
+    assert join.schema.equals(lodging.JOIN_SCHEMA)
+    assert list(zip(join["hospital"].to_pylist(), join["lodging"].to_pylist())) == [(0, 1), (0, 0), (1, 3)]
+    assert join["Distance (km)"].to_pylist() == pytest.approx([1.11, 3.34, 0.11], abs=0.01)
+    assert lodging.lodging_counts(join, HOSPITALS.num_rows).tolist() == [2, 1, 0]
+
+
+def test_k_caps_the_matches_per_hospital():
+    join = lodging.nearest_lodging(HOSPITALS, PLACES, max_km=50, k=2)
+    assert lodging.lodging_counts(join, HOSPITALS.num_rows).tolist() == [2, 1, 0]
+    # More than there are lodging rows
+    join = lodging.nearest_lodging(HOSPITALS, PLACES, max_km=50, k=25)
+    assert lodging.lodging_counts(join, HOSPITALS.num_rows).tolist() == [3, 1, 0]
+
+
+def test_lodging_for_one_hospital():
+    join = lodging.nearest_lodging(HOSPITALS, PLACES, max_km=5)
+    nearby = lodging.lodging_for(join, PLACES, 0)
+    assert nearby["Name"].to_pylist() == ["A", "C"]
+    assert nearby.column_names[-1] == "Distance (km)"
+    assert lodging.lodging_for(join, PLACES, 2).num_rows == 0
+
+
+def test_empty_inputs():
+    none = points()
+    for hospitals, places in [(none, PLACES), (HOSPITALS, none), (none, none)]:
+        join = lodging.nearest_lodging(hospitals, places)
+        assert join.num_rows == 0 and join.schema.equals(lodging.JOIN_SCHEMA)
+    join = lodging.nearest_lodging(HOSPITALS, none)
+    assert lodging.lodging_counts(join, HOSPITALS.num_rows).tolist() == [0, 0, 0]
+    assert lodging.lodging_for(join, none, 0).num_rows == 0
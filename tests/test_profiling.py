@@ -0,0 +1,38 @@
+import json
+import time
+
+import pytest
+
+from cancer_support import profiling
+
+
+@pytest.fixture
+def profile_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("PROFILE", "on")
+    monkeypatch.setenv("PROFILE_SAMPLE_RATE", "1")
+    monkeypatch.setenv("PROFILE_MIN_MS", "0")
+    monkeypatch.setenv("PROFILE_INTERVAL_MS", "1")
+    monkeypatch.setenv("PROFILE_DIR", str(tmp_path))
+    return tmp_path
+
+
+@profiling.fragment("Clinical Trials")
+def trials_panel():
+    time.sleep(0.05)
+    return "done"
+
+
+def test_fragment_rerun_is_recorded_on_its_own(profile_dir, monkeypatch):
+    monkeypatch.setattr(profiling, "_fragment_rerun", lambda: True)
+    assert trials_panel() == "done"
+    (path,) = profile_dir.iterdir()
+    assert "clinical-trials-trials-panel" in path.name
+    profile = json.loads(path.read_text())
+    names = {frame["name"] for frame in profile["shared"]["frames"]}
+    assert "trials_panel" in names
+
+
+def test_full_rerun_leaves_fragment_to_the_page_recording(profile_dir, monkeypatch):
+    monkeypatch.setattr(profiling, "_fragment_rerun", lambda: False)
+    assert trials_panel() == "done"
+    assert not list(profile_dir.iterdir())
@@ -0,0 +1,43 @@
+import threading
+
+from cancer_support import retrieval
+
+
+def test_search_ranks_matching_documents():
+    index = retrieval.BM25Index()
+    index.add([10, 11], ["breast tumor therapy", "lung nodules"])
+    index.add([12], ["breast breast screening"])
+    assert [doc for doc, _ in index.search("breast")] == [12, 10]
+    assert index.search("melanoma") == []
+
+
+def test_search_ignores_terms_an_add_has_not_published():
+    index = retrieval.BM25Index()
+    index.add([1], ["breast tumor"])
+    # What an add() in progress leaves behind before it takes the lock
+    index.vocabulary["melanoma"] = len(index.vocabulary)
+    assert [doc for doc, _ in index.search("breast melanoma")] == [1]
+
+
+def test_search_while_adding():
+    index = retrieval.BM25Index()
+    index.add([0], ["seed"])
+    errors = []
+    done = threading.Event()
+
+    def search():
+        while not done.is_set():
+            try:
+                index.search("term5 term50 term500 seed")
+            except Exception as e:
+                errors.append(e)
+                return
+
+    searcher = threading.Thread(target=search)
+    searcher.start()
+    for batch in range(1, 200):
+        index.add([batch], [f"term{batch} term{batch * 10} seed"])
+    done.set()
+    searcher.join()
+    assert errors == []
+    assert {doc for doc, _ in index.search("term50")} == {5, 50}
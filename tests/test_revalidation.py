@@ -0,0 +1,112 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from cancer_support import cache, revalidation, transport
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Serves ``body`` with an ETag (when ``etag`` is set) and answers a matching If-None-Match with 304."""
+
+    body = b"v1"
+    etag = True
+    seen = []
+
+    def do_GET(self):
+        tag = '"' + self.body.decode() + '"'
+        StubHandler.seen.append(self.headers.get("If-None-Match"))
+        if self.etag and self.headers.get("If-None-Match") == tag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        if self.etag:
+            self.send_header("ETag", tag)
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    monkeypatch.setenv("ADMISSION", "off")
+    monkeypatch.setattr(transport, "_session", transport.make_session("live"))
+    monkeypatch.setattr(cache, "_backend", cache.MemoryBackend())
+    monkeypatch.setattr(StubHandler, "body", b"v1")
+    monkeypatch.setattr(StubHandler, "etag", True)
+    monkeypatch.setattr(StubHandler, "seen", [])
+    revalidation.reset_stats()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/"
+    server.shutdown()
+    server.server_close()
+    revalidation.reset_stats()
+
+
+TTL = 0.05
+
+
+def make_fetch(url):
+    parsed = []
+
+    @cache.cached("stub", ttl=TTL, revalidate=True)
+    def fetch():
+        body = revalidation.get("stub", url, timeout=5).content.decode()
+        parsed.append(body)
+        return body
+
+    return fetch, parsed
+
+
+def counts():
+    return {k: v for k, v in revalidation.stats()["stub"].items() if k != "bytes"}
+
+
+def test_304_keeps_the_stale_body_without_parsing(stub):
+    fetch, parsed = make_fetch(stub)
+    assert fetch() == "v1"
+    time.sleep(TTL * 2)
+    assert fetch.expires_at() is None
+    assert fetch() == "v1"
+    assert parsed == ["v1"]
+    assert StubHandler.seen == [None, '"v1"']
+    # The touched entry is fresh again
+    assert fetch.expires_at() > time.time()
+    assert counts() == {"requests": 2, "conditional": 1, "not_modified": 1, "not_modified_rate": 1.0}
+
+
+def test_changed_body_is_fetched_in_full(stub):
+    fetch, parsed = make_fetch(stub)
+    fetch()
+    time.sleep(TTL * 2)
+    StubHandler.body = b"v2"
+    assert fetch() == "v2"
+    assert parsed == ["v1", "v2"]
+    assert counts() == {"requests": 2, "conditional": 1, "not_modified": 0, "not_modified_rate": 0.0}
+
+
+def test_stale_body_gone_before_touch_refetches_unconditionally(stub, monkeypatch):
+    fetch, parsed = make_fetch(stub)
+    fetch()
+    time.sleep(TTL * 2)
+    monkeypatch.setattr(cache._backend, "touch", lambda namespace, key, ttl: False)
+    assert fetch() == "v1"
+    assert parsed == ["v1", "v1"]
+    assert StubHandler.seen == [None, '"v1"', None]
+    assert counts() == {"requests": 3, "conditional": 1, "not_modified": 1, "not_modified_rate": 1.0}
+
+
+def test_requests_without_validators_are_not_conditional(stub):
+    StubHandler.etag = False
+    fetch, parsed = make_fetch(stub)
+    fetch()
+    time.sleep(TTL * 2)
+    fetch()
+    assert parsed == ["v1", "v1"]
+    assert counts() == {"requests": 2, "conditional": 0, "not_modified": 0, "not_modified_rate": 0.0}
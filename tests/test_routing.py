@@ -0,0 +1,53 @@
+import pyarrow as pa
+import pytest
+
+from cancer_support import routing
+
+
+@pytest.fixture
+def graph(tmp_path, monkeypatch):
+    # One two-way primary road along 40.0N, from -74.00 to -73.97, shape points in between
+    node_ids = [1, 2, 3, 4]
+    lat = [40.0, 40.0, 40.0, 40.0]
+    lon = [-74.0, -73.99, -73.98, -73.97]
+    path = tmp_path / "roads.bin"
+    routing.write_graph(path, *routing.build_graph(node_ids, lat, lon, [([1, 2, 3, 4], 60, 0)]))
+    graph = routing.RoadGraph(str(path))
+    monkeypatch.setattr(routing, "_graph", graph)
+    return graph
+
+
+def hospitals(points):
+    return pa.table({
+        "Name": [f"Hospital {i}" for i in range(len(points))],
+        "Latitude": [lat for lat, _ in points],
+        "Longitude": [lon for _, lon in points],
+    })
+
+
+def test_contracts_shape_points(graph):
+    assert len(graph) == 2
+    assert graph.matrix.nnz == 2
+
+
+def test_origin_off_graph_keeps_every_row_in_order(graph):
+    table = hospitals([(41.88, -87.63), (41.9, -87.6), (40.0, -73.97)])
+    chicago = {"lat": 41.88, "lon": -87.63}
+    assert not routing.covers(chicago)
+    ranked = routing.add_drive_times(chicago, table, max_minutes=60)
+    assert ranked["Name"].to_pylist() == ["Hospital 0", "Hospital 1", "Hospital 2"]
+    assert ranked["Drive (min)"].null_count == 3
+
+
+def test_cut_off_drops_far_hospitals_but_keeps_unknown_ones(graph):
+    # Near the east end (about 2.5 minutes), off the graph, and near the origin
+    table = hospitals([(40.0, -73.97), (41.88, -87.63), (40.0, -74.0)])
+    origin = {"lat": 40.0, "lon": -74.0}
+    assert routing.covers(origin)
+    ranked = routing.add_drive_times(origin, table, max_minutes=60)
+    assert ranked["Name"].to_pylist() == ["Hospital 2", "Hospital 0", "Hospital 1"]
+    assert ranked["Drive (min)"].to_pylist()[2] is None
+    assert ranked["Drive (min)"].to_pylist()[1] == pytest.approx(2.6, abs=0.1)
+
+    ranked = routing.add_drive_times(origin, table, max_minutes=1)
+    assert ranked["Name"].to_pylist() == ["Hospital 2", "Hospital 1"]
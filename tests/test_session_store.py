@@ -0,0 +1,117 @@
+import numpy as np
+import pyarrow as pa
+import pytest
+
+from cancer_support import session_store
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class Builder:
+    """A fetch whose result is ``size`` bytes of Arrow data; counts its calls."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, size, tag=""):
+        self.calls.append((size, tag))
+        return pa.array(np.zeros(size, dtype=np.uint8))
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def build():
+    return Builder()
+
+
+def make_store(clock, budget=300, session_max=200, idle_after=60):
+    return session_store.Store(budget, session_max, idle_after, clock=clock)
+
+
+def kept(store):
+    return sorted(store.entries)
+
+
+def test_same_call_reuses_the_object(clock, build):
+    store = make_store(clock)
+    first = store.keep("a", "area", build, 100)
+    assert store.keep("a", "area", build, 100) is first
+    assert build.calls == [(100, "")]
+    # A different call under the same name replaces it
+    store.keep("a", "area", build, 50, tag="other")
+    assert store.stats()["per_session"] == {"a": 50}
+    assert len(build.calls) == 2
+
+
+def test_idle_sessions_are_evicted_before_older_active_ones(clock, build):
+    store = make_store(clock)
+    store.keep("a", "x", build, 100)
+    clock.now = 10
+    store.keep("b", "x", build, 100)
+    clock.now = 80
+    # a is active again; b has been idle for 70 s
+    store.keep("a", "y", build, 50)
+    store.keep("c", "x", build, 100)
+    # Plain LRU would have dropped a's older object
+    assert kept(store) == [("a", "x"), ("a", "y"), ("c", "x")]
+    stats = store.stats()
+    assert (stats["bytes"], stats["evicted"]) == (250, 1)
+
+
+def test_a_session_over_its_own_cap_loses_its_oldest(clock, build):
+    store = make_store(clock, budget=1000)
+    store.keep("a", "x", build, 150)
+    store.keep("b", "x", build, 150)
+    store.keep("a", "y", build, 100)
+    assert kept(store) == [("a", "y"), ("b", "x")]
+
+
+def test_an_object_larger_than_the_session_cap_is_not_kept(clock, build):
+    store = make_store(clock)
+    value = store.keep("a", "x", build, 201)
+    assert len(value) == 201
+    assert store.stats()["objects"] == 0
+    assert ("a", "x") in store.tombstones
+
+
+def test_an_evicted_object_is_rebuilt_from_its_call(clock, build):
+    store = make_store(clock, budget=150)
+    store.keep("a", "x", build, 100)
+    store.keep("b", "x", build, 100)
+    assert kept(store) == [("b", "x")]
+    assert store.tombstones[("a", "x")][1] == (100,)
+
+    store.keep("a", "x", build, 100)
+    assert build.calls[-1] == (100, "")
+    # A new search under the name isn't counted as a rebuild
+    clock.now = 1
+    store.keep("b", "x", build, 50)
+    stats = store.stats()
+    assert (stats["evicted"], stats["rebuilt"]) == (2, 1)
+    assert ("a", "x") not in store.tombstones
+
+
+def test_tombstones_are_capped(clock, build, monkeypatch):
+    monkeypatch.setattr(session_store, "MAX_TOMBSTONES", 2)
+    store = make_store(clock, budget=100, session_max=100)
+    for session in "abcd":
+        store.keep(session, "x", build, 100)
+    assert list(store.tombstones) == [("b", "x"), ("c", "x")]
+
+
+def test_sizeof_counts_arrow_data_and_shared_containers_once():
+    table = pa.table({"x": np.zeros(1000)})
+    assert session_store.sizeof(table) == table.nbytes
+    assert session_store.sizeof({"hospitals": table}) > table.nbytes
+    rows = [{"name": f"Hospital {n}"} for n in range(100)]
+    assert session_store.sizeof([rows, rows]) < 2 * session_store.sizeof(rows)
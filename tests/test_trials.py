@@ -0,0 +1,83 @@
+import json
+
+import pytest
+import requests
+
+from cancer_support import cache, sources, tables, transport
+
+# Trimmed from a ClinicalTrials.gov /api/v2/studies/{nctId} response
+STUDY = {
+    "protocolSection": {
+        "identificationModule": {"nctId": "NCT05000001", "briefTitle": "Agent A in Lung Cancer"},
+        "statusModule": {
+            "overallStatus": "RECRUITING",
+            "startDateStruct": {"date": "2024-02-15", "type": "ACTUAL"},
+            "primaryCompletionDateStruct": {"date": "2027-12", "type": "ESTIMATED"},
+        },
+        "sponsorCollaboratorsModule": {"leadSponsor": {"name": "Example Cancer Center", "class": "OTHER"}},
+        "descriptionModule": {"briefSummary": "This study tests\n  agent A   in adults."},
+        "conditionsModule": {"conditions": ["Non-small Cell Lung Cancer", "Lung Neoplasms"]},
+        "armsInterventionsModule": {"interventions": [
+            {"type": "DRUG", "name": "Agent A"},
+            {"type": "DIETARY_SUPPLEMENT", "name": "Vitamin D"},
+        ]},
+        "eligibilityModule": {
+            "eligibilityCriteria": "Inclusion Criteria:\n\n* Age 18 or older\n  * ECOG 0-1\n\nExclusion Criteria:\n\n* Pregnancy",
+            "healthyVolunteers": True,
+            "sex": "ALL",
+            "minimumAge": "18 Years",
+        },
+        "contactsLocationsModule": {
+            "centralContacts": [{"name": "Study Coordinator", "role": "CONTACT", "phone": "555-0100"}],
+            "locations": [
+                {"facility": "Center One", "status": "RECRUITING", "city": "New York", "state": "New York"},
+                {"facility": "Center Two", "status": "NOT_YET_RECRUITING", "city": "Boston", "state": "Massachusetts"},
+                {"facility": "Center Three", "city": "Chicago", "state": "Illinois"},
+            ],
+        },
+    },
+    "hasResults": False,
+}
+
+
+@pytest.fixture
+def replay(tmp_path, monkeypatch):
+    store = transport.FixtureStore(str(tmp_path))
+    request = requests.Request(
+        "GET", sources.TRIAL_URL.format(nct_id="NCT05000001"), params={"format": "json"},
+    ).prepare()
+    store.save(request, transport.build_response(
+        request, 200, {"Content-Type": "application/json"}, json.dumps(STUDY).encode(),
+    ))
+    monkeypatch.setenv("UPSTREAM_MODE", "replay")
+    monkeypatch.setattr(transport, "_session", transport.make_session("replay", fixtures=str(tmp_path)))
+    monkeypatch.setattr(cache, "_backend", cache.MemoryBackend())
+
+
+def test_trial_details_from_the_v2_api(replay):
+    record = sources.trial_details("NCT05000001")
+    assert record["nct_id"] == "NCT05000001"
+    assert record["summary"] == "This study tests agent A in adults."
+    assert record["conditions"] == ["Non-small Cell Lung Cancer", "Lung Neoplasms"]
+    assert record["interventions"] == ["Drug: Agent A", "Dietary supplement: Vitamin D"]
+    assert record["criteria"] == "Inclusion Criteria:\n* Age 18 or older\n* ECOG 0-1\nExclusion Criteria:\n* Pregnancy"
+    assert (record["sex"], record["min_age"], record["max_age"]) == ("All", "18 Years", "")
+    assert record["healthy_volunteers"] == "Yes"
+    assert record["contacts"] == [{"name": "Study Coordinator", "phone": "555-0100", "email": ""}]
+    assert [site["status"] for site in record["sites"]] == ["Recruiting", "Not yet recruiting", ""]
+    assert record["site_count"] == 3
+    assert record["sponsor"] == "Example Cancer Center"
+    assert (record["start_date"], record["completion_date"]) == ("2024-02-15", "2027-12")
+    # Cached per NCT id
+    assert sources.trial_details("NCT05000001") == record
+
+
+def test_trial_record_caps_sites_and_tolerates_missing_modules():
+    study = {"protocolSection": {
+        "identificationModule": {"nctId": "NCT05000002"},
+        "contactsLocationsModule": {"locations": [{"facility": f"Site {n}"} for n in range(5)]},
+    }}
+    record = tables.trial_record(json.dumps(study), max_sites=2)
+    assert [site["facility"] for site in record["sites"]] == ["Site 0", "Site 1"]
+    assert record["site_count"] == 5
+    assert record["summary"] == "" and record["healthy_volunteers"] == "" and record["contacts"] == []
@@ -0,0 +1,29 @@
+from cancer_support.typeahead import PrefixIndex, cancer_type_index, location_index
+
+LABELS = ["Breast Cancer", "Lung Cancer", "Non-Small Cell Lung Cancer", "Leukemia", "St. Louis, MO", "breast  cancer"]
+
+
+def test_prefixes_match_the_start_of_any_word_in_rank_order():
+    index = PrefixIndex(LABELS)
+    assert index.suggest("l") == ["Lung Cancer", "Non-Small Cell Lung Cancer", "Leukemia", "St. Louis, MO"]
+    assert index.suggest("cancer") == ["Breast Cancer", "Lung Cancer", "Non-Small Cell Lung Cancer"]
+    assert index.suggest("LUNG can") == ["Lung Cancer", "Non-Small Cell Lung Cancer"]
+    # Inside a word doesn't count
+    assert index.suggest("ung") == []
+    assert index.suggest("") == index.suggest("  ,") == []
+    assert index.suggest("l", limit=2) == ["Lung Cancer", "Non-Small Cell Lung Cancer"]
+
+
+def test_duplicate_spellings_collapse_to_the_first():
+    index = PrefixIndex(LABELS)
+    assert len(index) == 5
+    assert index.canonical("BREAST cancer") == "Breast Cancer"
+    # "st" is read as "saint", as the gazetteer does
+    assert index.suggest("saint l") == ["St. Louis, MO"]
+    assert index.canonical("Saint Louis MO") == "St. Louis, MO"
+    assert index.canonical("Atlantis") == "Atlantis"
+
+
+def test_bundled_indexes():
+    assert "Breast Cancer" in cancer_type_index().suggest("bre")
+    assert location_index().suggest("boston") == ["Boston, MA"]
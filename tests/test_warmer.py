@@ -0,0 +1,81 @@
+import asyncio
+import json
+
+import pytest
+import requests
+
+from cancer_support import api, cache, gazetteer, overpass, revalidation, service, sources, transport, warmer
+
+
+def record(store, url, params, body, content_type="application/json"):
+    request = requests.Request("GET", url, params=params).prepare()
+    store.save(request, transport.build_response(request, 200, {"Content-Type": content_type}, body))
+
+
+@pytest.fixture
+def replay(tmp_path, monkeypatch):
+    """Replayed upstreams answering the warmer's default queries."""
+    store = transport.FixtureStore(str(tmp_path))
+    city = gazetteer.lookup("New York")
+    hospitals = [{
+        "type": "hospital",
+        "id": i,
+        "geometry": {"type": "Point", "coordinates": [city.lon + i * 0.01, city.lat]},
+        "tags": {"_type": "node", "name": f"Hospital {i}", **{t: "" for t in overpass.HOSPITAL_TAGS if t != "name"}},
+    } for i in range(3)]
+    record(
+        store, sources.OVERPASS_URL,
+        {"data": overpass.hospital_query(city.lat, city.lon, radius=service.HOSPITAL_RADIUS, oncology_only=False)},
+        json.dumps({"elements": hospitals}).encode(),
+    )
+    record(
+        store, sources.ESEARCH_URL,
+        {"db": "pubmed", "term": "Breast Cancer", "retmax": service.RESEARCH_LIMIT, "sort": "pub date", "retmode": "json"},
+        json.dumps({"esearchresult": {"count": "1", "idlist": ["111"]}}).encode(),
+    )
+    record(
+        store, sources.EFETCH_URL,
+        {"db": "pubmed", "id": "111", "retmode": "xml", "rettype": "abstract"},
+        b'<PubmedArticleSet><PubmedArticle><MedlineCitation><PMID Version="1">111</PMID><Article>'
+        b"<ArticleTitle>A study</ArticleTitle></Article></MedlineCitation></PubmedArticle></PubmedArticleSet>",
+        content_type="text/xml",
+    )
+    record(
+        store, sources.TRIALS_URL,
+        {"expr": sources.trials_query("Lung Cancer", "New York"), "min_rnk": 1, "max_rnk": service.TRIALS_LIMIT, "fmt": "xml"},
+        b"<clinical_studies><clinical_study><id_info><nct_id>NCT00000001</nct_id></id_info>"
+        b"<official_title>Trial</official_title></clinical_study></clinical_studies>",
+        content_type="text/xml",
+    )
+    monkeypatch.setenv("UPSTREAM_MODE", "replay")
+    monkeypatch.setattr(transport, "_session", transport.make_session("replay", fixtures=str(tmp_path)))
+    monkeypatch.setattr(cache, "_backend", cache.MemoryBackend())
+    monkeypatch.setattr(warmer, "MIN_INTERVAL", dict.fromkeys(warmer.MIN_INTERVAL, 0.0))
+    monkeypatch.setattr(warmer, "_counts", warmer.Counter())
+    revalidation.reset_stats()
+
+
+def test_counters_cover_one_run(replay):
+    assert warmer.run_once()
+    first = warmer.state()
+    assert first["errors"] == []
+    assert first["queries"] == [[kind, args] for kind, args in warmer.DEFAULT_QUERIES]
+    # Overpass, esearch + efetch, trials
+    assert (first["refreshed"], first["fresh"]) == (4, 0)
+
+    assert warmer.run_once()
+    second = warmer.state()
+    assert (second["refreshed"], second["fresh"]) == (0, 4)
+    assert second["last_run"] >= first["last_run"]
+
+
+def test_health_reports_warmer_state(replay):
+    warmer.run_once()
+    response = asyncio.run(api.health(None))
+    body = json.loads(response.body)
+    assert body["ok"] is True
+    assert body["warmer"]["refreshed"] == 4
+    assert body["warmer"]["running"] is False
+    # Replay mode bypasses admission; the replayed requests are still counted
+    assert body["admission"] == {}
+    assert body["revalidation"]["pubmed"]["requests"] == 2